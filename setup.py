@@ -41,10 +41,16 @@ setup(
     dependency_links = [
         "git+https://github.com/wxWidgets/Phoenix.git#egg=Phoenix"
     ],
-    install_requires = ["plac>=0.9.1", "beautifulsoup4", "python-essentials",
+    install_requires = ["plac>=0.9.1", "python-essentials",
         # "Phoenix",
         "MplayerCtrl", "cairosvg<2", # 2.x only supports python3<ref>http://cairosvg.org/</ref>
             "Send2Trash"],
+    extras_require = {
+        "numpy": ["numpy"], # for the `numpy` scene detector
+        "watch": ["pyinotify"], # for inotify in `--watch` mode (falls back to polling)
+        "scandir": ["scandir"], # faster scanning of input directories with python 2
+    },
+    test_suite = "video_splitter.tests",
     include_package_data = True,
     package_data = {
         'video_manager:main': ['resources/icons/*.svg'],
@@ -54,6 +60,7 @@ setup(
         'console_scripts': [
             '%s = video_splitter.video_manager:main' % ("video-manager", ),
             '%s = video_splitter.video_splitter:main' % (video_splitter_globals.app_name, ),
+            '%s-benchmark = video_splitter.benchmark.benchmark:main' % (video_splitter_globals.app_name, ),
         ],
     },
 
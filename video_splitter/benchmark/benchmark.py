@@ -0,0 +1,195 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# Runs `VideoSplitter.split` in this process on generated fake input files with
+# `fake_melt` as `melt` in a temporary directory and reports the throughput,
+# latency percentiles of the traced stages (see `tracing`) and the peak memory
+# usage. The scenarios stress different parts of the orchestration: many small
+# files (process spawning and scheduling), one file with many scenes (XML
+# parsing and queueing of clips) and a deep directory tree (file discovery).
+
+import logging
+import os
+import plac
+import random
+import resource
+import shutil
+import stat
+import sys
+import tempfile
+import time
+from video_splitter import video_splitter, capabilities, tracing
+from video_splitter.benchmark import fake_melt
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+scenario_many_files = "many_files"
+scenario_many_scenes = "many_scenes"
+scenario_deep_tree = "deep_tree"
+scenario_names = [scenario_many_files, scenario_many_scenes, scenario_deep_tree]
+percentiles = [50, 90, 99]
+# the binaries which are checked by `AbstractVideoSplitter` and replaced with
+# scripts which do nothing
+dummy_binaries = ["aac-enc", "analyseplugin", "applyplugin", "listplugins"]
+
+__scenario_doc__ = "The scenario to run (all if omitted)"
+__files_doc__ = "The number of input files of `%s`" % (scenario_many_files, )
+__scenes_doc__ = "The number of scenes of the input file of `%s`" % (scenario_many_scenes, )
+__depth_doc__ = "The depth of the directory tree of `%s`" % (scenario_deep_tree, )
+__fanout_doc__ = "The number of subdirectories of every directory of `%s`" % (scenario_deep_tree, )
+__jobs_doc__ = video_splitter.__jobs_doc__
+__seconds_per_frame_doc__ = "The time the fake melt spends per encoded frame"
+__burn_doc__ = "Let the fake melt burn CPU instead of sleeping"
+__work_dir_doc__ = "The directory where the temporary input and output directories are created (a temporary directory if omitted, which is removed afterwards)"
+
+def percentile(values, p):
+    """@return the `p`th percentile of the sorted list `values` (nearest rank)
+    or `None` if it's empty"""
+    if len(values) == 0:
+        return None
+    index = max(0, int(round(p/100.0*len(values)+0.5))-1)
+    return values[min(index, len(values)-1)]
+
+def create_bin_dir(bin_dir_path):
+    """Creates `melt` and the dummy binaries in `bin_dir_path`."""
+    os.makedirs(bin_dir_path)
+    scripts = {"melt": "#!/bin/sh\nexec \"%s\" \"%s\" \"$@\"\n" % (sys.executable, os.path.abspath(fake_melt.__file__).replace(".pyc", ".py"), )}
+    for dummy_binary in dummy_binaries:
+        scripts[dummy_binary] = "#!/bin/sh\nexit 0\n"
+    for name, script in scripts.items():
+        script_path = os.path.join(bin_dir_path, name)
+        with open(script_path, "w") as script_file:
+            script_file.write(script)
+        os.chmod(script_path, os.stat(script_path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+def __scene_changes__(frame_count, scene_count, rand):
+    return sorted(rand.sample(range(1, frame_count), scene_count-1))
+
+def create_many_files(input_dir_path, files):
+    rand = random.Random(files) # reproducible
+    for i in range(files):
+        fake_melt.create_input_file(os.path.join(input_dir_path, "input-%06d.avi" % (i, )), 100, __scene_changes__(100, 3, rand))
+
+def create_many_scenes(input_dir_path, scenes):
+    rand = random.Random(scenes)
+    frame_count = scenes*20
+    fake_melt.create_input_file(os.path.join(input_dir_path, "input.avi"), frame_count, __scene_changes__(frame_count, scenes, rand))
+
+def create_deep_tree(input_dir_path, depth, fanout):
+    rand = random.Random(depth*fanout)
+    pending = [(input_dir_path, 0)]
+    file_count = 0
+    while len(pending) > 0:
+        dir_path, level = pending.pop()
+        fake_melt.create_input_file(os.path.join(dir_path, "input-%06d.avi" % (file_count, )), 50, __scene_changes__(50, 2, rand)) # unique names because clips are named after the input file
+        file_count += 1
+        with open(os.path.join(dir_path, "notes.txt"), "w") as notes_file: # a non-video file which has to be skipped
+            notes_file.write("not a video\n")
+        if level < depth:
+            for i in range(fanout):
+                sub_dir_path = os.path.join(dir_path, "d%d" % (i, ))
+                os.mkdir(sub_dir_path)
+                pending.append((sub_dir_path, level+1))
+
+def run_scenario(scenario, work_dir_path, jobs, files, scenes, depth, fanout):
+    """Creates the input of `scenario` in `work_dir_path`, splits it and logs
+    the results.
+    @return a dictionary with the results"""
+    input_dir_path = os.path.join(work_dir_path, scenario, "input")
+    output_dir_path = os.path.join(work_dir_path, scenario, "output")
+    os.makedirs(input_dir_path)
+    start = time.time()
+    if scenario == scenario_many_files:
+        create_many_files(input_dir_path, files)
+    elif scenario == scenario_many_scenes:
+        create_many_scenes(input_dir_path, scenes)
+    elif scenario == scenario_deep_tree:
+        create_deep_tree(input_dir_path, depth, fanout)
+    else:
+        raise ValueError("unknown scenario '%s'" % (scenario, ))
+    logger.info("created input of scenario '%s' in %.1f s" % (scenario, time.time()-start, ))
+    tracer = tracing.enable()
+    start = time.time()
+    videoSplitter = video_splitter.VideoSplitter(input_dir_path, output_dir_path, melt="melt", recursive=(scenario == scenario_deep_tree), jobs=jobs, cache_dir=None)
+    videoSplitter.split()
+    duration = time.time()-start
+    clip_count = len([i for i in os.listdir(output_dir_path) if not i.startswith(".")])
+    durations = {} # span name -> sorted list of durations
+    for span, tid in tracer.spans:
+        durations.setdefault(span.name, []).append(span.end-span.start)
+    result = {"scenario": scenario, "duration_s": duration, "clips": clip_count, "clips_per_s": clip_count/duration, "failed_clips": len(videoSplitter.failed_clips), "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, "children_peak_rss_kib": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss, "latencies_s": {}}
+    for name in sorted(durations.keys()):
+        values = sorted(durations[name])
+        result["latencies_s"][name] = dict([("p%d" % (p, ), percentile(values, p)) for p in percentiles])
+    lines = ["scenario '%s': %d clips in %.2f s (%.1f clips/s), %d failed, peak RSS %.1f MiB (largest subprocess %.1f MiB)" % (scenario, clip_count, duration, result["clips_per_s"], result["failed_clips"], result["peak_rss_kib"]/1024.0, result["children_peak_rss_kib"]/1024.0, )]
+    for name, latencies in sorted(result["latencies_s"].items()):
+        lines.append("  %-20s %s" % (name, " ".join(["p%d %8.4f s" % (p, latencies["p%d" % (p, )], ) for p in percentiles]), ))
+    logger.info("\n".join(lines))
+    return result
+
+@plac.annotations(
+    scenario=(__scenario_doc__, "option", "s", str, scenario_names),
+    files=(__files_doc__, "option", "f", int),
+    scenes=(__scenes_doc__, "option", "n", int),
+    depth=(__depth_doc__, "option", "d", int),
+    fanout=(__fanout_doc__, "option", "o", int),
+    jobs=(__jobs_doc__, "option", "j", int),
+    seconds_per_frame=(__seconds_per_frame_doc__, "option", "e", float),
+    burn=(__burn_doc__, "flag", "b"),
+    work_dir=(__work_dir_doc__, "option", "w"),
+)
+def benchmark(scenario=None, files=10000, scenes=5000, depth=5, fanout=4, jobs=video_splitter.jobs_default, seconds_per_frame=0.0, burn=False, work_dir=None):
+    """Runs benchmarks of video-splitter against a fake `melt`."""
+    if work_dir is None:
+        work_dir_path = tempfile.mkdtemp(prefix="video-splitter-benchmark-")
+    else:
+        work_dir_path = tempfile.mkdtemp(prefix="video-splitter-benchmark-", dir=work_dir)
+    try:
+        bin_dir_path = os.path.join(work_dir_path, "bin")
+        create_bin_dir(bin_dir_path)
+        os.environ["PATH"] = bin_dir_path+os.pathsep+os.environ.get("PATH", "")
+        os.environ["FAKE_MELT_SECONDS_PER_FRAME"] = str(seconds_per_frame)
+        os.environ["FAKE_MELT_BURN"] = "1" if burn is True else "0"
+        capabilities.capabilities_file_path = os.path.join(work_dir_path, "capabilities.json") # don't store the fake melt's capabilities in the user's cache
+        scenarios = scenario_names if scenario is None else [scenario]
+        for scenario in scenarios:
+            run_scenario(scenario, work_dir_path, jobs, files, scenes, depth, fanout)
+    finally:
+        if work_dir is None:
+            shutil.rmtree(work_dir_path)
+
+def main():
+    plac.call(benchmark)
+
+if __name__ == "__main__":
+    main()
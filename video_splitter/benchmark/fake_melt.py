@@ -0,0 +1,153 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# A stand-in for `melt` which understands the invocations of video-splitter.
+# Input files are fake AVI files created by `create_input_file` whose header is
+# followed by a JSON description of the video (number of frames and scene
+# changes). Scene detection (`-consumer xml`) writes XML similar to the one of
+# melt with the described scene changes and encoding (`-consumer avformat:...`)
+# spends a configurable time per frame sleeping or burning CPU and writes a
+# file of a configurable size per frame. The cost is controlled with the
+# environment variables in `environment_variables`.
+
+import json
+import os
+import sys
+import time
+
+fake_avi_header = b"RIFF\x00\x00\x00\x00AVI LIST"
+environment_variables = {
+    "FAKE_MELT_SECONDS_PER_FRAME": "time spent per encoded frame (default 0)",
+    "FAKE_MELT_BURN": "burn CPU instead of sleeping if set to 1 (default 0)",
+    "FAKE_MELT_BYTES_PER_FRAME": "size of an encoded frame in bytes (default 64)",
+    "FAKE_MELT_DETECT_SECONDS_PER_FRAME": "time spent per analysed frame during scene detection (default 0)",
+    "FAKE_MELT_PROPERTIES_PER_FRAME": "number of properties written per analysed frame during scene detection which makes the XML as large as melt's with `all=1` (default 1)",
+}
+
+def create_input_file(file_path, frame_count, scene_changes):
+    """Creates a fake input file with `frame_count` frames and scene changes
+    at the frames in `scene_changes`."""
+    with open(file_path, "wb") as input_file:
+        input_file.write(fake_avi_header)
+        input_file.write(json.dumps({"frames": frame_count, "scene_changes": scene_changes}).encode("utf-8"))
+
+def read_input_file(file_path):
+    with open(file_path, "rb") as input_file:
+        content = input_file.read()
+    if not content.startswith(fake_avi_header):
+        sys.stderr.write("'%s' isn't a fake input file\n" % (file_path, ))
+        sys.exit(1)
+    return json.loads(content[len(fake_avi_header):].decode("utf-8"))
+
+def spend(seconds):
+    if seconds <= 0:
+        return
+    if os.environ.get("FAKE_MELT_BURN", "0") == "1":
+        end = time.time()+seconds
+        while time.time() < end:
+            pass
+    else:
+        time.sleep(seconds)
+
+def write_xml(description, in_frame, out_frame, detect, progress):
+    out = sys.stdout
+    out.write('<?xml version="1.0" encoding="utf-8"?>\n<mlt LC_NUMERIC="C" version="6.26.1" root="%s" title="Anonymous Submission" parent="producer0" in="%d" out="%d">\n' % (os.getcwd(), in_frame, out_frame, ))
+    out.write('  <profile description="automatic" width="1920" height="1080" progressive="1" sample_aspect_num="1" sample_aspect_den="1" display_aspect_num="16" display_aspect_den="9" frame_rate_num="25" frame_rate_den="1" colorspace="709"/>\n')
+    out.write('  <producer id="producer0" in="%d" out="%d">\n' % (in_frame, out_frame, ))
+    out.write('    <property name="length">%d</property>\n    <property name="mlt_service">avformat</property>\n' % (description["frames"], ))
+    if detect is True:
+        seconds_per_frame = float(os.environ.get("FAKE_MELT_DETECT_SECONDS_PER_FRAME", "0"))
+        properties_per_frame = int(os.environ.get("FAKE_MELT_PROPERTIES_PER_FRAME", "1"))
+        for frame in range(in_frame, out_frame+1):
+            spend(seconds_per_frame)
+            for i in range(properties_per_frame):
+                out.write('    <property name="meta.attr.%d.%d">%d</property>\n' % (frame, i, frame, ))
+            if progress is True:
+                sys.stderr.write("Current Frame: %10d, percentage: %10d\r" % (frame-in_frame, 100*(frame-in_frame)//(out_frame-in_frame+1), ))
+        scene_changes = [frame-in_frame for frame in description["scene_changes"] if in_frame < frame <= out_frame]
+        shot_change_list = ";".join(["%d=%d" % (frame, 100, ) for frame in [0]+scene_changes+[out_frame-in_frame+1]])
+        out.write('    <filter id="filter0" out="%d">\n      <property name="mlt_service">motion_est</property>\n      <property name="shot_change_list">%s</property>\n    </filter>\n' % (out_frame-in_frame, shot_change_list, ))
+    out.write('  </producer>\n</mlt>\n')
+    out.flush()
+
+def encode(in_frame, out_frame, output_file_path, segment_frames, progress):
+    """Writes the frames from `in_frame` to `out_frame` into
+    `output_file_path` or into segments starting at the frames in
+    `segment_frames` (relative to `in_frame`) if it's not `None` in which case
+    `output_file_path` is a pattern for the index of the segment like for the
+    `segment` muxer. Writes melt's progress lines to stderr if `progress` is
+    `True`."""
+    seconds_per_frame = float(os.environ.get("FAKE_MELT_SECONDS_PER_FRAME", "0"))
+    bytes_per_frame = int(os.environ.get("FAKE_MELT_BYTES_PER_FRAME", "64"))
+    boundaries = [0]+(segment_frames or [])+[out_frame-in_frame+1]
+    for index, (segment_start, segment_end) in enumerate(zip(boundaries[:-1], boundaries[1:])):
+        segment_file_path = output_file_path if segment_frames is None else output_file_path % (index, )
+        with open(segment_file_path, "wb") as output_file:
+            for frame in range(segment_start, segment_end):
+                spend(seconds_per_frame)
+                output_file.write(b"\x00"*bytes_per_frame)
+                if progress is True:
+                    sys.stderr.write("Current Frame: %10d, percentage: %10d\r" % (frame, 100*frame//(out_frame-in_frame+1), ))
+
+def main(args):
+    if args == ["-version"]:
+        sys.stdout.write("melt 6.26.1 (fake)\nCopyright (C) 2002-2021 Meltytech, LLC\n")
+        return 0
+    if len(args) == 2 and args[0] == "-query":
+        sys.stdout.write("---\n%s:\n  - motion_est\n  - avformat\n  - xml\n...\n" % (args[1], ))
+        return 0
+    progress = "-progress" in args
+    args = [arg for arg in args if arg != "-progress"]
+    description = read_input_file(args[0])
+    in_frame = 0
+    out_frame = description["frames"]-1
+    consumer = None
+    segment_frames = None
+    detect = False
+    for arg in args[1:]:
+        if arg.startswith("in="):
+            in_frame = int(arg[len("in="):])
+        elif arg.startswith("out="):
+            out_frame = min(int(arg[len("out="):]), out_frame)
+        elif arg == "motion_est":
+            detect = True
+        elif arg.startswith("avformat:") or arg == "xml":
+            consumer = arg
+        elif arg == "f=segment" and segment_frames is None:
+            segment_frames = []
+        elif arg.startswith("segment_frames="):
+            segment_frames = [int(i) for i in arg[len("segment_frames="):].split(",")]
+    if consumer == "xml":
+        write_xml(description, in_frame, out_frame, detect, progress)
+    elif consumer is not None:
+        encode(in_frame, out_frame, consumer[len("avformat:"):], segment_frames, progress)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,148 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# A registry of the capabilities of the external tools (melt and MP4Box) which
+# are probed once per process and shared by all workers. Probe results are
+# stored on disk as well and reused by later processes as long as the path and
+# the modification time of the probed binary don't change.
+
+import json
+import logging
+import os
+import subprocess as sp
+import tempfile
+import threading
+import python_essentials.lib.os_utils as os_utils
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+capabilities_file_path_default = os.path.join(os.path.expanduser("~"), ".cache", "video-splitter", "capabilities.json")
+
+# the `melt -query` sections which are probed
+melt_query_sections = ["filters", "consumers", "audio_codecs", "video_codecs", ]
+
+__lock__ = threading.Lock()
+__binary_paths__ = {} # binary name -> resolved path or `None`
+__capabilities__ = {} # resolved path -> capabilities
+__probe_locks__ = {} # resolved path -> lock held while probing
+
+capabilities_file_path = capabilities_file_path_default
+
+def find_binary(binary):
+    """Resolves `binary` (a name looked up in `PATH` or a path) once per
+    process.
+    @return the absolute path of `binary` or `None` if it's not available"""
+    with __lock__:
+        if binary in __binary_paths__:
+            return __binary_paths__[binary]
+    if os.path.isabs(binary):
+        binary_path = binary if os.path.exists(binary) else None
+    else:
+        binary_path = os_utils.which(binary)
+        if binary_path is not None:
+            binary_path = os.path.abspath(binary_path)
+    with __lock__:
+        __binary_paths__[binary] = binary_path
+    return binary_path
+
+def binary_available(binary):
+    return find_binary(binary) is not None
+
+def __load_capabilities_file__():
+    try:
+        with open(capabilities_file_path, "r") as capabilities_file:
+            return json.load(capabilities_file)
+    except (IOError, OSError, ValueError):
+        return {}
+
+def __store_capabilities_file__(binary_path, entry):
+    capabilities_dir = os.path.dirname(capabilities_file_path)
+    try:
+        if not os.path.exists(capabilities_dir):
+            os.makedirs(capabilities_dir)
+        entries = __load_capabilities_file__()
+        entries[binary_path] = entry
+        capabilities_file_descriptor, capabilities_tmp_path = tempfile.mkstemp(dir=capabilities_dir, suffix=".tmp")
+        with os.fdopen(capabilities_file_descriptor, "w") as capabilities_file:
+            json.dump(entries, capabilities_file)
+        os.rename(capabilities_tmp_path, capabilities_file_path)
+    except (IOError, OSError) as ex:
+        logger.warning("storing probed capabilities in '%s' failed (%s)" % (capabilities_file_path, str(ex), ))
+
+def __get_capabilities__(binary, probe):
+    binary_path = find_binary(binary)
+    if binary_path is None:
+        raise RuntimeError("The binary '%s' is not available. Install it and try again" % (binary, ))
+    with __lock__:
+        if binary_path in __capabilities__:
+            return __capabilities__[binary_path]
+        probe_lock = __probe_locks__.setdefault(binary_path, threading.Lock())
+    with probe_lock: # only one thread probes a binary, the others wait for its result
+        with __lock__:
+            if binary_path in __capabilities__:
+                return __capabilities__[binary_path]
+        binary_mtime = os.path.getmtime(binary_path)
+        entry = __load_capabilities_file__().get(binary_path)
+        if entry is not None and entry["mtime"] == binary_mtime:
+            logger.debug("using stored capabilities of '%s'" % (binary_path, ))
+            capabilities = entry["capabilities"]
+        else:
+            logger.debug("probing capabilities of '%s'" % (binary_path, ))
+            capabilities = probe(binary_path)
+            __store_capabilities_file__(binary_path, {"mtime": binary_mtime, "capabilities": capabilities})
+        with __lock__:
+            __capabilities__[binary_path] = capabilities
+        return capabilities
+
+def __read_output__(cmds):
+    process = sp.Popen(cmds, stdout=sp.PIPE, stderr=sp.STDOUT)
+    return process.communicate()[0]
+
+def __probe_melt__(melt):
+    capabilities = {"version": __read_output__([melt, "-version", ]).strip().split("\n")[0]}
+    for section in melt_query_sections:
+        section_output = __read_output__([melt, "-query", section, ])
+        capabilities[section] = [i.strip()[2:].strip() for i in section_output.split("\n") if i.strip().startswith("- ")] # items are listed as YAML sequence
+    return capabilities
+
+def __probe_mp4box__(mp4box):
+    return {"version": __read_output__([mp4box, "-version", ]).strip().split("\n")[0]}
+
+def melt_capabilities(melt):
+    """@return a dictionary with the version of `melt` and the lists of
+    `filters`, `consumers`, `audio_codecs` and `video_codecs` it provides"""
+    return __get_capabilities__(melt, __probe_melt__)
+
+def mp4box_capabilities(mp4box):
+    """@return a dictionary with the version of `mp4box`"""
+    return __get_capabilities__(mp4box, __probe_mp4box__)
@@ -0,0 +1,309 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# Reads the frame rate, the number of frames and the keyframes of the first
+# video track directly from the index of MP4/MOV/3GP (`moov` box with the
+# `stts` and `stss` sample tables) and AVI files (`avih` and `strh` headers and
+# the `idx1` chunk) without starting a process or decoding any frame. Files are
+# memory-mapped, so that only the pages of the index are read even if the
+# index is stored after gigabytes of media data. The results are stored in
+# small binary index files in a cache directory, so that reading them again
+# takes milliseconds.
+
+import array
+import collections
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import detection_cache
+import video_sniffer
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+index_dir_default = os.path.join(os.path.expanduser("~"), ".cache", "video-splitter", "index")
+index_size_default = 16 # MiB
+index_file_suffix = ".idx"
+index_file_magic = b"VSIX"
+index_file_version = 1
+index_file_header = struct.Struct(">4sBdII") # magic, version, frame rate, frame count and keyframe count followed by the keyframes as big endian 32 bit integers
+avi_keyframe_flag = 0x10 # AVIIF_KEYFRAME
+
+ContainerIndex = collections.namedtuple("ContainerIndex", ["fps", "frame_count", "keyframes"])
+
+def __unsigned_array__(data, start, count, big_endian):
+    """@return an `array` of `count` unsigned 32 bit integers read from
+    `data` at `start` (much faster and smaller than a tuple for tables with
+    millions of entries)"""
+    if start+4*count > len(data):
+        raise ValueError("table of %d entries at offset %d exceeds the file" % (count, start, ))
+    ret_value = array.array("I")
+    if ret_value.itemsize != 4:
+        ret_value = array.array("L") # `I` is 2 bytes on some platforms
+    ret_value.fromstring(data[start:start+4*count])
+    if big_endian != (sys.byteorder == "big"):
+        ret_value.byteswap()
+    return ret_value
+
+def __iter_boxes__(data, start, end):
+    """Iterates over the ISO boxes between `start` and `end`.
+    @return a generator of tuples of box type, start and end of the payload"""
+    offset = start
+    while offset+8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, offset+8)[0]
+            header_size = 16
+        elif size == 0:
+            size = end-offset # the box extends to the end of the file
+        if size < header_size or offset+size > end:
+            raise ValueError("box '%s' at offset %d has invalid size %d" % (box_type, offset, size, ))
+        yield box_type, offset+header_size, offset+size
+        offset += size
+
+def __find_box__(data, start, end, box_type):
+    """@return a tuple of start and end of the payload of the first box of
+    type `box_type` between `start` and `end`
+    @raise ValueError if there's no such box"""
+    for box_type0, box_start, box_end in __iter_boxes__(data, start, end):
+        if box_type0 == box_type:
+            return box_start, box_end
+    raise ValueError("no '%s' box between offset %d and %d" % (box_type, start, end, ))
+
+def read_iso_index(data):
+    """Reads the index of the first video track from the `moov` box of the
+    MP4/MOV/3GP file `data` (a string or a memory map).
+    @return a `ContainerIndex`
+    @raise ValueError if the file doesn't contain a video track with sample
+    tables (e.g. fragmented files which store them in `moof` boxes)"""
+    moov_start, moov_end = __find_box__(data, 0, len(data), b"moov")
+    for box_type, trak_start, trak_end in __iter_boxes__(data, moov_start, moov_end):
+        if box_type != b"trak":
+            continue
+        mdia_start, mdia_end = __find_box__(data, trak_start, trak_end, b"mdia")
+        hdlr_start, hdlr_end = __find_box__(data, mdia_start, mdia_end, b"hdlr")
+        if data[hdlr_start+8:hdlr_start+12] != b"vide": # after version, flags and pre_defined
+            continue
+        mdhd_start, mdhd_end = __find_box__(data, mdia_start, mdia_end, b"mdhd")
+        if struct.unpack_from(">B", data, mdhd_start)[0] == 1:
+            timescale = struct.unpack_from(">I", data, mdhd_start+20)[0] # after 64 bit creation and modification time
+        else:
+            timescale = struct.unpack_from(">I", data, mdhd_start+12)[0]
+        minf_start, minf_end = __find_box__(data, mdia_start, mdia_end, b"minf")
+        stbl_start, stbl_end = __find_box__(data, minf_start, minf_end, b"stbl")
+        stts_start, stts_end = __find_box__(data, stbl_start, stbl_end, b"stts")
+        stts_entry_count = struct.unpack_from(">I", data, stts_start+4)[0]
+        stts_entries = __unsigned_array__(data, stts_start+8, 2*stts_entry_count, big_endian=True) # pairs of sample count and sample delta
+        if stts_entry_count == 0 or timescale == 0 or stts_entries[1] == 0:
+            raise ValueError("the video track doesn't contain timing information")
+        fps = timescale/float(stts_entries[1])
+        frame_count = sum(stts_entries[0::2])
+        try:
+            stss_start, stss_end = __find_box__(data, stbl_start, stbl_end, b"stss")
+        except ValueError:
+            keyframes = range(frame_count) # no sync sample box means that every sample is a keyframe
+        else:
+            stss_entry_count = struct.unpack_from(">I", data, stss_start+4)[0]
+            keyframes = sorted([sample_number-1 for sample_number in __unsigned_array__(data, stss_start+8, stss_entry_count, big_endian=True)])
+        return ContainerIndex(fps, frame_count, keyframes)
+    raise ValueError("no video track found")
+
+def __iter_chunks__(data, start, end):
+    """Iterates over the RIFF chunks between `start` and `end`.
+    @return a generator of tuples of chunk id, start and end of the payload"""
+    offset = start
+    while offset+8 <= end:
+        chunk_id, size = struct.unpack_from("<4sI", data, offset)
+        if offset+8+size > end:
+            raise ValueError("chunk '%s' at offset %d has invalid size %d" % (chunk_id, offset, size, ))
+        yield chunk_id, offset+8, offset+8+size
+        offset += 8+size+size%2 # chunks are padded to an even size
+
+def read_avi_index(data):
+    """Reads the index of the first video stream of the AVI file `data` (a
+    string or a memory map).
+    @return a `ContainerIndex`
+    @raise ValueError if the file doesn't contain a video stream or an `idx1`
+    chunk or is an OpenDML file with more than one RIFF chunk (whose `idx1`
+    only covers the first one)"""
+    riff_chunks = list(__iter_chunks__(data, 0, len(data)))
+    if len(riff_chunks) == 0 or riff_chunks[0][0] != b"RIFF" or data[riff_chunks[0][1]:riff_chunks[0][1]+4] != b"AVI ":
+        raise ValueError("not an AVI file")
+    if len(riff_chunks) > 1:
+        raise ValueError("OpenDML files with more than one RIFF chunk aren't supported")
+    riff_start, riff_end = riff_chunks[0][1]+4, riff_chunks[0][2]
+    total_frames = None
+    video_stream = None
+    stream_number = 0
+    idx1 = None
+    for chunk_id, chunk_start, chunk_end in __iter_chunks__(data, riff_start, riff_end):
+        if chunk_id == b"idx1":
+            idx1 = (chunk_start, chunk_end)
+        elif chunk_id == b"LIST" and data[chunk_start:chunk_start+4] == b"hdrl":
+            for hdrl_chunk_id, hdrl_chunk_start, hdrl_chunk_end in __iter_chunks__(data, chunk_start+4, chunk_end):
+                if hdrl_chunk_id == b"avih":
+                    total_frames = struct.unpack_from("<I", data, hdrl_chunk_start+16)[0] # after dwMicroSecPerFrame, dwMaxBytesPerSec, dwPaddingGranularity and dwFlags
+                elif hdrl_chunk_id == b"LIST" and data[hdrl_chunk_start:hdrl_chunk_start+4] == b"strl":
+                    strh_start, strh_end = [(strl_chunk_start, strl_chunk_end) for strl_chunk_id, strl_chunk_start, strl_chunk_end in __iter_chunks__(data, hdrl_chunk_start+4, hdrl_chunk_end) if strl_chunk_id == b"strh"][0]
+                    fcc_type = data[strh_start:strh_start+4]
+                    if fcc_type == b"vids" and video_stream is None:
+                        scale, rate, start, length = struct.unpack_from("<IIII", data, strh_start+20) # after fccType, fccHandler, dwFlags, wPriority, wLanguage and dwInitialFrames
+                        video_stream = (stream_number, scale, rate, length)
+                    stream_number += 1
+    if video_stream is None:
+        raise ValueError("no video stream found")
+    stream_number, scale, rate, length = video_stream
+    if scale == 0 or rate == 0:
+        raise ValueError("the video stream doesn't contain timing information")
+    if idx1 is None:
+        raise ValueError("no idx1 chunk found")
+    entries = __unsigned_array__(data, idx1[0], (idx1[1]-idx1[0])//16*4, big_endian=False) # chunk id, flags, offset and size
+    video_chunk_ids = set([struct.unpack("<I", (b"%02d%s" % (stream_number, suffix, )))[0] for suffix in [b"dc", b"db"]])
+    keyframes = []
+    frame = 0
+    for chunk_id, flags in zip(entries[0::4], entries[1::4]):
+        if chunk_id not in video_chunk_ids:
+            continue
+        if flags & avi_keyframe_flag:
+            keyframes.append(frame)
+        frame += 1
+    frame_count = length
+    if frame_count == 0:
+        frame_count = total_frames or frame # some muxers leave dwLength empty
+    return ContainerIndex(rate/float(scale), frame_count, keyframes)
+
+def read_index(input_file):
+    """Reads the index of `input_file` if its container is supported.
+    @return a `ContainerIndex` or `None` if the container isn't supported
+    @raise ValueError if the index can't be read"""
+    container = video_sniffer.sniff_container(input_file)
+    if container in video_sniffer.iso_media_containers:
+        read_function = read_iso_index
+    elif container == "avi":
+        read_function = read_avi_index
+    else:
+        return None
+    with open(input_file, "rb") as file0:
+        if os.fstat(file0.fileno()).st_size == 0:
+            raise ValueError("'%s' is empty" % (input_file, ))
+        data = mmap.mmap(file0.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return read_function(data)
+        finally:
+            data.close()
+
+def dump_index(index):
+    """@return the compact binary representation of the `ContainerIndex`
+    `index` which is stored in index files"""
+    keyframes = array.array("I", index.keyframes)
+    if keyframes.itemsize != 4:
+        keyframes = array.array("L", index.keyframes)
+    if sys.byteorder != "big":
+        keyframes.byteswap()
+    return index_file_header.pack(index_file_magic, index_file_version, index.fps, index.frame_count, len(index.keyframes))+keyframes.tostring()
+
+def load_index(data):
+    """@return the `ContainerIndex` stored in the string `data` created by
+    `dump_index`
+    @raise ValueError if `data` isn't a valid index file"""
+    if len(data) < index_file_header.size:
+        raise ValueError("index file is truncated")
+    magic, version, fps, frame_count, keyframe_count = index_file_header.unpack_from(data, 0)
+    if magic != index_file_magic or version != index_file_version:
+        raise ValueError("unsupported index file format")
+    if len(data) != index_file_header.size+4*keyframe_count:
+        raise ValueError("index file is truncated")
+    return ContainerIndex(fps, frame_count, __unsigned_array__(data, index_file_header.size, keyframe_count, big_endian=True).tolist())
+
+class IndexCache:
+    def __init__(self, index_dir, max_size):
+        """
+        @args index_dir the directory where index files are stored (created if it doesn't exist)
+        @args max_size the maximal size of all index files in bytes
+        """
+        if not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+        self.index_dir = index_dir
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.total_size = None # computed lazily on the first insertion
+
+    def __index_file_path__(self, input_file):
+        file_stat = os.stat(input_file)
+        key = hashlib.sha1()
+        key.update(("%s:%d:%f:%s" % (os.path.abspath(input_file), file_stat.st_size, file_stat.st_mtime, detection_cache.fingerprint_file(input_file, file_stat.st_size), )).encode("utf-8"))
+        key = key.hexdigest()
+        return os.path.join(self.index_dir, key[:2], key+index_file_suffix)
+
+    def get(self, input_file):
+        """Reads the index of `input_file` from its index file or from the
+        file itself if there's no valid index file yet and stores it.
+        @return a `ContainerIndex` or `None` if the container isn't supported
+        @raise ValueError if the index can't be read"""
+        index_file_path = self.__index_file_path__(input_file)
+        try:
+            with open(index_file_path, "rb") as index_file:
+                index = load_index(index_file.read())
+            os.utime(index_file_path, None) # mark as recently used
+            logger.debug("found index of '%s' in '%s'" % (input_file, index_file_path, ))
+            return index
+        except (IOError, OSError, ValueError):
+            pass
+        index = read_index(input_file)
+        if index is not None:
+            self.__put__(index_file_path, index)
+        return index
+
+    def __put__(self, index_file_path, index):
+        index_file_dir = os.path.dirname(index_file_path)
+        if not os.path.exists(index_file_dir):
+            try:
+                os.makedirs(index_file_dir)
+            except OSError:
+                pass # created by another thread or process in the meantime
+        index_file_descriptor, index_tmp_path = tempfile.mkstemp(dir=index_file_dir, suffix=".tmp")
+        with os.fdopen(index_file_descriptor, "wb") as index_file:
+            index_file.write(dump_index(index))
+        os.rename(index_tmp_path, index_file_path) # atomic, so that concurrent readers never see partial index files
+        with self.lock:
+            if self.total_size is None:
+                self.total_size = sum([entry_size for entry_mtime, entry_size, entry_path in detection_cache.list_lru_entries(self.index_dir)])
+            else:
+                self.total_size += os.path.getsize(index_file_path)
+            if self.total_size > self.max_size:
+                self.total_size = detection_cache.evict_lru_entries(self.index_dir, self.max_size)
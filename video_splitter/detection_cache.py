@@ -0,0 +1,152 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# An on-disk cache of scene detection results. Entries are keyed by the
+# identity of the analysed file (size, modification time and a fingerprint of
+# some sampled blocks of content) and the identity of the analysis (the melt
+# version and the filter parameters), so that changing encoding parameters
+# doesn't require analysing files again. Every entry is a small JSON file whose
+# modification time is updated on every hit which allows evicting the least
+# recently used entries once the cache exceeds its size limit.
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+cache_dir_default = os.path.join(os.path.expanduser("~"), ".cache", "video-splitter", "detection")
+cache_size_default = 64 # MiB
+fingerprint_block_size = 64*1024
+cache_file_suffix = ".json"
+
+def fingerprint_file(file_path, size):
+    """Creates a fingerprint of the first, middle and last block of
+    `file_path` which is cheap to compute even for very large files."""
+    fingerprint = hashlib.sha1()
+    with open(file_path, "rb") as file0:
+        for offset in sorted(set([0, max(0, size//2-fingerprint_block_size//2), max(0, size-fingerprint_block_size)])):
+            file0.seek(offset)
+            fingerprint.update(file0.read(fingerprint_block_size))
+    return fingerprint.hexdigest()
+
+def list_lru_entries(cache_dir):
+    """@return a list of tuples of modification time, size and path of all
+    files under `cache_dir` ordered from least to most recently used"""
+    entries = []
+    for dirpath, dirnames, filenames in os.walk(cache_dir):
+        for filename in filenames:
+            file_path = os.path.join(dirpath, filename)
+            try:
+                file_stat = os.stat(file_path)
+            except OSError:
+                continue # removed by a concurrent process
+            entries.append((file_stat.st_mtime, file_stat.st_size, file_path))
+    return sorted(entries)
+
+def evict_lru_entries(cache_dir, max_size):
+    """Removes the least recently used files under `cache_dir` until their
+    total size doesn't exceed `max_size` bytes.
+    @return the total size of the remaining files"""
+    entries = list_lru_entries(cache_dir)
+    total_size = sum([entry_size for entry_mtime, entry_size, entry_path in entries])
+    for entry_mtime, entry_size, entry_path in entries:
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass # removed by a concurrent process
+        total_size -= entry_size
+    return total_size
+
+class DetectionCache:
+    def __init__(self, cache_dir, max_size, analysis_identity):
+        """
+        @args cache_dir the directory where entries are stored (created if it doesn't exist)
+        @args max_size the maximal size of all entries in bytes
+        @args analysis_identity a string identifying the analysis (melt version and filter parameters) which is part of every key
+        """
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.analysis_identity = analysis_identity
+        self.lock = threading.Lock()
+        self.total_size = None # computed lazily on the first insertion
+
+    def __entry_path__(self, input_file):
+        file_stat = os.stat(input_file)
+        key = hashlib.sha1()
+        key.update(self.analysis_identity.encode("utf-8"))
+        key.update(("%d:%f:%s" % (file_stat.st_size, file_stat.st_mtime, fingerprint_file(input_file, file_stat.st_size), )).encode("utf-8"))
+        key = key.hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key+cache_file_suffix)
+
+    def get(self, input_file):
+        """@return the cached result for `input_file` as a dictionary or
+        `None` if there's no valid entry"""
+        entry_path = self.__entry_path__(input_file)
+        try:
+            with open(entry_path, "r") as entry_file:
+                entry = json.load(entry_file)
+            os.utime(entry_path, None) # mark as recently used
+        except (IOError, OSError, ValueError):
+            return None
+        logger.debug("found cached detection result for '%s' in '%s'" % (input_file, entry_path, ))
+        return entry
+
+    def put(self, input_file, entry):
+        """Stores the dictionary `entry` as result for `input_file` and evicts
+        least recently used entries if the cache grows too large."""
+        entry_path = self.__entry_path__(input_file)
+        entry_dir = os.path.dirname(entry_path)
+        if not os.path.exists(entry_dir):
+            try:
+                os.makedirs(entry_dir)
+            except OSError:
+                pass # created by another thread or process in the meantime
+        entry_file_descriptor, entry_tmp_path = tempfile.mkstemp(dir=entry_dir, suffix=".tmp")
+        with os.fdopen(entry_file_descriptor, "w") as entry_file:
+            json.dump(entry, entry_file)
+        os.rename(entry_tmp_path, entry_path) # atomic, so that concurrent readers never see partial entries
+        with self.lock:
+            if self.total_size is None:
+                self.total_size = sum([entry_size for entry_mtime, entry_size, entry_path0 in list_lru_entries(self.cache_dir)])
+            else:
+                self.total_size += os.path.getsize(entry_path)
+            if self.total_size > self.max_size:
+                self.total_size = evict_lru_entries(self.cache_dir, self.max_size)
@@ -0,0 +1,329 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# Scene detection engines. Every detector analyses an input file (or a range of
+# frames of it) and returns the frames where a new scene starts in the same
+# format (see `Detector.detect`), so that detectors can be exchanged without
+# affecting the creation of clips.
+#
+# `MeltDetector` uses the `motion_est` filter of melt (which requires a
+# GPL-enabled build of MLT). `NumpyDetector` lets melt decode downscaled
+# grayscale frames to a pipe and compares histograms of consecutive frames in
+# batches with NumPy which is much faster and doesn't require `motion_est`.
+
+import collections
+import logging
+import xml.etree.cElementTree as ElementTree
+import capabilities
+import melt_xml
+import process_runner
+import tracing
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+# the result of a detection: `frames` is the sorted list of the frames where a
+# new scene starts relative to the first analysed frame, starting with 0 and
+# ending with the number of analysed frames as end marker (which is missing if
+# it's unknown), or `None` if the detector didn't find a scene change;
+# `frame_count` is the index of the last analysed frame (`None` if it's
+# unknown)
+DetectionResult = collections.namedtuple("DetectionResult", ["frames", "frame_count"])
+
+# the arguments following the input file in the melt invokation for scene
+# detection with `motion_est`
+melt_detect_cmds_tail = ["-attach", "motion_est", "-consumer", "xml", "all=1", ]
+# the number of trailing bytes of melt's stderr which are logged if it fails
+melt_stderr_tail_size = process_runner.stderr_tail_size_default
+
+numpy_width_default = 64
+numpy_height_default = 36
+numpy_bins_default = 32
+numpy_threshold_default = 0.4
+numpy_batch_size_default = 256
+
+coarse_step_default = 8
+coarse_margin_default = 4
+coarse_width_default = 32
+coarse_height_default = 18
+coarse_threshold_default = 0.25 # lower than numpy_threshold_default because missing a candidate can't be compensated
+
+class Detector:
+    """The interface of detection engines"""
+    name = None
+
+    def identity(self):
+        """@return a string which identifies the detector and its parameters
+        (used as part of the key of cached results)"""
+        raise NotImplementedError()
+
+    def detect(self, input_file, in_frame=None, out_frame=None, progress_callback=None):
+        """Analyses `input_file` or the frames from `in_frame` to `out_frame`
+        of it and invokes `progress_callback` (if it's not `None`) with the
+        current frame (relative to `in_frame`) and the percentage while the
+        analysis runs.
+        @return a `DetectionResult` or `None` if the analysis failed"""
+        detection_result = self.detectFrames(input_file, in_frame, out_frame, progress_callback)
+        if detection_result is None:
+            return None
+        return DetectionResult(normalize_frames(detection_result.frames, detection_result.frame_count), detection_result.frame_count)
+
+    def detectFrames(self, input_file, in_frame, out_frame, progress_callback):
+        """Implements `detect` and may return the frames of the
+        `DetectionResult` with or without the first frame and the end marker
+        and unsorted (`detect` brings them into the common format)."""
+        raise NotImplementedError()
+
+def normalize_frames(frames, frame_count):
+    """@return the sorted list of scene changes in `frames` without duplicates
+    starting with 0 and ending with the end marker `frame_count+1` (unless
+    `frame_count` is `None`) or `None` if `frames` is `None` or doesn't
+    contain a scene change"""
+    if frames is None:
+        return None
+    end = None if frame_count is None else frame_count+1
+    scene_changes = sorted(set([frame for frame in frames if frame > 0 and (end is None or frame < end)]))
+    if len(scene_changes) == 0:
+        return None
+    if end is None:
+        return [0]+scene_changes
+    return [0]+scene_changes+[end]
+
+def scene_changes(detection_result):
+    """@return the frames of `detection_result` without the first frame and
+    the end marker"""
+    if detection_result.frames is None:
+        return []
+    if detection_result.frame_count is None:
+        return detection_result.frames[1:]
+    return detection_result.frames[1:-1]
+
+def __log_stderr_tail__(process_result, message):
+    logger.error("%s and output '%s'" % (message, process_result.stderr_tail, ))
+
+def __range_cmds__(in_frame, out_frame):
+    if in_frame is None:
+        return []
+    return ["in=%d" % (in_frame, ), "out=%d" % (out_frame, ), ]
+
+class MeltDetector(Detector):
+    name = "motion_est"
+
+    def __init__(self, melt):
+        split_filter_name = "motion_est" # in case mlt has not been configured with the `enable-gpl` flag at build time, the `motion_est` filter is not available, but the invokation succeeds nevertheless (the XML result is missing a filter section which is much more difficult to recognize than simply letting the script fail if the filter isn't present (which is tested with the following statement(s) and has been requested to be improved as https://sourceforge.net/p/mlt/bugs/222/)
+        if not split_filter_name in capabilities.melt_capabilities(melt)["filters"]: # probed once per process
+            raise RuntimeError("The melt binary '%s' can't use the filter '%s' which is used for scene splitting. Correct your melt installation by making the filter available (configure the build with `--enable-gpl` or check with the package maintainer(s) of your system) and ensure that the filter is available with `melt -query \"filter\" | grep %s`. Then run the script agin." % (melt, split_filter_name, split_filter_name, ))
+        self.melt = melt
+
+    def identity(self):
+        return "%s %s" % (capabilities.melt_capabilities(self.melt)["version"], " ".join(melt_detect_cmds_tail), )
+
+    def detectFrames(self, input_file, in_frame, out_frame, progress_callback):
+        melt_process_cmds = [self.melt, input_file, ]+__range_cmds__(in_frame, out_frame)+melt_detect_cmds_tail
+        logger.info("finding scene split markers for file '%s' with %s" % (input_file, str(melt_process_cmds)))
+        melt_process = process_runner.popen_melt(melt_process_cmds, progress_callback, melt_stderr_tail_size) # melt writes a lot of error message about missing frames or timestamps to stderr which don't affect the clip splitting in a significant way and are only kept in a bounded buffer
+        try:
+            melt_xml_summary = melt_xml.parse_melt_xml(melt_process.stdout)
+        except ElementTree.ParseError as ex:
+            logger.error("parsing melt output of '%s' failed (%s)" % (input_file, str(ex), ))
+            melt_xml_summary = None
+        melt_process_result = melt_process.wait(output_discarded=melt_xml_summary is not None and melt_xml_summary.shot_change_list is not None) # closes stdout, melt might still be writing the rest of the document which isn't needed and fail because of that
+        if melt_xml_summary is None or (melt_xml_summary.shot_change_list is None and melt_process_result.returncode != 0):
+            __log_stderr_tail__(melt_process_result, "melt process failed with returncode %d" % (melt_process_result.returncode, ))
+            return None
+        frames = None
+        if melt_xml_summary.shot_change_list is not None:
+            frames = [int(frame_pair.split("=")[0]) for frame_pair in melt_xml_summary.shot_change_list.split(";")]
+        frame_count = None
+        if len(melt_xml_summary.producer_outs) == 1:
+            frame_count = int(melt_xml_summary.producer_outs[0])
+        return DetectionResult(frames, frame_count)
+
+def detect_cuts(stream, width, height, threshold=numpy_threshold_default, bins=numpy_bins_default, batch_size=numpy_batch_size_default, step=1):
+    """Reads 8-bit grayscale frames of `width` times `height` pixels from the
+    file object `stream` until it ends and compares the histograms of every
+    `step`th frame with the one of the previous sampled frame. The frames are
+    read in batches into a buffer which is reused for all batches.
+    @return a tuple of the list of frames where a new scene starts (including
+    the first frame and the number of frames as end marker) and the number of
+    frames read; if `step` is greater than 1, the scene change occurs at one of
+    the `step` frames up to and including the listed frame
+    """
+    if numpy is None:
+        raise RuntimeError("NumPy is not installed. Install it (e.g. with `pip install numpy`) and try again")
+    if not 1 < bins <= 256 or 256 % bins != 0:
+        raise ValueError("bins has to be a divisor of 256 greater than 1, but is %d" % (bins, ))
+    if step < 1:
+        raise ValueError("step has to be at least 1, but is %d" % (step, ))
+    frame_size = width*height
+    bin_shift = 8-(bins.bit_length()-1) # bins is a power of 2
+    frames_buffer = numpy.empty((batch_size, frame_size), dtype=numpy.uint8)
+    histograms_buffer = numpy.empty((batch_size+1, bins), dtype=numpy.int64) # row 0 holds the histogram of the last sampled frame of the previous batch
+    bin_offsets = (numpy.arange(batch_size, dtype=numpy.int64)*bins)[:, numpy.newaxis]
+    batch_bytes = memoryview(frames_buffer.reshape(-1))
+    frame_count = 0
+    sample_count = 0
+    cuts = [0]
+    while True:
+        read_size = 0
+        while read_size < batch_size*frame_size:
+            chunk_size = stream.readinto(batch_bytes[read_size:])
+            if not chunk_size:
+                break
+            read_size += chunk_size
+        batch_frame_count = int(read_size//frame_size)
+        if batch_frame_count == 0:
+            break
+        offset = (-frame_count) % step # the index of the first sampled frame in the batch
+        batch = frames_buffer[offset:batch_frame_count:step] # a view, not a copy
+        batch_sample_count = len(batch)
+        if batch_sample_count > 0:
+            quantized = numpy.right_shift(batch, bin_shift).astype(numpy.int64)
+            quantized += bin_offsets[:batch_sample_count]
+            histograms_buffer[1:batch_sample_count+1] = numpy.bincount(quantized.ravel(), minlength=batch_sample_count*bins).reshape(batch_sample_count, bins)
+            first = 1 if sample_count == 0 else 0 # the first frame has no predecessor
+            scores = numpy.abs(histograms_buffer[first+1:batch_sample_count+1]-histograms_buffer[first:batch_sample_count]).sum(axis=1)/(2.0*frame_size)
+            for index in numpy.flatnonzero(scores > threshold):
+                cuts.append(frame_count+offset+step*(first+int(index)))
+            histograms_buffer[0] = histograms_buffer[batch_sample_count]
+            sample_count += batch_sample_count
+        frame_count += batch_frame_count
+        if batch_frame_count < batch_size:
+            break
+    if frame_count == 0:
+        return [], 0
+    cuts.append(frame_count)
+    return cuts, frame_count
+
+class NumpyDetector(Detector):
+    name = "numpy"
+
+    def __init__(self, melt, width=numpy_width_default, height=numpy_height_default, threshold=numpy_threshold_default, bins=numpy_bins_default):
+        if numpy is None:
+            raise RuntimeError("The detector '%s' requires NumPy. Install it (e.g. with `pip install numpy`) and try again" % (self.name, ))
+        self.melt = melt
+        self.width = width
+        self.height = height
+        self.threshold = threshold
+        self.bins = bins
+
+    def identity(self):
+        return "%s numpy %dx%d %f %d" % (capabilities.melt_capabilities(self.melt)["version"], self.width, self.height, self.threshold, self.bins, )
+
+    def detectFrames(self, input_file, in_frame, out_frame, progress_callback):
+        return detect_raw_frames(self.melt, input_file, in_frame, out_frame, self.width, self.height, progress_callback, threshold=self.threshold, bins=self.bins)
+
+def detect_raw_frames(melt, input_file, in_frame, out_frame, width, height, progress_callback=None, **kwargs):
+    """Lets melt decode `input_file` (or the frames from `in_frame` to
+    `out_frame` of it) into 8-bit grayscale frames of `width` times `height`
+    pixels which are passed to `detect_cuts` with `kwargs`. The progress is
+    passed to `progress_callback` like in `Detector.detect`.
+    @return a `DetectionResult` or `None` if melt failed"""
+    melt_process_cmds = [melt, input_file, ]+__range_cmds__(in_frame, out_frame)+["-consumer", "avformat:pipe:1", "f=rawvideo", "vcodec=rawvideo", "pix_fmt=gray", "width=%d" % (width, ), "height=%d" % (height, ), "an=1", "real_time=0", ]
+    logger.info("finding scene split markers for file '%s' with %s" % (input_file, str(melt_process_cmds)))
+    melt_process = process_runner.popen_melt(melt_process_cmds, progress_callback, melt_stderr_tail_size)
+    frames, frame_count = detect_cuts(melt_process.stdout, width, height, **kwargs)
+    melt_process_result = melt_process.wait()
+    if melt_process_result.returncode != 0 or frame_count == 0:
+        __log_stderr_tail__(melt_process_result, "melt process failed with returncode %d" % (melt_process_result.returncode, ))
+        return None
+    return DetectionResult(frames, frame_count-1)
+
+class CoarseToFineDetector(Detector):
+    """Scans a proxy of the input with a tiny resolution and only every `step`th
+    frame for candidate scene changes with a low threshold and lets the `fine`
+    detector analyse only windows of some frames around every candidate. The
+    fine detector thus decodes and analyses only a small part of the input at
+    full resolution."""
+
+    def __init__(self, fine, melt, step=coarse_step_default, margin=coarse_margin_default, width=coarse_width_default, height=coarse_height_default, threshold=coarse_threshold_default):
+        if numpy is None:
+            raise RuntimeError("Coarse to fine detection requires NumPy. Install it (e.g. with `pip install numpy`) and try again")
+        if step < 1:
+            raise ValueError("step has to be at least 1, but is %d" % (step, ))
+        self.name = "%s-coarse-to-fine" % (fine.name, )
+        self.fine = fine
+        self.melt = melt
+        self.step = step
+        self.margin = margin
+        self.width = width
+        self.height = height
+        self.threshold = threshold
+
+    def identity(self):
+        return "%s coarse %d %d %dx%d %f" % (self.fine.identity(), self.step, self.margin, self.width, self.height, self.threshold, )
+
+    def detectFrames(self, input_file, in_frame, out_frame, progress_callback):
+        with tracing.span("coarse_scan", "file", file=input_file):
+            coarse_result = detect_raw_frames(self.melt, input_file, in_frame, out_frame, self.width, self.height, progress_callback, threshold=self.threshold, step=self.step) # decodes every frame which makes it the bulk of the work, so that its progress stands for the whole detection
+        if coarse_result is None:
+            return None
+        frame_count = coarse_result.frame_count
+        candidates = coarse_result.frames[1:-1] # without the first frame and the end marker
+        # the scene change is at most `step` frames before the candidate; merge
+        # overlapping windows in order to analyse every frame once at most
+        windows = []
+        for candidate in candidates:
+            window = (max(0, candidate-self.step-self.margin), min(frame_count, candidate+self.margin))
+            if len(windows) > 0 and window[0] <= windows[-1][1]:
+                windows[-1] = (windows[-1][0], window[1])
+            else:
+                windows.append(window)
+        logger.info("refining %d candidate scene changes of '%s' in %d windows of %d frames in total" % (len(candidates), input_file, len(windows), sum([window_end-window_start+1 for window_start, window_end in windows]), ))
+        base_frame = 0 if in_frame is None else in_frame
+        frames = []
+        for window_start, window_end in windows:
+            window_result = self.fine.detect(input_file, base_frame+window_start, base_frame+window_end)
+            if window_result is None:
+                return None
+            frames += [window_start+frame for frame in scene_changes(window_result)]
+        return DetectionResult(frames, frame_count)
+
+detector_names = [MeltDetector.name, NumpyDetector.name, ]
+
+def create_detector(name, melt, coarse_step=None):
+    """@return a detector for one of the names in `detector_names` which is
+    wrapped in a `CoarseToFineDetector` with `coarse_step` if it's not `None`"""
+    if name == MeltDetector.name:
+        detector = MeltDetector(melt)
+    elif name == NumpyDetector.name:
+        detector = NumpyDetector(melt)
+    else:
+        raise ValueError("unknown detector '%s', choose one of %s" % (name, ", ".join(detector_names), ))
+    if coarse_step is not None:
+        detector = CoarseToFineDetector(detector, melt, step=coarse_step)
+    return detector
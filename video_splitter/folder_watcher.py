@@ -0,0 +1,139 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# Watches a directory for new or changed files and reports every file once its
+# size and modification time haven't changed for a while, so that files which
+# are still being written (e.g. copied or recorded into the directory) aren't
+# processed before they're complete. Uses inotify through `pyinotify` if it's
+# installed and falls back to scanning the directory periodically otherwise.
+
+import logging
+import os
+import time
+
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+settle_time_default = 10 # seconds
+poll_interval_default = 2 # seconds
+
+class FolderWatcher:
+    def __init__(self, dir_path, recursive=False, settle_time=settle_time_default, poll_interval=poll_interval_default, ignored_dir_paths=[]):
+        """
+        @args dir_path the directory to watch
+        @args recursive whether to watch subdirectories as well
+        @args settle_time the number of seconds a file's size and modification time mustn't change before it's reported
+        @args poll_interval the number of seconds between two checks of pending files (and between two scans of `dir_path` without inotify)
+        @args ignored_dir_paths directories under `dir_path` whose files are never reported (e.g. the output directory)
+        """
+        if not os.path.isdir(dir_path):
+            raise ValueError("dir_path '%s' isn't a directory" % (dir_path, ))
+        self.dir_path = dir_path
+        self.recursive = recursive
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.ignored_dir_paths = [os.path.abspath(i) for i in ignored_dir_paths]
+        self.pending = {} # file path -> tuple of size, modification time and time of the last change
+        self.reported = {} # file path -> tuple of size and modification time when it has been reported
+        if pyinotify is None:
+            logger.info("pyinotify isn't installed, scanning '%s' every %d seconds" % (dir_path, poll_interval, ))
+            self.notifier = None
+        else:
+            watcher = self
+            class EventHandler(pyinotify.ProcessEvent):
+                def process_default(self, event):
+                    if not event.dir:
+                        watcher.__candidate__(event.pathname)
+            watch_manager = pyinotify.WatchManager()
+            self.notifier = pyinotify.Notifier(watch_manager, EventHandler())
+            watch_manager.add_watch(dir_path, pyinotify.IN_CLOSE_WRITE | pyinotify.IN_MODIFY | pyinotify.IN_MOVED_TO | pyinotify.IN_CREATE, rec=recursive, auto_add=recursive)
+
+    def __candidate__(self, file_path):
+        file_path = os.path.abspath(file_path) # inotify reports absolute paths
+        for ignored_dir_path in self.ignored_dir_paths:
+            if file_path.startswith(ignored_dir_path+os.sep):
+                return
+        if file_path not in self.pending:
+            self.pending[file_path] = (None, None, time.time())
+
+    def __scan__(self):
+        if self.recursive is False:
+            for file_name in os.listdir(self.dir_path):
+                file_path = os.path.join(self.dir_path, file_name)
+                if os.path.isfile(file_path):
+                    self.__candidate__(file_path)
+        else:
+            for dirpath, dirnames, filenames in os.walk(self.dir_path):
+                for file_name in filenames:
+                    self.__candidate__(os.path.join(dirpath, file_name))
+
+    def __settledFiles__(self):
+        now = time.time()
+        settled_files = []
+        for file_path, (size, mtime, changed) in list(self.pending.items()):
+            try:
+                file_stat = os.stat(file_path)
+            except OSError:
+                del self.pending[file_path] # deleted or moved away before it settled
+                continue
+            if self.reported.get(file_path) == (file_stat.st_size, file_stat.st_mtime):
+                del self.pending[file_path] # unchanged since it has been reported
+                continue
+            if (file_stat.st_size, file_stat.st_mtime) != (size, mtime):
+                self.pending[file_path] = (file_stat.st_size, file_stat.st_mtime, now)
+                continue
+            if now-changed >= self.settle_time:
+                del self.pending[file_path]
+                self.reported[file_path] = (size, mtime)
+                settled_files.append(file_path)
+        return sorted(settled_files)
+
+    def watch(self):
+        """A generator which yields the path of every new or changed file in
+        `dir_path` once it settled (including the files which exist when
+        watching starts). Runs until it's interrupted."""
+        self.__scan__() # inotify only reports changes
+        while True:
+            if self.notifier is None:
+                self.__scan__()
+                time.sleep(self.poll_interval)
+            elif self.notifier.check_events(timeout=self.poll_interval*1000):
+                self.notifier.read_events()
+                self.notifier.process_events()
+            for file_path in self.__settledFiles__():
+                logger.debug("file '%s' settled" % (file_path, ))
+                yield file_path
@@ -0,0 +1,211 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# A queue of jobs (input files) which is shared by several video-splitter
+# processes on one or more hosts through a directory (e.g. on NFS). A process
+# claims a job by creating a lease file exclusively (`O_CREAT | O_EXCL` is
+# atomic on local filesystems and on NFSv3 and later) and keeps the lease alive
+# by updating its modification time in a heartbeat thread. Leases which haven't
+# been updated for `lease_timeout` seconds belong to a process which died and
+# are reclaimed by renaming them which only one process can do successfully;
+# the successful process removes the lease and claims the job like any other
+# job. A lease is never replaced, so that a lease which has been claimed while
+# an abandoned one has been reclaimed can't be overwritten.
+# Completed jobs are recorded with a marker file, so that they're skipped by
+# all processes. The clocks of all hosts need to be reasonably synchronized.
+
+import errno
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+lease_timeout_default = 300 # seconds
+
+class JobQueue:
+    def __init__(self, queue_dir_path, lease_timeout=lease_timeout_default, heartbeat_interval=None):
+        """
+        @args queue_dir_path the shared directory (created if it doesn't exist)
+        @args lease_timeout the number of seconds after which a lease which hasn't been updated is considered abandoned
+        @args heartbeat_interval the number of seconds between two updates of the held leases (defaults to a fifth of `lease_timeout`)
+        """
+        if lease_timeout <= 0:
+            raise ValueError("lease_timeout has to be positive, but is %s" % (str(lease_timeout), ))
+        if heartbeat_interval is None:
+            heartbeat_interval = lease_timeout/5.0
+        self.lease_dir_path = os.path.join(queue_dir_path, "leases")
+        self.done_dir_path = os.path.join(queue_dir_path, "done")
+        for dir_path in [self.lease_dir_path, self.done_dir_path]:
+            if not os.path.isdir(dir_path):
+                try:
+                    os.makedirs(dir_path)
+                except OSError as ex:
+                    if ex.errno != errno.EEXIST: # created by another process meanwhile
+                        raise
+        self.lease_timeout = lease_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.owner = "%s-%d-%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8], )
+        self.held_leases = {} # job -> lease file path
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.heartbeat_thread = threading.Thread(target=self.__heartbeat__, name="job-queue-heartbeat")
+        self.heartbeat_thread.daemon = True
+        self.heartbeat_thread.start()
+
+    def __key__(self, job):
+        return hashlib.sha1(job.encode("utf-8")).hexdigest()
+
+    def __leaseFilePath__(self, job):
+        return os.path.join(self.lease_dir_path, "%s.lease" % (self.__key__(job), ))
+
+    def __doneFilePath__(self, job):
+        return os.path.join(self.done_dir_path, self.__key__(job))
+
+    def isDone(self, job):
+        return os.path.exists(self.__doneFilePath__(job))
+
+    def claim(self, job):
+        """Tries to acquire the lease of `job`.
+        @return `True` if the lease has been acquired and the job has to be
+        processed by this process, `False` if it's done or leased by another
+        process"""
+        if self.isDone(job):
+            return False
+        lease_file_path = self.__leaseFilePath__(job)
+        for attempt in range(2): # retry once after reclaiming an abandoned lease
+            try:
+                lease_file_descriptor = os.open(lease_file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except OSError as ex:
+                if ex.errno != errno.EEXIST:
+                    raise
+                if not self.__reclaim__(job, lease_file_path):
+                    return False
+                continue
+            with os.fdopen(lease_file_descriptor, "w") as lease_file:
+                json.dump({"job": job, "owner": self.owner, "claimed": time.time()}, lease_file)
+            if self.isDone(job): # completed by the previous owner between the check above and the creation of the lease
+                os.remove(lease_file_path)
+                return False
+            with self.lock:
+                self.held_leases[job] = lease_file_path
+            logger.debug("claimed job '%s'" % (job, ))
+            return True
+        return False
+
+    def __reclaim__(self, job, lease_file_path):
+        try:
+            lease_mtime = os.stat(lease_file_path).st_mtime
+        except OSError:
+            return True # released meanwhile
+        if time.time()-lease_mtime < self.lease_timeout:
+            return False
+        stale_file_path = "%s.stale-%s" % (lease_file_path, self.owner, )
+        try:
+            os.rename(lease_file_path, stale_file_path)
+        except OSError:
+            return False # reclaimed by another process
+        if time.time()-os.stat(stale_file_path).st_mtime < self.lease_timeout:
+            # another process reclaimed the abandoned lease and claimed the job
+            # between `stat` and `rename` above, so that the renamed lease is
+            # alive and has to be put back; `link` (unlike `rename`) fails
+            # rather than replacing a lease which has been created meanwhile
+            try:
+                os.link(stale_file_path, lease_file_path)
+            except OSError as ex:
+                if ex.errno != errno.EEXIST:
+                    raise
+                logger.error("the lease of job '%s' has been claimed while it was put back, the job might be processed twice" % (job, ))
+            finally:
+                os.remove(stale_file_path)
+            return False
+        os.remove(stale_file_path)
+        logger.info("reclaimed abandoned lease of job '%s'" % (job, ))
+        return True
+
+    def __leaseOwner__(self, lease_file_path):
+        """@return the owner of the lease `lease_file_path` or `None` if it
+        doesn't exist or is being written"""
+        try:
+            with open(lease_file_path, "r") as lease_file:
+                return json.load(lease_file)["owner"]
+        except (IOError, ValueError):
+            return None
+
+    def __heartbeat__(self):
+        while not self.stopped.wait(self.heartbeat_interval):
+            with self.lock:
+                held_leases = list(self.held_leases.items())
+            for job, lease_file_path in held_leases:
+                owner = self.__leaseOwner__(lease_file_path)
+                if owner is None:
+                    continue # renamed for a moment by a process which tries to reclaim it, checked again at the next heartbeat
+                if owner != self.owner:
+                    logger.warning("lease of job '%s' has been lost (probably reclaimed after a heartbeat has been missed), another process might process it as well" % (job, ))
+                    with self.lock:
+                        self.held_leases.pop(job, None)
+                    continue
+                try:
+                    os.utime(lease_file_path, None)
+                except OSError:
+                    pass # see above
+
+    def complete(self, job):
+        """Marks `job` as done and releases its lease."""
+        with open(self.__doneFilePath__(job), "w") as done_file:
+            json.dump({"job": job, "owner": self.owner, "completed": time.time()}, done_file)
+        self.release(job)
+
+    def release(self, job):
+        """Releases the lease of `job` without marking it as done, so that it
+        can be claimed again (e.g. after a failure)."""
+        with self.lock:
+            lease_file_path = self.held_leases.pop(job, None)
+        if lease_file_path is None:
+            return
+        if self.__leaseOwner__(lease_file_path) == self.owner: # not lost
+            os.remove(lease_file_path)
+
+    def close(self):
+        """Stops the heartbeat and releases all held leases."""
+        self.stopped.set()
+        self.heartbeat_thread.join()
+        with self.lock:
+            jobs = list(self.held_leases.keys())
+        for job in jobs:
+            self.release(job)
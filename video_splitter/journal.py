@@ -0,0 +1,187 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# A journal of the work done in an output directory which allows resuming an
+# interrupted run. It's a file of JSON records (one per line) which is only
+# appended to and synced after every record, so that a crash loses at most the
+# record which was being written. Detected scene changes are recorded per input
+# file (with size and modification time of the input file in order to ignore
+# them if the file changed and with the identity of the analysis in order to
+# ignore them if the detector or its parameters changed) and completed clips
+# with their size and modification time (and SHA-1 hash if requested), so that
+# truncated or replaced clips can be recognized without reading them.
+#
+# Appending to one file isn't safe across hosts on a network filesystem, so
+# that processes which share an output directory (through a job queue) append
+# to a journal file of their own and read the ones of all processes.
+
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+journal_file_name = ".video-splitter-journal"
+hash_block_size = 1024*1024
+
+def hash_file(file_path):
+    file_hash = hashlib.sha1()
+    with open(file_path, "rb") as file0:
+        while True:
+            block = file0.read(hash_block_size)
+            if not block:
+                break
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+class Journal:
+    def __init__(self, output_dir_path, analysis_identity, verify_hashes=False, shared=False):
+        """Opens the journal in `output_dir_path` and reads the records of
+        previous runs if there're any.
+        @args analysis_identity a string identifying the scene detection which
+        is stored with recorded scene changes (scene changes recorded with
+        another identity are ignored)
+        @args verify_hashes whether the SHA-1 hash of every clip is recorded
+        and compared in `isClipComplete` which reads every clip completely
+        (otherwise only size and modification time are compared)
+        @args shared whether other processes (possibly on other hosts) write
+        into `output_dir_path` at the same time, in which case this process
+        appends to a journal file of its own"""
+        self.analysis_identity = analysis_identity
+        self.verify_hashes = verify_hashes
+        self.lock = threading.Lock()
+        self.shots = {} # input file path -> record
+        self.clips = {} # clip file name -> record
+        journal_file_paths = [os.path.join(output_dir_path, file_name) for file_name in os.listdir(output_dir_path) if file_name == journal_file_name or file_name.startswith(journal_file_name+".")]
+        journal_file_paths.sort(key=os.path.getmtime) # the records of the most recently written journal win
+        for journal_file_path in journal_file_paths:
+            self.__read__(journal_file_path)
+        if len(journal_file_paths) > 0:
+            logger.info("read %d detection result(s) and %d completed clip(s) from %d journal file(s) in '%s'" % (len(self.shots), len(self.clips), len(journal_file_paths), output_dir_path, ))
+        if shared is True:
+            self.journal_file_path = os.path.join(output_dir_path, "%s.%s-%d" % (journal_file_name, socket.gethostname(), os.getpid(), ))
+        else:
+            self.journal_file_path = os.path.join(output_dir_path, journal_file_name)
+        incomplete_line = os.path.exists(self.journal_file_path) and not self.__endsWithNewline__(self.journal_file_path)
+        self.journal_file = open(self.journal_file_path, "a")
+        if incomplete_line:
+            self.journal_file.write("\n") # don't append the next record to the incomplete one
+
+    def __read__(self, journal_file_path):
+        with open(journal_file_path, "r") as journal_file:
+            for line in journal_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning("ignoring incomplete record '%s' in journal '%s'" % (line.strip(), journal_file_path, )) # the last record if the previous run crashed while writing it
+                    continue
+                if record["type"] == "shots":
+                    self.shots[record["input_file"]] = record
+                elif record["type"] == "clip":
+                    self.clips[record["clip"]] = record
+
+    def __endsWithNewline__(self, journal_file_path):
+        with open(journal_file_path, "rb") as journal_file:
+            journal_file.seek(0, os.SEEK_END)
+            if journal_file.tell() == 0:
+                return True
+            journal_file.seek(-1, os.SEEK_END)
+            return journal_file.read(1) == b"\n"
+
+    def __append__(self, record):
+        with self.lock:
+            self.journal_file.write(json.dumps(record)+"\n")
+            self.journal_file.flush()
+            os.fsync(self.journal_file.fileno())
+
+    def recordShots(self, input_file, detection_result):
+        """Records the scene changes of `input_file`.
+        @args detection_result the dictionary of a `DetectionResult`"""
+        file_stat = os.stat(input_file)
+        record = {"type": "shots", "input_file": input_file, "size": file_stat.st_size, "mtime": file_stat.st_mtime, "analysis_identity": self.analysis_identity, "detection_result": detection_result}
+        self.__append__(record)
+        with self.lock:
+            self.shots[input_file] = record
+
+    def getShots(self, input_file):
+        """@return the dictionary of the recorded `DetectionResult` of
+        `input_file` or `None` if there's none, the file changed since it's
+        been recorded or it's been recorded with another detection"""
+        with self.lock:
+            record = self.shots.get(input_file)
+        if record is None:
+            return None
+        file_stat = os.stat(input_file)
+        if record["size"] != file_stat.st_size or record["mtime"] != file_stat.st_mtime:
+            logger.info("ignoring recorded scene changes of '%s' because it changed" % (input_file, ))
+            return None
+        if record.get("analysis_identity") != self.analysis_identity: # missing in records of older versions
+            logger.info("ignoring recorded scene changes of '%s' because they've been detected with another detector or other parameters" % (input_file, ))
+            return None
+        return record["detection_result"]
+
+    def recordClip(self, clip_file_path):
+        """Records `clip_file_path` as completed."""
+        file_stat = os.stat(clip_file_path)
+        record = {"type": "clip", "clip": os.path.basename(clip_file_path), "size": file_stat.st_size, "mtime": file_stat.st_mtime}
+        if self.verify_hashes is True:
+            record["sha1"] = hash_file(clip_file_path)
+        self.__append__(record)
+        with self.lock:
+            self.clips[record["clip"]] = record
+
+    def isClipComplete(self, clip_file_path):
+        """@return `True` if `clip_file_path` has been recorded as completed
+        and still has the recorded size and modification time (and hash if
+        `verify_hashes` is `True`), `False` otherwise"""
+        with self.lock:
+            record = self.clips.get(os.path.basename(clip_file_path))
+        if record is None or not os.path.exists(clip_file_path):
+            return False
+        file_stat = os.stat(clip_file_path)
+        matches = file_stat.st_size == record["size"]
+        if matches and "mtime" in record:
+            matches = file_stat.st_mtime == record["mtime"]
+        if matches and (self.verify_hashes is True or "mtime" not in record) and "sha1" in record: # records of older versions only have the hash
+            matches = hash_file(clip_file_path) == record["sha1"]
+        if not matches:
+            logger.info("clip '%s' doesn't match the journal (probably truncated)" % (clip_file_path, ))
+            return False
+        return True
+
+    def close(self):
+        with self.lock:
+            self.journal_file.close()
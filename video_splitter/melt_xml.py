@@ -0,0 +1,71 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# Incremental parsing of the XML which melt's `xml` consumer writes. With
+# `all=1` the document contains properties for every frame of long sources, so
+# it's parsed from the pipe while it's read and parsed elements are discarded
+# immediately instead of building a tree of the complete document.
+
+import collections
+import xml.etree.cElementTree as ElementTree
+
+# `shot_change_list` is the value of the property with the same name (`None` if
+# there's none) and `producer_outs` the list of `out` attributes of the
+# producers which have been read
+MeltXmlSummary = collections.namedtuple("MeltXmlSummary", ["shot_change_list", "producer_outs"])
+
+def parse_melt_xml(stream, stop_at_shot_change_list=True):
+    """Reads melt XML from the file object `stream` incrementally.
+    @args stop_at_shot_change_list stop reading as soon as the
+    `shot_change_list` property has been read (producers after it are not
+    included in the result then)
+    @return a `MeltXmlSummary`
+    """
+    shot_change_list = None
+    producer_outs = []
+    depth = 0
+    root = None
+    for event, element in ElementTree.iterparse(stream, events=("start", "end", )):
+        if event == "start":
+            if root is None:
+                root = element
+            depth += 1
+            if element.tag == "producer":
+                producer_outs.append(element.get("out"))
+            continue
+        depth -= 1
+        if element.tag == "property" and element.get("name") == "shot_change_list": # <property name="shot_change_list"> is sometimes in playlist and sometimes in producer
+            shot_change_list = element.text
+            if stop_at_shot_change_list is True:
+                break
+        if element.tag == "property":
+            element.clear() # properties are the leaves which carry the bulk of the data
+        if depth == 1:
+            root.clear() # drops the references to the completely parsed top-level elements
+    return MeltXmlSummary(shot_change_list, producer_outs)
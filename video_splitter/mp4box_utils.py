@@ -0,0 +1,152 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# Helpers to cut ISO media files (MP4, MOV, 3GP) with `MP4Box` without
+# re-encoding. Cuts without re-encoding are only possible at keyframes (random
+# access points), so that scene changes are snapped to the nearest keyframe.
+
+import bisect
+import logging
+import os
+import subprocess as sp
+import xml.etree.cElementTree as ElementTree
+import tracing
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+mp4box_default = "MP4Box"
+
+def retrieve_keyframes(mp4box, input_file):
+    """Retrieves the frame rate, the number of frames and the indices of the
+    keyframes of the first video track of `input_file` from the ISO box
+    structure dumped by `MP4Box -diso` (the dump is parsed while it's read
+    because the sample tables of long files are large).
+    @return a tuple of the frame rate, the frame count and a sorted list of
+    keyframe indices starting at 0
+    """
+    mp4box_cmds = [mp4box, "-std", "-diso", input_file, ]
+    logger.debug("retrieving keyframes of '%s' with %s" % (input_file, str(mp4box_cmds), ))
+    mp4box_process = sp.Popen(mp4box_cmds, stdout=sp.PIPE, stderr=open(os.devnull, "w"))
+    video_track = None
+    track = None
+    for event, element in ElementTree.iterparse(mp4box_process.stdout, events=("start", "end", )):
+        if event == "start":
+            if element.tag == "TrackBox":
+                track = {"handler": None, "timescale": None, "sample_deltas": [], "frame_count": 0, "keyframes": None}
+            continue
+        if track is None:
+            element.clear()
+            continue
+        if element.tag == "HandlerBox":
+            track["handler"] = element.get("hdlrType")
+        elif element.tag == "MediaHeaderBox":
+            track["timescale"] = int(element.get("TimeScale"))
+        elif element.tag == "TimeToSampleEntry":
+            sample_count = int(element.get("SampleCount"))
+            track["sample_deltas"].append(int(element.get("SampleDelta")))
+            track["frame_count"] += sample_count
+        elif element.tag == "SyncSampleEntry":
+            if track["keyframes"] is None:
+                track["keyframes"] = []
+            track["keyframes"].append(int(element.get("sampleNumber"))-1)
+        elif element.tag == "TrackBox":
+            if track["handler"] == "vide" and video_track is None:
+                video_track = track
+            track = None
+        element.clear()
+    mp4box_process.stdout.close()
+    tracing.wait_process(mp4box_process)
+    if mp4box_process.returncode != 0:
+        raise RuntimeError("MP4Box process '%s' failed with returncode %d" % (str(mp4box_cmds), mp4box_process.returncode, ))
+    if video_track is None or video_track["timescale"] is None or len(video_track["sample_deltas"]) == 0:
+        raise ValueError("'%s' doesn't contain a video track with timing information" % (input_file, ))
+    fps = video_track["timescale"]/float(video_track["sample_deltas"][0])
+    keyframes = video_track["keyframes"]
+    if keyframes is None:
+        keyframes = range(video_track["frame_count"]) # no sync sample box means that every sample is a keyframe
+    return fps, video_track["frame_count"], sorted(keyframes)
+
+def snap_to_keyframe(frame, keyframes):
+    """@return the keyframe in the sorted list `keyframes` which is closest to
+    `frame` (the earlier one if two keyframes are equally close)"""
+    index = bisect.bisect_left(keyframes, frame)
+    if index == 0:
+        return keyframes[0]
+    if index == len(keyframes):
+        return keyframes[-1]
+    before = keyframes[index-1]
+    after = keyframes[index]
+    if after-frame < frame-before:
+        return after
+    return before
+
+def snap_cuts(frames, keyframes, fps, description):
+    """Moves the scene changes in the sorted list `frames` (whose first
+    element is the start of the first scene and whose last element is the end
+    marker) to the closest keyframe in the sorted list `keyframes`. The first
+    and the last element are kept, so that the part after the last keyframe
+    isn't lost. Scenes which don't contain a keyframe are merged into the
+    previous scene.
+    @return the list of cuts"""
+    if len(frames) < 2:
+        return list(frames)
+    cuts = [frames[0]]
+    for frame in frames[1:-1]:
+        keyframe = snap_to_keyframe(frame, keyframes)
+        if keyframe != frame:
+            logger.info("moved cut of '%s' at frame %d to keyframe %d (%+d frames, %+.3f s)" % (description, frame, keyframe, keyframe-frame, (keyframe-frame)/fps, ))
+        if keyframe <= cuts[-1] or keyframe >= frames[-1]:
+            logger.info("skipping scene of '%s' starting at frame %d because it doesn't contain a keyframe" % (description, frame, ))
+            continue
+        cuts.append(keyframe)
+    cuts.append(frames[-1])
+    return cuts
+
+def extract(mp4box, input_file, start_frame, end_frame, fps, output_file_path):
+    """Copies the frames from `start_frame` to `end_frame` (inclusive) of
+    `input_file` with the frame rate `fps` to `output_file_path` without
+    re-encoding. `start_frame` should be a keyframe."""
+    # MP4Box moves the start back to the previous keyframe, so the start is
+    # passed a quarter of a frame after the keyframe (at the exact time it
+    # might be rounded before it which costs a whole GOP) and the end half a
+    # frame after the start of the last frame (not at the start of the next
+    # one); the times are passed with full precision because rates like
+    # 30000/1001 aren't representable with the 6 decimals of `%f`
+    start_time = (start_frame+0.25)/fps
+    end_time = (end_frame+0.5)/fps
+    mp4box_cmds = [mp4box, "-splitx", "%.9f:%.9f" % (start_time, end_time, ), input_file, "-out", output_file_path, ]
+    logger.debug("extracting frame %d to frame %d of '%s' into '%s' with %s" % (start_frame, end_frame, input_file, output_file_path, str(mp4box_cmds), ))
+    mp4box_process = sp.Popen(mp4box_cmds, stdout=sp.PIPE, stderr=sp.PIPE)
+    mp4box_process_stderr = tracing.communicate(mp4box_process)[1]
+    if mp4box_process.returncode != 0:
+        raise RuntimeError("MP4Box process failed with returncode %d and output:\n%s" % (mp4box_process.returncode, mp4box_process_stderr, ))
@@ -0,0 +1,155 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# Runs subprocesses without buffering their output in memory: stderr is read
+# while the process runs and only its last lines are kept in a bounded ring
+# buffer for error messages. The progress which melt writes to stderr with
+# `-progress` is parsed on the fly and passed to a callback. Processes whose
+# stdout is read by the caller (e.g. scene detection) get a thread which reads
+# stderr.
+
+import collections
+import logging
+import os
+import re
+import subprocess as sp
+import threading
+import tracing
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+stderr_tail_size_default = 16*1024 # bytes
+read_size = 4096
+# melt overwrites the line with carriage returns
+melt_progress_pattern = re.compile(br"Current Frame:\s*(\d+), percentage:\s*(\d+)")
+line_separator_pattern = re.compile(br"[\r\n]")
+
+ProcessResult = collections.namedtuple("ProcessResult", ["returncode", "stderr_tail"])
+
+def __read_lines__(stream, line_callback, stderr_tail_size):
+    """Reads `stream` line by line until it ends (see `run`).
+    @return the last `stderr_tail_size` bytes of the kept lines"""
+    tail = collections.deque()
+    tail_size = 0
+    pending = b""
+    stream_fd = stream.fileno()
+    while True:
+        chunk = os.read(stream_fd, read_size)
+        if not chunk:
+            lines = [pending] if len(pending) > 0 else []
+        else:
+            lines = line_separator_pattern.split(pending+chunk)
+            pending = lines.pop() # incomplete
+        for line in lines:
+            if len(line) == 0:
+                continue
+            if line_callback is not None and line_callback(line) is False:
+                continue
+            tail.append(line)
+            tail_size += len(line)+1
+            while tail_size > stderr_tail_size and len(tail) > 1:
+                tail_size -= len(tail.popleft())+1
+        if not chunk:
+            break
+    stream.close()
+    return b"\n".join(tail).decode("utf-8", "replace")
+
+def run(cmds, line_callback=None, stderr_tail_size=stderr_tail_size_default):
+    """Runs `cmds` with stdout discarded and reads stderr line by line (lines
+    are separated by newlines or carriage returns) while the process runs.
+    `line_callback` is invoked with every line and returns whether the line
+    should be kept for the error message (e.g. `False` for progress lines).
+    The process is reaped with `tracing.wait_process`.
+    @return a `ProcessResult` with the exit code and the last
+    `stderr_tail_size` bytes of the kept lines
+    """
+    with open(os.devnull, "w") as devnull:
+        process = sp.Popen(cmds, stdout=devnull, stderr=sp.PIPE)
+    stderr_tail = __read_lines__(process.stderr, line_callback, stderr_tail_size)
+    tracing.wait_process(process)
+    return ProcessResult(process.returncode, stderr_tail)
+
+class PipedProcess:
+    """Runs `cmds` with stdout as a pipe which the caller reads from `stdout`
+    and reads stderr like `run` in a background thread, so that neither pipe
+    can fill up while the other one is read."""
+
+    def __init__(self, cmds, line_callback=None, stderr_tail_size=stderr_tail_size_default):
+        self.process = sp.Popen(cmds, stdout=sp.PIPE, stderr=sp.PIPE)
+        self.stdout = self.process.stdout
+        self.stderr_tail = None
+        self.stderrThread = threading.Thread(target=self.__readStderr__, args=(line_callback, stderr_tail_size, ))
+        self.stderrThread.daemon = True
+        self.stderrThread.start()
+
+    def __readStderr__(self, line_callback, stderr_tail_size):
+        self.stderr_tail = __read_lines__(self.process.stderr, line_callback, stderr_tail_size)
+
+    def wait(self, output_discarded=False):
+        """Closes `stdout` (the process might still be writing output which the
+        caller doesn't need) and reaps the process with
+        `tracing.wait_process` in the calling thread.
+        @args output_discarded whether the caller stopped reading `stdout`
+        before its end on purpose (see `tracing.wait_process`)
+        @return a `ProcessResult`"""
+        self.stdout.close()
+        self.stderrThread.join()
+        tracing.wait_process(self.process, output_discarded)
+        return ProcessResult(self.process.returncode, self.stderr_tail)
+
+def __melt_line_callback__(progress_callback):
+    def __line_callback__(line):
+        match = melt_progress_pattern.search(line)
+        if match is None:
+            return True
+        if progress_callback is not None:
+            progress_callback(int(match.group(1)), int(match.group(2)))
+        return False
+    return __line_callback__
+
+def __progress_cmds__(cmds):
+    return cmds[:1]+["-progress", ]+cmds[1:]
+
+def run_melt(cmds, progress_callback=None, stderr_tail_size=stderr_tail_size_default):
+    """Runs the melt command `cmds` (starting with the binary) with
+    `-progress` and invokes `progress_callback` with the current frame
+    (relative to the `in` point) and the percentage of every progress line.
+    @return a `ProcessResult` whose stderr tail doesn't contain the progress
+    lines"""
+    return run(__progress_cmds__(cmds), __melt_line_callback__(progress_callback), stderr_tail_size)
+
+def popen_melt(cmds, progress_callback=None, stderr_tail_size=stderr_tail_size_default):
+    """Starts the melt command `cmds` like `run_melt` whose output the caller
+    reads from stdout (e.g. the result of a scene detection).
+    @return a `PipedProcess`"""
+    return PipedProcess(__progress_cmds__(cmds), __melt_line_callback__(progress_callback), stderr_tail_size)
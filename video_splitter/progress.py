@@ -0,0 +1,153 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# Aggregates the progress of the running tasks (one per input file) into the
+# progress of the whole batch, computes frames per second and the estimated
+# remaining time and reports them on the console (throttled) and to an
+# optional callback. A task consists of parts which can run concurrently (the
+# scene detection and the encoding of every clip) and whose frames add up to
+# the frames of the task. The total number of frames grows while files are
+# being analysed, so that the estimate only covers the work which is known at
+# the time.
+
+import collections
+import datetime
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+log_interval_default = 10 # seconds
+
+# `part` is the part of `task` which reported the progress; `task_fps` and
+# `fps` are `None` and `task_eta` and `eta` (in seconds) are `None` until
+# enough frames have been processed
+Progress = collections.namedtuple("Progress", ["task", "part", "task_frames", "task_total_frames", "task_fps", "task_eta", "frames", "total_frames", "fps", "eta"])
+
+def format_eta(eta):
+    if eta is None:
+        return "unknown"
+    return str(datetime.timedelta(seconds=int(eta)))
+
+class ProgressReporter:
+    def __init__(self, callback=None, log_interval=log_interval_default):
+        """
+        @args callback a function which is invoked with a `Progress` after every update
+        @args log_interval the minimal number of seconds between two progress messages on the console
+        """
+        self.callback = callback
+        self.log_interval = log_interval
+        self.lock = threading.Lock()
+        self.tasks = {} # task -> list of frames done, total frames, start time (`None` before the first update) and a dict of part -> list of frames done and total frames
+        self.frames = 0 # done frames of all tasks
+        self.total_frames = 0
+        self.start = None
+        self.last_log = 0
+
+    def addPart(self, task, part, total_frames):
+        """Adds the part `part` of `total_frames` frames to `task` (which is
+        added to the batch if it's new)."""
+        with self.lock:
+            task_progress = self.tasks.setdefault(task, [0, 0, None, {}])
+            task_progress[3][part] = [0, total_frames]
+            task_progress[1] += total_frames
+            self.total_frames += total_frames
+
+    def update(self, task, part, frame, percentage=None):
+        """Updates the progress of `part` of `task` with the current `frame`
+        (relative to the start of the part) or `percentage` if `frame` exceeds
+        the total frames of the part (in case a process reports absolute
+        frames)."""
+        now = time.time()
+        with self.lock:
+            task_progress = self.tasks.get(task)
+            if task_progress is None:
+                return
+            part_progress = task_progress[3].get(part)
+            if part_progress is None:
+                return
+            part_frames, part_total_frames = part_progress
+            if frame > part_total_frames and percentage is not None:
+                frame = part_total_frames*percentage//100
+            frame = min(frame, part_total_frames)
+            if task_progress[2] is None:
+                task_progress[2] = now
+            if self.start is None:
+                self.start = now
+            if frame > part_frames:
+                part_progress[0] = frame
+                task_progress[0] += frame-part_frames
+                self.frames += frame-part_frames
+            progress = self.__progress__(task, part, now)
+            log = now-self.last_log >= self.log_interval
+            if log:
+                self.last_log = now
+        if log:
+            logger.info("%d of %d frames (%.1f%%) at %s fps, ETA %s; '%s' at %d%% (%s), ETA %s" % (progress.frames, progress.total_frames, 100.0*progress.frames/max(1, progress.total_frames), "%.1f" % (progress.fps, ) if progress.fps is not None else "?", format_eta(progress.eta), task, 100*progress.task_frames//max(1, progress.task_total_frames), part, format_eta(progress.task_eta), ))
+        if self.callback is not None:
+            self.callback(progress)
+
+    def finishPart(self, task, part):
+        """Counts the remaining frames of `part` of `task` as done (also if it
+        failed, so that they don't distort the estimate)."""
+        with self.lock:
+            task_progress = self.tasks.get(task)
+            if task_progress is None:
+                return
+            part_progress = task_progress[3].pop(part, None)
+            if part_progress is not None:
+                task_progress[0] += part_progress[1]-part_progress[0]
+                self.frames += part_progress[1]-part_progress[0]
+
+    def finishTask(self, task):
+        """Counts the remaining frames of all parts of `task` as done and
+        removes it."""
+        with self.lock:
+            task_progress = self.tasks.pop(task, None)
+            if task_progress is not None:
+                self.frames += task_progress[1]-task_progress[0]
+
+    def __progress__(self, task, part, now):
+        task_frames, task_total_frames, task_start, parts = self.tasks[task]
+        task_fps = None
+        task_eta = None
+        if now > task_start and task_frames > 0:
+            task_fps = task_frames/(now-task_start)
+            task_eta = (task_total_frames-task_frames)/task_fps
+        fps = None
+        eta = None
+        if now > self.start and self.frames > 0:
+            fps = self.frames/(now-self.start)
+            eta = (self.total_frames-self.frames)/fps
+        return Progress(task, part, task_frames, task_total_frames, task_fps, task_eta, self.frames, self.total_frames, fps, eta)
@@ -0,0 +1,162 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# Staging of encoded clips in a (fast, local) scratch directory from which
+# they're moved to the output directory once they're complete, so that the
+# output directory never contains partially written clips and slow network
+# storage isn't written with the small random writes of an encoder. Moves
+# between filesystems copy into a hidden temporary file next to the
+# destination which is renamed afterwards, so that they're atomic as well.
+# Encodes are only started if the scratch and the output directory have
+# enough free space for the estimated size of the clip in addition to the
+# clips which are being encoded; otherwise they wait until running encodes
+# finish or fail if nothing is running which could free space.
+
+import errno
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+reserve_default = 64*1024*1024 # bytes which are kept free on every filesystem
+poll_interval = 5 # seconds between two checks of the free space while waiting (other processes might free space as well)
+# encoding might increase the size compared to the fraction of the input file
+estimate_factor = 1.25
+
+def free_space(dir_path):
+    """@return the number of bytes available to unprivileged users on the
+    filesystem of `dir_path`"""
+    statvfs = os.statvfs(dir_path)
+    return statvfs.f_bavail*statvfs.f_frsize
+
+def estimate_clip_size(input_file, frame_count, clip_frame_count, factor=estimate_factor):
+    """Estimates the size of a clip of `clip_frame_count` frames of
+    `input_file` which has `frame_count` frames as the same fraction of the
+    size of `input_file` (multiplied with `factor`). The whole size of
+    `input_file` is assumed if `frame_count` is `None`."""
+    input_size = os.path.getsize(input_file)
+    if frame_count is None or frame_count <= 0:
+        return int(input_size*factor)
+    return int(input_size*factor*min(1.0, float(clip_frame_count)/frame_count))
+
+class ScratchSpace:
+    def __init__(self, output_dir_path, scratch_dir_path=None, reserve=reserve_default):
+        """
+        @args output_dir_path the directory where clips are moved to
+        @args scratch_dir_path the directory where clips are written to before they're moved to `output_dir_path` (clips are written to `output_dir_path` directly if it's `None`)
+        @args reserve the number of bytes which are kept free on every filesystem
+        """
+        self.output_dir_path = output_dir_path
+        if scratch_dir_path is None:
+            self.staging_dir_path = None
+            self.checked_dir_paths = [output_dir_path]
+        else:
+            if not os.path.isdir(scratch_dir_path):
+                raise ValueError("scratch_dir_path '%s' isn't a directory" % (scratch_dir_path, ))
+            self.staging_dir_path = tempfile.mkdtemp(prefix="video-splitter-", dir=scratch_dir_path) # doesn't collide with other processes using the same scratch directory
+            self.checked_dir_paths = [self.staging_dir_path]
+            if os.stat(self.staging_dir_path).st_dev != os.stat(output_dir_path).st_dev:
+                self.checked_dir_paths.append(output_dir_path)
+        self.reserve = reserve
+        self.condition = threading.Condition()
+        self.reserved = 0 # estimated bytes of the running encodes
+        self.running = 0
+
+    def acquire(self, estimated_size, description):
+        """Blocks until there's enough free space for a clip of
+        `estimated_size` bytes and reserves it.
+        @raise RuntimeError if there's not enough free space and no encode is
+        running which might free space"""
+        with self.condition:
+            waiting = False
+            while True:
+                short_dir_paths = [dir_path for dir_path in self.checked_dir_paths if free_space(dir_path)-self.reserved-self.reserve < estimated_size]
+                if len(short_dir_paths) == 0:
+                    break
+                if self.running == 0:
+                    raise RuntimeError("not enough free space in %s for %s (estimated size %.1f MiB plus %.1f MiB reserve)" % (", ".join(["'%s'" % (dir_path, ) for dir_path in short_dir_paths]), description, estimated_size/(1024.0*1024.0), self.reserve/(1024.0*1024.0), ))
+                if not waiting:
+                    logger.info("holding back %s until running encodes finish because %s is short of space" % (description, ", ".join(["'%s'" % (dir_path, ) for dir_path in short_dir_paths]), ))
+                    waiting = True
+                self.condition.wait(poll_interval)
+            self.running += 1
+            self.reserved += estimated_size
+
+    def release(self, estimated_size):
+        """Releases a reservation of `acquire` after the clip has been moved
+        or discarded."""
+        with self.condition:
+            self.running -= 1
+            self.reserved -= estimated_size
+            self.condition.notify_all()
+
+    def stagingPath(self, output_file_path):
+        """@return the path where the clip for `output_file_path` is
+        written to"""
+        if self.staging_dir_path is None:
+            return output_file_path
+        return os.path.join(self.staging_dir_path, os.path.basename(output_file_path))
+
+    def commit(self, staged_file_path, output_file_path):
+        """Moves the complete clip `staged_file_path` to `output_file_path`
+        atomically."""
+        if staged_file_path == output_file_path:
+            return
+        try:
+            os.rename(staged_file_path, output_file_path)
+            return
+        except OSError as ex:
+            if ex.errno != errno.EXDEV:
+                raise
+        partial_file_path = os.path.join(os.path.dirname(output_file_path), ".%s.partial" % (os.path.basename(output_file_path), ))
+        try:
+            shutil.copyfile(staged_file_path, partial_file_path)
+            os.rename(partial_file_path, output_file_path)
+        except:
+            if os.path.exists(partial_file_path):
+                os.remove(partial_file_path)
+            raise
+        os.remove(staged_file_path)
+
+    def discard(self, staged_file_path):
+        """Removes the incomplete clip `staged_file_path` (which is the output
+        file if no scratch directory is used) after a failure."""
+        if os.path.exists(staged_file_path):
+            os.remove(staged_file_path)
+
+    def close(self):
+        if self.staging_dir_path is not None:
+            shutil.rmtree(self.staging_dir_path, ignore_errors=True)
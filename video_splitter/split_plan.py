@@ -0,0 +1,113 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# A split plan describes everything which is needed to create the clips of an
+# input file after the scene detection: the clip boundaries, the names of the
+# output files and the encoding arguments. Plans can be written to a JSON file
+# which can be executed later or on another host (output file names are
+# relative to the output directory) and exported as EDL or MLT XML to inspect
+# the cuts in an editor before anything is encoded.
+
+import collections
+import json
+import os
+import xml.etree.cElementTree as ElementTree
+
+plan_file_version = 1
+plan_modes = ["encode", "single_pass", "copy"]
+fps_default = 25 # melt's default profile, assumed if the frame rate of an input file is unknown
+
+# `start` and `end` are the first and the last frame of the clip
+Clip = collections.namedtuple("Clip", ["start", "end", "output_file_name"])
+# `mode` is one of `plan_modes`, `fps` the frame rate of the container (`None`
+# if it couldn't be read) and `frame_count` the number of frames of the input
+# (`None` if unknown)
+SplitPlan = collections.namedtuple("SplitPlan", ["input_file", "mode", "fps", "frame_count", "clips", "melt_command_tail"])
+
+def dump_json(plans, stream):
+    """Writes the list of `SplitPlan`s `plans` to the file object `stream`."""
+    json.dump({"version": plan_file_version, "plans": [{"input_file": plan.input_file, "mode": plan.mode, "fps": plan.fps, "frame_count": plan.frame_count, "melt_command_tail": plan.melt_command_tail, "clips": [list(clip) for clip in plan.clips]} for plan in plans]}, stream, indent=1)
+
+def load_json(stream):
+    """Reads plans written by `dump_json` from the file object `stream`.
+    @return a list of `SplitPlan`s
+    @raise ValueError if `stream` doesn't contain valid plans"""
+    document = json.load(stream)
+    if not isinstance(document, dict) or document.get("version") != plan_file_version:
+        raise ValueError("unsupported plan file format")
+    plans = []
+    try:
+        for plan in document["plans"]:
+            if plan["mode"] not in plan_modes:
+                raise ValueError("unsupported mode '%s' in plan of '%s'" % (plan["mode"], plan["input_file"], ))
+            plans.append(SplitPlan(plan["input_file"], plan["mode"], plan["fps"], plan["frame_count"], [Clip(int(start), int(end), output_file_name) for start, end, output_file_name in plan["clips"]], plan["melt_command_tail"]))
+    except (KeyError, TypeError) as ex:
+        raise ValueError("invalid plan file: %s" % (str(ex), ))
+    return plans
+
+def __timecode__(frame, fps):
+    fps = int(round(fps))
+    seconds = frame//fps
+    return "%02d:%02d:%02d:%02d" % (seconds//3600, seconds//60%60, seconds%60, frame%fps, )
+
+def to_edl(plans, title="video-splitter"):
+    """Creates a CMX 3600 edit decision list with one event per clip of the
+    list of `SplitPlan`s `plans`. The clips are placed one after another on
+    the record timeline and the names of the input and output file are added
+    as comments.
+    @return the EDL as string"""
+    lines = ["TITLE: %s" % (title, ), "FCM: NON-DROP FRAME", ""]
+    event = 1
+    record_frame = 0
+    for plan in plans:
+        fps = plan.fps or fps_default
+        for clip in plan.clips:
+            length = clip.end-clip.start+1
+            lines.append("%03d  AX       V     C        %s %s %s %s" % (event, __timecode__(clip.start, fps), __timecode__(clip.end+1, fps), __timecode__(record_frame, fps), __timecode__(record_frame+length, fps), ))
+            lines.append("* FROM CLIP NAME: %s" % (os.path.basename(plan.input_file), ))
+            lines.append("* TO CLIP NAME: %s" % (clip.output_file_name, ))
+            lines.append("")
+            event += 1
+            record_frame += length
+    return "\n".join(lines)
+
+def to_mlt(plans):
+    """Creates an MLT XML document with a producer and a playlist of its
+    clips for every `SplitPlan` in `plans` which can be opened with `melt` or
+    Shotcut.
+    @return the document as string"""
+    root = ElementTree.Element("mlt", {"LC_NUMERIC": "C"})
+    for index, plan in enumerate(plans):
+        producer = ElementTree.SubElement(root, "producer", {"id": "producer%d" % (index, )})
+        ElementTree.SubElement(producer, "property", {"name": "resource"}).text = plan.input_file
+        playlist = ElementTree.SubElement(root, "playlist", {"id": "playlist%d" % (index, )})
+        for clip in plan.clips:
+            entry = ElementTree.SubElement(playlist, "entry", {"producer": "producer%d" % (index, ), "in": str(clip.start), "out": str(clip.end)})
+            ElementTree.SubElement(entry, "property", {"name": "video_splitter.output_file_name"}).text = clip.output_file_name
+    return ElementTree.tostring(root, encoding="utf-8")
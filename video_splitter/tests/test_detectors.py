@@ -0,0 +1,146 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from video_splitter import detectors
+
+width = 8
+height = 4
+
+def create_frames(scenes):
+    """@return the raw 8-bit grayscale frames of `width` times `height` pixels
+    for a list of tuples of a number of frames and their brightness"""
+    return b"".join([chr(brightness)*(width*height*frame_count) for frame_count, brightness in scenes])
+
+scenes = [(10, 0), (7, 255), (5, 128), ] # scene changes at frame 10 and 17, 22 frames
+
+@unittest.skipIf(detectors.numpy is None, "NumPy isn't installed")
+class DetectCutsTest(unittest.TestCase):
+    def test_cuts(self):
+        self.assertEqual(detectors.detect_cuts(io.BytesIO(create_frames(scenes)), width, height), ([0, 10, 17, 22], 22))
+
+    def test_cuts_across_batches(self):
+        for batch_size in [1, 3, 4, 10, 22, 23, ]:
+            self.assertEqual(detectors.detect_cuts(io.BytesIO(create_frames(scenes)), width, height, batch_size=batch_size), ([0, 10, 17, 22], 22))
+
+    def test_step(self):
+        # only frames 0, 3, 6, ... are compared, so a cut is reported at the
+        # first sampled frame of the new scene
+        for batch_size in [2, 4, 256, ]:
+            self.assertEqual(detectors.detect_cuts(io.BytesIO(create_frames(scenes)), width, height, batch_size=batch_size, step=3), ([0, 12, 18, 22], 22))
+
+    def test_no_cut(self):
+        self.assertEqual(detectors.detect_cuts(io.BytesIO(create_frames([(5, 40), ])), width, height), ([0, 5], 5))
+
+    def test_similar_frames(self):
+        # brightness 40 and 41 fall into the same of the 32 bins
+        self.assertEqual(detectors.detect_cuts(io.BytesIO(create_frames([(5, 40), (5, 41), ])), width, height), ([0, 10], 10))
+
+    def test_empty_stream(self):
+        self.assertEqual(detectors.detect_cuts(io.BytesIO(b""), width, height), ([], 0))
+
+    def test_incomplete_frame(self):
+        self.assertEqual(detectors.detect_cuts(io.BytesIO(create_frames(scenes)+b"\0"*(width*height-1)), width, height), ([0, 10, 17, 22], 22))
+
+    def test_invalid_bins(self):
+        self.assertRaises(ValueError, detectors.detect_cuts, io.BytesIO(b""), width, height, bins=30)
+
+@unittest.skipIf(detectors.numpy is None, "NumPy isn't installed")
+class NumpyDetectorTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir_path = tempfile.mkdtemp()
+        frames_file_path = os.path.join(self.tmp_dir_path, "frames")
+        with open(frames_file_path, "wb") as frames_file:
+            frames_file.write(create_frames(scenes))
+        self.melt = os.path.join(self.tmp_dir_path, "melt")
+        with open(self.melt, "w") as melt_file:
+            melt_file.write("#!/bin/sh\nexec cat '%s'\n" % (frames_file_path, )) # ignores the arguments
+        os.chmod(self.melt, os.stat(self.melt).st_mode | stat.S_IXUSR)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir_path)
+
+    def test_detect(self):
+        detector = detectors.NumpyDetector(self.melt, width=width, height=height)
+        self.assertEqual(detector.detect("input.avi"), detectors.DetectionResult([0, 10, 17, 22], 21))
+
+    def test_progress(self):
+        # more output on stderr than a pipe buffers while stdout is read
+        frames_file_path = os.path.join(self.tmp_dir_path, "frames")
+        with open(self.melt, "w") as melt_file:
+            melt_file.write("#!/bin/sh\nprintf 'Current Frame:         11, percentage:         50\\r' >&2\nhead -c 1000000 /dev/zero | tr '\\0' 'x' >&2\nexec cat '%s'\n" % (frames_file_path, ))
+        detector = detectors.NumpyDetector(self.melt, width=width, height=height)
+        progress = []
+        self.assertEqual(detector.detect("input.avi", progress_callback=lambda frame, percentage: progress.append((frame, percentage))), detectors.DetectionResult([0, 10, 17, 22], 21))
+        self.assertEqual(progress, [(11, 50)])
+
+    def test_failure(self):
+        with open(self.melt, "w") as melt_file:
+            melt_file.write("#!/bin/sh\necho 'invalid input' >&2\nexit 1\n")
+        detector = detectors.NumpyDetector(self.melt, width=width, height=height)
+        self.assertEqual(detector.detect("input.avi"), None)
+
+class StaticDetector(detectors.Detector):
+    name = "static"
+
+    def __init__(self, detection_result):
+        self.detection_result = detection_result
+
+    def detectFrames(self, input_file, in_frame, out_frame, progress_callback):
+        return self.detection_result
+
+class NormalizationTest(unittest.TestCase):
+    def test_markers_added(self):
+        # like the `shot_change_list` of melt
+        self.assertEqual(StaticDetector(detectors.DetectionResult([17, 10, 10], 21)).detect("input.avi"), detectors.DetectionResult([0, 10, 17, 22], 21))
+
+    def test_markers_kept(self):
+        self.assertEqual(StaticDetector(detectors.DetectionResult([0, 10, 17, 22], 21)).detect("input.avi"), detectors.DetectionResult([0, 10, 17, 22], 21))
+
+    def test_unknown_frame_count(self):
+        self.assertEqual(StaticDetector(detectors.DetectionResult([10, 17], None)).detect("input.avi"), detectors.DetectionResult([0, 10, 17], None))
+
+    def test_no_scene_change(self):
+        self.assertEqual(StaticDetector(detectors.DetectionResult([0, 22], 21)).detect("input.avi"), detectors.DetectionResult(None, 21))
+
+    def test_failure(self):
+        self.assertEqual(StaticDetector(None).detect("input.avi"), None)
+
+    def test_scene_changes(self):
+        self.assertEqual(detectors.scene_changes(detectors.DetectionResult([0, 10, 17, 22], 21)), [10, 17])
+        self.assertEqual(detectors.scene_changes(detectors.DetectionResult([0, 10, 17], None)), [10, 17])
+        self.assertEqual(detectors.scene_changes(detectors.DetectionResult(None, 21)), [])
+
+if __name__ == "__main__":
+    unittest.main()
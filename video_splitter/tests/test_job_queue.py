@@ -0,0 +1,191 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from video_splitter import job_queue
+
+lease_timeout = 1.0
+worker_count = 8
+job_count = 40
+
+def work(queue_dir_path, processed_dir_path, jobs, deadline):
+    """Processes `jobs` from the queue in `queue_dir_path` until all of them
+    are done by recording the process in a file per job in
+    `processed_dir_path`."""
+    jobQueue = job_queue.JobQueue(queue_dir_path, lease_timeout)
+    try:
+        while time.time() < deadline and not all([jobQueue.isDone(job) for job in jobs]):
+            for job in jobs:
+                if not jobQueue.claim(job):
+                    continue
+                with open(os.path.join(processed_dir_path, job), "a") as processed_file:
+                    processed_file.write("%d\n" % (os.getpid(), ))
+                time.sleep(0.01)
+                jobQueue.complete(job)
+            time.sleep(0.05) # wait for leases of other workers to expire
+    finally:
+        jobQueue.close()
+
+class JobQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir_path = tempfile.mkdtemp()
+        self.queue_dir_path = os.path.join(self.tmp_dir_path, "queue")
+        self.processed_dir_path = os.path.join(self.tmp_dir_path, "processed")
+        os.makedirs(self.processed_dir_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir_path)
+
+    def __abandonLease__(self, jobQueue, job, age):
+        """Creates a lease of `job` of a process which died `age` seconds ago."""
+        lease_file_path = jobQueue.__leaseFilePath__(job)
+        with open(lease_file_path, "w") as lease_file:
+            json.dump({"job": job, "owner": "dead", "claimed": time.time()-age}, lease_file)
+        os.utime(lease_file_path, (time.time()-age, time.time()-age))
+
+    def __runWorkers__(self, jobs):
+        deadline = time.time()+60
+        workers = [multiprocessing.Process(target=work, args=(self.queue_dir_path, self.processed_dir_path, jobs, deadline)) for i in range(worker_count)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            self.assertEqual(worker.exitcode, 0)
+
+    def __assertProcessedOnce__(self, jobs):
+        for job in jobs:
+            processed_file_path = os.path.join(self.processed_dir_path, job)
+            self.assertTrue(os.path.exists(processed_file_path), "job '%s' hasn't been processed" % (job, ))
+            with open(processed_file_path, "r") as processed_file:
+                self.assertEqual(len(processed_file.readlines()), 1, "job '%s' has been processed more than once" % (job, ))
+
+    def test_claim(self):
+        jobQueue = job_queue.JobQueue(self.queue_dir_path, lease_timeout)
+        otherJobQueue = job_queue.JobQueue(self.queue_dir_path, lease_timeout)
+        try:
+            self.assertTrue(jobQueue.claim("a"))
+            self.assertFalse(otherJobQueue.claim("a"))
+            jobQueue.release("a")
+            self.assertTrue(otherJobQueue.claim("a"))
+            otherJobQueue.complete("a")
+            self.assertTrue(jobQueue.isDone("a"))
+            self.assertFalse(jobQueue.claim("a"))
+        finally:
+            jobQueue.close()
+            otherJobQueue.close()
+
+    def test_live_lease_kept(self):
+        # the heartbeat keeps the lease alive longer than `lease_timeout`
+        jobQueue = job_queue.JobQueue(self.queue_dir_path, lease_timeout)
+        otherJobQueue = job_queue.JobQueue(self.queue_dir_path, lease_timeout)
+        try:
+            self.assertTrue(jobQueue.claim("a"))
+            time.sleep(lease_timeout*2)
+            self.assertFalse(otherJobQueue.claim("a"))
+        finally:
+            jobQueue.close()
+            otherJobQueue.close()
+
+    def test_abandoned_lease_reclaimed(self):
+        jobQueue = job_queue.JobQueue(self.queue_dir_path, lease_timeout)
+        try:
+            self.__abandonLease__(jobQueue, "a", 0)
+            self.assertFalse(jobQueue.claim("a"))
+            self.__abandonLease__(jobQueue, "a", lease_timeout*2)
+            self.assertTrue(jobQueue.claim("a"))
+            self.assertEqual(os.listdir(jobQueue.lease_dir_path), [os.path.basename(jobQueue.__leaseFilePath__("a")), ]) # no leftovers of the reclaim
+        finally:
+            jobQueue.close()
+
+    def __interleave__(self, function_name, interleaved):
+        """Replaces `os.<function_name>` so that `interleaved` is called before
+        its next invokation."""
+        function = getattr(os, function_name)
+        def __function__(*args):
+            setattr(os, function_name, function)
+            interleaved()
+            return function(*args)
+        setattr(os, function_name, __function__)
+        self.addCleanup(setattr, os, function_name, function)
+
+    def test_reclaim_race(self):
+        # another process reclaims the abandoned lease and claims the job
+        # between the check of the lease and its rename by `jobQueue`
+        jobQueues = [job_queue.JobQueue(self.queue_dir_path, lease_timeout) for i in range(2)]
+        try:
+            self.__abandonLease__(jobQueues[0], "a", lease_timeout*2)
+            self.__interleave__("rename", lambda: self.assertTrue(jobQueues[1].claim("a")))
+            self.assertFalse(jobQueues[0].claim("a"))
+            self.assertEqual(jobQueues[0].__leaseOwner__(jobQueues[0].__leaseFilePath__("a")), jobQueues[1].owner) # put back
+        finally:
+            for jobQueue in jobQueues:
+                jobQueue.close()
+
+    def test_reclaim_race_claimed_meanwhile(self):
+        # like `test_reclaim_race`, but a third process claims the job while
+        # the lease is put back
+        jobQueues = [job_queue.JobQueue(self.queue_dir_path, lease_timeout, heartbeat_interval=0.05) for i in range(3)]
+        try:
+            self.__abandonLease__(jobQueues[0], "a", lease_timeout*2)
+            self.__interleave__("rename", lambda: self.assertTrue(jobQueues[1].claim("a")))
+            self.__interleave__("link", lambda: self.assertTrue(jobQueues[2].claim("a")))
+            self.assertFalse(jobQueues[0].claim("a"))
+            self.assertEqual(jobQueues[0].__leaseOwner__(jobQueues[0].__leaseFilePath__("a")), jobQueues[2].owner) # not replaced
+            time.sleep(0.2)
+            self.assertFalse("a" in jobQueues[1].held_leases) # the loss has been noticed by the heartbeat
+        finally:
+            for jobQueue in jobQueues:
+                jobQueue.close()
+
+    def test_workers(self):
+        jobs = ["job-%03d" % (i, ) for i in range(job_count)]
+        self.__runWorkers__(jobs)
+        self.__assertProcessedOnce__(jobs)
+
+    def test_workers_with_abandoned_leases(self):
+        # all workers compete for reclaiming the abandoned leases at once
+        jobs = ["job-%03d" % (i, ) for i in range(job_count)]
+        jobQueue = job_queue.JobQueue(self.queue_dir_path, lease_timeout)
+        for job in jobs[::2]:
+            self.__abandonLease__(jobQueue, job, lease_timeout*2)
+        for job in jobs[1::4]:
+            self.__abandonLease__(jobQueue, job, lease_timeout/2.0) # expire while the workers run
+        jobQueue.close()
+        self.__runWorkers__(jobs)
+        self.__assertProcessedOnce__(jobs)
+        self.assertEqual(os.listdir(jobQueue.lease_dir_path), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from video_splitter import journal
+
+detection_result = {"frames": [0, 10, 17, 22], "frame_count": 21}
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir_path = tempfile.mkdtemp()
+        self.input_file = os.path.join(self.output_dir_path, "input.avi")
+        with open(self.input_file, "wb") as input_file:
+            input_file.write(b"input")
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir_path)
+
+    def __reopen__(self, journal0, analysis_identity):
+        journal0.close()
+        return journal.Journal(self.output_dir_path, analysis_identity)
+
+    def test_shots(self):
+        journal0 = journal.Journal(self.output_dir_path, "numpy")
+        journal0.recordShots(self.input_file, detection_result)
+        journal0 = self.__reopen__(journal0, "numpy")
+        self.assertEqual(journal0.getShots(self.input_file), detection_result)
+        journal0.close()
+
+    def test_shots_of_other_detector(self):
+        journal0 = journal.Journal(self.output_dir_path, "numpy")
+        journal0.recordShots(self.input_file, detection_result)
+        journal0 = self.__reopen__(journal0, "motion_est")
+        self.assertEqual(journal0.getShots(self.input_file), None)
+        journal0.recordShots(self.input_file, detection_result)
+        journal0 = self.__reopen__(journal0, "motion_est")
+        self.assertEqual(journal0.getShots(self.input_file), detection_result) # the last record wins
+        journal0.close()
+
+    def test_shots_of_changed_file(self):
+        journal0 = journal.Journal(self.output_dir_path, "numpy")
+        journal0.recordShots(self.input_file, detection_result)
+        with open(self.input_file, "ab") as input_file:
+            input_file.write(b"more input")
+        self.assertEqual(journal0.getShots(self.input_file), None)
+        journal0.close()
+
+    def test_clips(self):
+        clip_file_path = os.path.join(self.output_dir_path, "input.avi-0-9.avi")
+        with open(clip_file_path, "wb") as clip_file:
+            clip_file.write(b"clip")
+        journal0 = journal.Journal(self.output_dir_path, "numpy")
+        journal0.recordClip(clip_file_path)
+        journal0 = self.__reopen__(journal0, "numpy")
+        self.assertTrue(journal0.isClipComplete(clip_file_path))
+        with open(clip_file_path, "wb") as clip_file:
+            clip_file.write(b"cli") # truncated
+        self.assertFalse(journal0.isClipComplete(clip_file_path))
+        journal0.close()
+
+    def __writeClip__(self, content, mtime=None):
+        clip_file_path = os.path.join(self.output_dir_path, "input.avi-0-9.avi")
+        with open(clip_file_path, "wb") as clip_file:
+            clip_file.write(content)
+        if mtime is not None:
+            os.utime(clip_file_path, (mtime, mtime))
+        return clip_file_path
+
+    def test_clip_replaced(self):
+        # same size, but written again
+        clip_file_path = self.__writeClip__(b"clip", 1000000000)
+        journal0 = journal.Journal(self.output_dir_path, "numpy")
+        journal0.recordClip(clip_file_path)
+        self.__writeClip__(b"CLIP", 1000000001)
+        self.assertFalse(journal0.isClipComplete(clip_file_path))
+        journal0.close()
+
+    def test_clips_not_hashed_by_default(self):
+        clip_file_path = self.__writeClip__(b"clip")
+        hash_file = journal.hash_file
+        def __fail__(file_path):
+            raise AssertionError("clip has been hashed")
+        journal.hash_file = __fail__
+        try:
+            journal0 = journal.Journal(self.output_dir_path, "numpy")
+            journal0.recordClip(clip_file_path)
+            self.assertTrue(journal0.isClipComplete(clip_file_path))
+            journal0.close()
+        finally:
+            journal.hash_file = hash_file
+
+    def test_verify_hashes(self):
+        clip_file_path = self.__writeClip__(b"clip", 1000000000)
+        journal0 = journal.Journal(self.output_dir_path, "numpy", verify_hashes=True)
+        journal0.recordClip(clip_file_path)
+        journal0 = self.__reopen__(journal0, "numpy")
+        self.assertTrue(journal0.isClipComplete(clip_file_path)) # the hash is only compared if requested
+        self.__writeClip__(b"CLIP", 1000000000) # corrupted without changing size and modification time
+        self.assertTrue(journal0.isClipComplete(clip_file_path))
+        journal0.close()
+        journal0 = journal.Journal(self.output_dir_path, "numpy", verify_hashes=True)
+        self.assertFalse(journal0.isClipComplete(clip_file_path))
+        journal0.close()
+
+    def test_clip_record_of_older_version(self):
+        # records without modification time are compared by their hash
+        clip_file_path = self.__writeClip__(b"clip")
+        with open(os.path.join(self.output_dir_path, journal.journal_file_name), "w") as journal_file:
+            journal_file.write(json.dumps({"type": "clip", "clip": os.path.basename(clip_file_path), "size": 4, "sha1": journal.hash_file(clip_file_path)})+"\n")
+        journal0 = journal.Journal(self.output_dir_path, "numpy")
+        self.assertTrue(journal0.isClipComplete(clip_file_path))
+        self.__writeClip__(b"CLIP")
+        self.assertFalse(journal0.isClipComplete(clip_file_path))
+        journal0.close()
+
+    def test_shared(self):
+        # every process appends to a file of its own and reads all of them
+        clip_file_path = self.__writeClip__(b"clip")
+        journal0 = journal.Journal(self.output_dir_path, "numpy", shared=True)
+        journal0.recordShots(self.input_file, detection_result)
+        journal0.recordClip(clip_file_path)
+        journal0.close()
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir_path, journal.journal_file_name)))
+        journal0 = journal.Journal(self.output_dir_path, "numpy")
+        self.assertEqual(journal0.getShots(self.input_file), detection_result)
+        self.assertTrue(journal0.isClipComplete(clip_file_path))
+        journal0.close()
+
+    def test_incomplete_record(self):
+        journal0 = journal.Journal(self.output_dir_path, "numpy")
+        journal0.recordShots(self.input_file, detection_result)
+        journal0.close()
+        with open(os.path.join(self.output_dir_path, journal.journal_file_name), "a") as journal_file:
+            journal_file.write('{"type": "cl') # crashed while writing
+        journal0 = journal.Journal(self.output_dir_path, "numpy")
+        self.assertEqual(journal0.getShots(self.input_file), detection_result)
+        journal0.recordShots(self.input_file, detection_result)
+        journal0 = self.__reopen__(journal0, "numpy")
+        self.assertEqual(journal0.getShots(self.input_file), detection_result)
+        journal0.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from video_splitter import mp4box_utils
+
+keyframes = range(0, 250, 50) # a GOP of 50 frames in a file of 250 frames
+
+class SnapCutsTest(unittest.TestCase):
+    def test_tail_after_last_keyframe(self):
+        # frames 200 to 249 follow the last keyframe and belong to the last clip
+        self.assertEqual(mp4box_utils.snap_cuts([0, 60, 230, 250], keyframes, 25.0, "input.mp4"), [0, 50, 200, 250])
+
+    def test_scene_without_keyframe(self):
+        # the scene from 60 to 69 is merged into the previous scene
+        self.assertEqual(mp4box_utils.snap_cuts([0, 60, 70, 150, 250], keyframes, 25.0, "input.mp4"), [0, 50, 150, 250])
+        # a cut which snaps to the first frame or the end is dropped
+        self.assertEqual(mp4box_utils.snap_cuts([0, 10, 250], keyframes, 25.0, "input.mp4"), [0, 250])
+        self.assertEqual(mp4box_utils.snap_cuts([0, 240, 250], [0, 250], 25.0, "input.mp4"), [0, 250])
+
+    def test_cuts_at_keyframes(self):
+        self.assertEqual(mp4box_utils.snap_cuts([0, 50, 100, 250], keyframes, 25.0, "input.mp4"), [0, 50, 100, 250])
+
+    def test_no_scene_change(self):
+        self.assertEqual(mp4box_utils.snap_cuts([0, 250], keyframes, 25.0, "input.mp4"), [0, 250])
+
+class ExtractTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir_path = tempfile.mkdtemp()
+        self.args_file_path = os.path.join(self.tmp_dir_path, "args")
+        self.mp4box = os.path.join(self.tmp_dir_path, "MP4Box")
+        with open(self.mp4box, "w") as mp4box_file:
+            mp4box_file.write("#!/bin/sh\necho \"$@\" > '%s'\n" % (self.args_file_path, ))
+        os.chmod(self.mp4box, os.stat(self.mp4box).st_mode | stat.S_IXUSR)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir_path)
+
+    def test_times_inside_frames(self):
+        # the start has to be after the start of the first frame (MP4Box moves
+        # it back to the previous keyframe) and the end inside the last frame
+        for fps in [25.0, 30000/1001.0, 24000/1001.0, 60000/1001.0, ]:
+            for start_frame, end_frame in [(0, 47), (1001, 2001), (179820, 179999), ]:
+                mp4box_utils.extract(self.mp4box, "input.mp4", start_frame, end_frame, fps, "output.mp4")
+                with open(self.args_file_path, "r") as args_file:
+                    args = args_file.read().split()
+                start_time, end_time = [float(time) for time in args[args.index("-splitx")+1].split(":")]
+                self.assertTrue(start_frame < start_time*fps < start_frame+1)
+                self.assertTrue(end_frame < end_time*fps < end_frame+1)
+
+if __name__ == "__main__":
+    unittest.main()
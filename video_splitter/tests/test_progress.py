@@ -0,0 +1,85 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+import unittest
+from video_splitter import progress
+
+class ProgressReporterTest(unittest.TestCase):
+    def setUp(self):
+        self.progress = []
+        self.reporter = progress.ProgressReporter(self.progress.append)
+
+    def test_parts_add_up(self):
+        # the detection of 100 frames and two clips
+        self.reporter.addPart("a.avi", "detection", 100)
+        self.reporter.addPart("a.avi", "frame 0 to 29", 30)
+        self.reporter.addPart("a.avi", "frame 30 to 99", 70)
+        self.reporter.update("a.avi", "detection", 50, 50)
+        self.reporter.update("a.avi", "frame 0 to 29", 10, 33)
+        self.assertEqual(self.progress[-1][:4], ("a.avi", "frame 0 to 29", 60, 200))
+        self.assertEqual(self.progress[-1].frames, 60)
+        self.assertEqual(self.progress[-1].total_frames, 200)
+
+    def test_files_are_separate_tasks(self):
+        self.reporter.addPart("a.avi", "detection", 100)
+        self.reporter.addPart("b.avi", "detection", 50)
+        self.reporter.update("a.avi", "detection", 40)
+        self.reporter.update("b.avi", "detection", 10)
+        self.assertEqual((self.progress[-1].task_frames, self.progress[-1].task_total_frames), (10, 50))
+        self.assertEqual((self.progress[-1].frames, self.progress[-1].total_frames), (50, 150))
+
+    def test_percentage_of_absolute_frames(self):
+        self.reporter.addPart("a.avi", "frame 100 to 199", 100)
+        self.reporter.update("a.avi", "frame 100 to 199", 150, 50)
+        self.assertEqual(self.progress[-1].task_frames, 50)
+
+    def test_progress_doesnt_decrease(self):
+        self.reporter.addPart("a.avi", "detection", 100)
+        self.reporter.update("a.avi", "detection", 40)
+        self.reporter.update("a.avi", "detection", 30)
+        self.assertEqual(self.progress[-1].task_frames, 40)
+
+    def test_finish(self):
+        self.reporter.addPart("a.avi", "detection", 100)
+        self.reporter.addPart("a.avi", "frame 0 to 99", 100)
+        self.reporter.update("a.avi", "detection", 40)
+        self.reporter.finishPart("a.avi", "detection")
+        self.reporter.update("a.avi", "frame 0 to 99", 10)
+        self.assertEqual(self.progress[-1].task_frames, 110)
+        self.reporter.finishTask("a.avi")
+        self.reporter.addPart("b.avi", "detection", 100)
+        self.reporter.update("b.avi", "detection", 0)
+        self.assertEqual((self.progress[-1].frames, self.progress[-1].total_frames), (200, 300))
+
+    def test_unknown_part(self):
+        self.reporter.update("a.avi", "detection", 40)
+        self.reporter.addPart("a.avi", "detection", 100)
+        self.reporter.update("a.avi", "frame 0 to 99", 40)
+        self.reporter.finishPart("b.avi", "detection")
+        self.assertEqual(self.progress, [])
@@ -0,0 +1,86 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+import unittest
+from video_splitter import video_splitter
+
+class ParseSceneLengthTest(unittest.TestCase):
+    def test_frames(self):
+        self.assertEqual(video_splitter.parse_scene_length("12"), (12, False))
+        self.assertEqual(video_splitter.parse_scene_length(12), (12, False))
+        self.assertEqual(video_splitter.parse_scene_length("0"), (0, False))
+
+    def test_seconds(self):
+        self.assertEqual(video_splitter.parse_scene_length("1.5s"), (1.5, True))
+        self.assertEqual(video_splitter.parse_scene_length(u"2s"), (2.0, True))
+
+    def test_invalid(self):
+        for value in ["-1", "-0.5s", "s", "1.5", "abc", "1m", ]:
+            self.assertRaises(ValueError, video_splitter.parse_scene_length, value)
+
+class ClipBoundariesTest(unittest.TestCase):
+    def test_clips_dont_overlap(self):
+        # single pass and per clip encoding and copying use the same boundaries
+        self.assertEqual(video_splitter.clip_boundaries([0, 30, 60, 100]), [(0, 29), (30, 59), (60, 99)])
+
+    def test_one_scene(self):
+        self.assertEqual(video_splitter.clip_boundaries([0, 100]), [(0, 99)])
+        self.assertEqual(video_splitter.clip_boundaries([0]), [])
+
+class CoalesceSceneChangesTest(unittest.TestCase):
+    def test_nothing_to_coalesce(self):
+        frames = [0, 30, 100, 200]
+        self.assertEqual(video_splitter.coalesce_scene_changes(frames), frames)
+        self.assertEqual(video_splitter.coalesce_scene_changes(frames, min_scene_length=30, merge_tolerance=29), frames)
+
+    def test_min_scene_length(self):
+        # the short scenes starting at 30 and 33 are merged into the following scene
+        self.assertEqual(video_splitter.coalesce_scene_changes([0, 30, 33, 36, 100, 196, 200], min_scene_length=25), [0, 30, 100, 200])
+
+    def test_merge_tolerance(self):
+        self.assertEqual(video_splitter.coalesce_scene_changes([0, 30, 33, 36, 100, 200], merge_tolerance=3), [0, 30, 36, 100, 200])
+        self.assertEqual(video_splitter.coalesce_scene_changes([0, 2, 100, 200], merge_tolerance=2), [0, 100, 200])
+
+    def test_short_last_scene(self):
+        # merged into the previous scene because there's no following one
+        self.assertEqual(video_splitter.coalesce_scene_changes([0, 100, 190, 200], min_scene_length=25), [0, 100, 200])
+        self.assertEqual(video_splitter.coalesce_scene_changes([0, 10, 20], min_scene_length=25), [0, 20])
+
+    def test_first_and_last_kept(self):
+        self.assertEqual(video_splitter.coalesce_scene_changes([0, 5], min_scene_length=25), [0, 5])
+        self.assertEqual(video_splitter.coalesce_scene_changes([0], min_scene_length=25), [0])
+        self.assertEqual(video_splitter.coalesce_scene_changes([], min_scene_length=25), [])
+
+    def test_input_unchanged(self):
+        frames = [0, 30, 33, 100]
+        video_splitter.coalesce_scene_changes(frames, min_scene_length=25)
+        self.assertEqual(frames, [0, 30, 33, 100])
+
+if __name__ == "__main__":
+    unittest.main()
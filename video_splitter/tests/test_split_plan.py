@@ -0,0 +1,93 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+import io
+import json
+import unittest
+import xml.etree.cElementTree as ElementTree
+from video_splitter import split_plan
+
+plans = [
+    split_plan.SplitPlan(u"/videos/input.avi", "encode", 25.0, 4000, [split_plan.Clip(0, 29, u"input.avi-0-29.avi"), split_plan.Clip(30, 1599, u"input.avi-30-1599.avi"), split_plan.Clip(1600, 3999, u"input.avi-1600-3999.avi"), ], ["f=mp4", "ab=256k", ]),
+    split_plan.SplitPlan(u"/videos/input.mp4", "copy", 29.97002997002997, 100, [split_plan.Clip(0, 47, u"input.mp4-0-47.mp4"), split_plan.Clip(48, 99, u"input.mp4-48-99.mp4"), ], []),
+    split_plan.SplitPlan(u"/videos/unknown.avi", "single_pass", None, None, [split_plan.Clip(0, 9, u"unknown.avi-0-9.avi"), ], ["f=mp4", ]),
+]
+
+def parse_timecode(timecode, fps):
+    hours, minutes, seconds, frames = [int(part) for part in timecode.split(":")]
+    return ((hours*60+minutes)*60+seconds)*fps+frames
+
+class SplitPlanTest(unittest.TestCase):
+    def __roundTrip__(self, plans):
+        stream = io.BytesIO()
+        split_plan.dump_json(plans, stream)
+        return split_plan.load_json(io.BytesIO(stream.getvalue()))
+
+    def test_json_round_trip(self):
+        self.assertEqual(self.__roundTrip__(plans), plans)
+
+    def test_json_round_trip_empty(self):
+        self.assertEqual(self.__roundTrip__([]), [])
+
+    def test_json_unsupported_version(self):
+        self.assertRaises(ValueError, split_plan.load_json, io.BytesIO(json.dumps({"version": split_plan.plan_file_version+1, "plans": []})))
+
+    def test_json_unsupported_mode(self):
+        document = json.dumps({"version": split_plan.plan_file_version, "plans": [{"input_file": "input.avi", "mode": "transcode", "fps": None, "frame_count": None, "melt_command_tail": [], "clips": []}]})
+        self.assertRaises(ValueError, split_plan.load_json, io.BytesIO(document))
+
+    def test_json_invalid(self):
+        self.assertRaises(ValueError, split_plan.load_json, io.BytesIO(json.dumps({"version": split_plan.plan_file_version})))
+        self.assertRaises(ValueError, split_plan.load_json, io.BytesIO(json.dumps([])))
+
+    def test_edl(self):
+        # the source timecodes of every event are the clip's frames and the
+        # record timecodes place the clips one after another
+        lines = split_plan.to_edl(plans).split("\n")
+        self.assertEqual(lines[:2], ["TITLE: video-splitter", "FCM: NON-DROP FRAME"])
+        events = [line.split() for line in lines if line[:3].isdigit()]
+        clips = [(plan, clip) for plan in plans for clip in plan.clips]
+        self.assertEqual(len(events), len(clips))
+        record_frame = 0
+        for index, (event, (plan, clip)) in enumerate(zip(events, clips)):
+            fps = int(round(plan.fps or split_plan.fps_default))
+            self.assertEqual(int(event[0]), index+1)
+            self.assertEqual([parse_timecode(timecode, fps) for timecode in event[4:8]], [clip.start, clip.end+1, record_frame, record_frame+clip.end-clip.start+1])
+            record_frame += clip.end-clip.start+1
+        self.assertEqual([line[len("* TO CLIP NAME: "):] for line in lines if line.startswith("* TO CLIP NAME: ")], [clip.output_file_name for plan, clip in clips])
+
+    def test_mlt(self):
+        root = ElementTree.fromstring(split_plan.to_mlt(plans))
+        for index, plan in enumerate(plans):
+            self.assertEqual(root.find("producer[@id='producer%d']/property[@name='resource']" % (index, )).text, plan.input_file)
+            entries = root.findall("playlist[@id='playlist%d']/entry" % (index, ))
+            self.assertEqual([split_plan.Clip(int(entry.get("in")), int(entry.get("out")), entry.find("property").text) for entry in entries], plan.clips)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+import subprocess as sp
+import unittest
+from video_splitter import tracing
+
+class WaitProcessTest(unittest.TestCase):
+    def setUp(self):
+        self.tracer = tracing.Tracer()
+
+    def __summary__(self):
+        return dict([(row[0], row[1:]) for row in self.tracer.summary()])
+
+    def test_output_discarded(self):
+        # `yes` writes until it's killed by SIGPIPE or fails with EPIPE
+        with self.tracer.span("detect", "file"):
+            process = sp.Popen(["yes"], stdout=sp.PIPE)
+            process.stdout.read(4096)
+            process.stdout.close()
+            tracing.wait_process(process, output_discarded=True)
+        self.assertNotEqual(process.returncode, 0)
+        failures, cancellations = self.__summary__()["detect"][-2:]
+        self.assertEqual((failures, cancellations), (0, 1))
+
+    def test_failure(self):
+        # a failed process isn't hidden by a cancelled one in the same span
+        with self.tracer.span("detect", "file"):
+            process = sp.Popen(["sh", "-c", "exit 1"])
+            tracing.wait_process(process)
+            process = sp.Popen(["sh", "-c", "exit 1"])
+            tracing.wait_process(process, output_discarded=True)
+        failures, cancellations = self.__summary__()["detect"][-2:]
+        self.assertEqual((failures, cancellations), (1, 0))
+
+    def test_success(self):
+        with self.tracer.span("probe", "file"):
+            process = sp.Popen(["true"])
+            tracing.wait_process(process)
+        failures, cancellations = self.__summary__()["probe"][-2:]
+        self.assertEqual((failures, cancellations), (0, 0))
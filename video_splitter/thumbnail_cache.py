@@ -0,0 +1,228 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# Extracts a few representative frames of video files in background threads
+# into an on-disk cache, so that the lists of the video manager can show what a
+# clip contains without loading it into the player. Entries are keyed by the
+# path, size and modification time of the file and the least recently used
+# thumbnails are evicted once the cache exceeds its size limit. Requests are
+# served newest first and old requests are dropped if too many are pending, so
+# that the rows which have just been scrolled into view are served first.
+
+import collections
+import hashlib
+import logging
+import os
+import shutil
+import subprocess as sp
+import tempfile
+import threading
+import xml.etree.cElementTree as ElementTree
+import container_index
+import detection_cache
+import melt_xml
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+thumbnail_dir_default = os.path.join(os.path.expanduser("~"), ".cache", "video-splitter", "thumbnails")
+thumbnail_cache_size_default = 64 # MiB
+thumbnail_positions_default = [0.1, 0.5, 0.9] # fractions of the length of a file
+thumbnail_width_default = 96
+thumbnail_height_default = 54
+thumbnail_workers_default = 2
+pending_requests_default = 256
+
+def probe_frame_count(melt, file_path):
+    """Retrieves the number of frames of `file_path` from its container index
+    or from the XML description which melt writes without processing frames.
+    @return the number of frames or `None` if it couldn't be retrieved"""
+    try:
+        index = container_index.read_index(file_path)
+    except (ValueError, EnvironmentError):
+        index = None
+    if index is not None:
+        return index.frame_count
+    melt_process = sp.Popen([melt, file_path, "-consumer", "xml", ], stdout=sp.PIPE, stderr=open(os.devnull, "w"))
+    try:
+        melt_xml_summary = melt_xml.parse_melt_xml(melt_process.stdout, stop_at_shot_change_list=False)
+    except ElementTree.ParseError:
+        melt_xml_summary = None
+    melt_process.stdout.close()
+    melt_process.wait()
+    if melt_process.returncode != 0 or melt_xml_summary is None or len(melt_xml_summary.producer_outs) != 1:
+        return None
+    return int(melt_xml_summary.producer_outs[0])+1
+
+class ThumbnailCache:
+    def __init__(self, cache_dir, max_size, melt, positions=thumbnail_positions_default, width=thumbnail_width_default, height=thumbnail_height_default):
+        """
+        @args cache_dir the directory where thumbnails are stored (created if it doesn't exist)
+        @args max_size the maximal size of all thumbnails in bytes
+        @args melt the melt binary which extracts the frames
+        @args positions the positions of the extracted frames as fractions of the length of a file
+        @args width the width of the thumbnails in pixels
+        @args height the height of the thumbnails in pixels
+        """
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.melt = melt
+        self.positions = positions
+        self.width = width
+        self.height = height
+        self.lock = threading.Lock()
+        self.total_size = None # computed lazily on the first insertion
+
+    def __thumbnailPaths__(self, file_path):
+        file_stat = os.stat(file_path)
+        key = hashlib.sha1()
+        key.update(("%s:%d:%f:%dx%d" % (os.path.abspath(file_path), file_stat.st_size, file_stat.st_mtime, self.width, self.height, )).encode("utf-8"))
+        key = key.hexdigest()
+        return [os.path.join(self.cache_dir, key[:2], "%s-%d.png" % (key, i, )) for i in range(len(self.positions))]
+
+    def get(self, file_path):
+        """@return the list of the paths of the cached thumbnails of
+        `file_path` or `None` if they're not (completely) cached"""
+        thumbnail_paths = self.__thumbnailPaths__(file_path)
+        try:
+            for thumbnail_path in thumbnail_paths:
+                os.utime(thumbnail_path, None) # mark as recently used
+        except OSError:
+            return None # never created or partially evicted
+        return thumbnail_paths
+
+    def create(self, file_path):
+        """Extracts the thumbnails of `file_path` with one melt process and
+        stores them in the cache.
+        @return the list of the paths of the thumbnails
+        @raise RuntimeError if the frames couldn't be extracted"""
+        frame_count = probe_frame_count(self.melt, file_path)
+        if frame_count is None or frame_count < 1:
+            raise RuntimeError("retrieving the length of '%s' failed" % (file_path, ))
+        thumbnail_paths = self.__thumbnailPaths__(file_path)
+        thumbnail_dir = os.path.dirname(thumbnail_paths[0])
+        if not os.path.exists(thumbnail_dir):
+            try:
+                os.makedirs(thumbnail_dir)
+            except OSError:
+                pass # created by another thread or process in the meantime
+        tmp_dir = tempfile.mkdtemp(dir=thumbnail_dir, suffix=".tmp")
+        try:
+            # every frame is a clip of one frame of a playlist which melt
+            # writes as numbered images
+            melt_cmds = [self.melt, ]
+            for position in self.positions:
+                frame = min(frame_count-1, int(position*frame_count))
+                melt_cmds += [file_path, "in=%d" % (frame, ), "out=%d" % (frame, ), ]
+            melt_cmds += ["-consumer", "avformat:%s" % (os.path.join(tmp_dir, "%d.png"), ), "f=image2", "vcodec=png", "width=%d" % (self.width, ), "height=%d" % (self.height, ), "an=1", "real_time=0", ]
+            logger.debug("extracting thumbnails of '%s' with %s" % (file_path, str(melt_cmds), ))
+            melt_process = sp.Popen(melt_cmds, stdout=open(os.devnull, "w"), stderr=open(os.devnull, "w"))
+            melt_process.wait()
+            tmp_paths = [os.path.join(tmp_dir, "%d.png" % (i+1, )) for i in range(len(self.positions))] # image2 starts counting at 1
+            if melt_process.returncode != 0 or not all([os.path.exists(tmp_path) for tmp_path in tmp_paths]):
+                raise RuntimeError("extracting thumbnails of '%s' failed (melt returned %d)" % (file_path, melt_process.returncode, ))
+            for tmp_path, thumbnail_path in zip(tmp_paths, thumbnail_paths):
+                os.rename(tmp_path, thumbnail_path)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        with self.lock:
+            if self.total_size is None:
+                self.total_size = sum([entry_size for entry_mtime, entry_size, entry_path in detection_cache.list_lru_entries(self.cache_dir)])
+            else:
+                self.total_size += sum([os.path.getsize(thumbnail_path) for thumbnail_path in thumbnail_paths])
+            if self.total_size > self.max_size:
+                self.total_size = detection_cache.evict_lru_entries(self.cache_dir, self.max_size)
+        return thumbnail_paths
+
+class ThumbnailLoader:
+    def __init__(self, thumbnailCache, callback, worker_count=thumbnail_workers_default, max_pending=pending_requests_default):
+        """
+        @args thumbnailCache the `ThumbnailCache` which provides the thumbnails
+        @args callback a function which is invoked with a file path and the list of the paths of its thumbnails (`None` if they couldn't be created) from a worker thread for every request
+        @args worker_count the number of thumbnails which are extracted concurrently
+        @args max_pending the number of requests which are kept, older requests are dropped
+        """
+        self.thumbnailCache = thumbnailCache
+        self.callback = callback
+        self.max_pending = max_pending
+        self.pending = collections.deque() # newest first
+        self.pending_set = set()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.workers = []
+        for i in range(worker_count):
+            worker = threading.Thread(target=self.__work__, name="thumbnails-%d" % (i, ))
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+
+    def request(self, file_path):
+        """Queues the thumbnails of `file_path` to be loaded (or created)
+        before all requests which are already pending. Doesn't block."""
+        with self.condition:
+            if file_path in self.pending_set:
+                self.pending.remove(file_path) # move to the front
+            else:
+                self.pending_set.add(file_path)
+            self.pending.appendleft(file_path)
+            while len(self.pending) > self.max_pending:
+                self.pending_set.discard(self.pending.pop())
+            self.condition.notify()
+
+    def __work__(self):
+        while True:
+            with self.condition:
+                while len(self.pending) == 0 and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                file_path = self.pending.popleft()
+                self.pending_set.discard(file_path)
+            try:
+                thumbnail_paths = self.thumbnailCache.get(file_path)
+                if thumbnail_paths is None:
+                    thumbnail_paths = self.thumbnailCache.create(file_path)
+            except (RuntimeError, EnvironmentError) as ex:
+                logger.debug("loading thumbnails of '%s' failed: %s" % (file_path, str(ex), ))
+                thumbnail_paths = None
+            self.callback(file_path, thumbnail_paths)
+
+    def close(self):
+        """Drops all pending requests and stops the workers (without waiting
+        for running extractions)."""
+        with self.condition:
+            self.closed = True
+            self.pending.clear()
+            self.pending_set.clear()
+            self.condition.notify_all()
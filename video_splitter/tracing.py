@@ -0,0 +1,227 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# Records spans of the stages of a run (detection, encoding, waiting for a
+# worker, etc.) per file and per clip while tracing is enabled and exports them
+# in the Chrome trace event format (viewable in `chrome://tracing` or
+# Perfetto) and as a summary table. Subprocesses are reaped with `os.wait4`
+# (see `wait_process` and `communicate`) which provides their CPU time and peak
+# memory usage; these are added to the innermost span of the thread which
+# waits for the process. Processes whose output the caller stopped reading on
+# purpose (e.g. once melt wrote the scene changes) usually exit with SIGPIPE
+# or an error code, so their spans are marked as cancelled rather than failed.
+# Spans are no-ops while tracing isn't enabled.
+
+import errno
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+tracer = None # the active `Tracer` or `None` if tracing is disabled
+current_spans = threading.local() # the stack of open spans of each thread
+
+class Span:
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = None
+        self.end = None
+
+    def __enter__(self):
+        if self.tracer is not None:
+            self.start = time.time()
+            if not hasattr(current_spans, "stack"):
+                current_spans.stack = []
+            current_spans.stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.tracer is not None:
+            self.end = time.time()
+            current_spans.stack.pop()
+            if exc_type is not None:
+                self.args["error"] = exc_type.__name__
+            self.tracer.addSpan(self)
+        return False
+
+    def recordProcess(self, rusage, returncode, output_discarded=False):
+        """Adds the CPU time and memory usage of a terminated subprocess. A
+        non-zero `returncode` counts as a cancelled rather than a failed
+        process if `output_discarded` is `True`."""
+        if self.tracer is None:
+            return
+        self.args["child_cpu_s"] = self.args.get("child_cpu_s", 0.0)+rusage.ru_utime+rusage.ru_stime
+        self.args["peak_rss_kib"] = max(self.args.get("peak_rss_kib", 0), rusage.ru_maxrss) # KiB on Linux
+        self.args["exit_code"] = returncode
+        if returncode != 0:
+            key = "cancelled_processes" if output_discarded is True else "failed_processes"
+            self.args[key] = self.args.get(key, 0)+1
+        self.args["processes"] = self.args.get("processes", 0)+1
+
+    def recordOutputFile(self, file_path):
+        """Adds the size of `file_path` to the number of bytes written."""
+        if self.tracer is None or not os.path.exists(file_path):
+            return
+        self.args["bytes_written"] = self.args.get("bytes_written", 0)+os.path.getsize(file_path)
+
+class Tracer:
+    def __init__(self):
+        self.spans = []
+        self.thread_names = {} # thread ident -> name
+        self.lock = threading.Lock()
+        self.origin = time.time()
+
+    def span(self, name, category, **args):
+        return Span(self, name, category, args)
+
+    def addSpan(self, span):
+        current_thread = threading.current_thread()
+        with self.lock:
+            self.spans.append((span, current_thread.ident))
+            self.thread_names[current_thread.ident] = current_thread.name
+
+    def writeChromeTrace(self, file_path):
+        """Writes all spans as complete events ("ph": "X") of the Chrome trace
+        event format into `file_path`."""
+        pid = os.getpid()
+        with self.lock:
+            events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}} for tid, thread_name in self.thread_names.items()]
+            for span, tid in self.spans:
+                events.append({"name": span.name, "cat": span.category, "ph": "X", "pid": pid, "tid": tid, "ts": int((span.start-self.origin)*1000000), "dur": int((span.end-span.start)*1000000), "args": span.args})
+        with open(file_path, "w") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
+        logger.info("wrote %d trace events to '%s'" % (len(events), file_path, ))
+
+    def summary(self):
+        """@return a list of tuples of the span name, the number of spans, the
+        total, mean and maximal wall time in seconds, the CPU time of
+        subprocesses in seconds, the peak memory usage of subprocesses in KiB,
+        the number of bytes written, the number of failed spans and the number
+        of cancelled spans (see `wait_process`) per span name, sorted by
+        decreasing total wall time"""
+        rows = {}
+        with self.lock:
+            for span, tid in self.spans:
+                duration = span.end-span.start
+                count, total, maximum, child_cpu, peak_rss, bytes_written, failures, cancellations = rows.get(span.name, (0, 0.0, 0.0, 0.0, 0, 0, 0, 0))
+                failed = "error" in span.args or span.args.get("failed_processes", 0) > 0
+                cancelled = not failed and span.args.get("cancelled_processes", 0) > 0
+                rows[span.name] = (count+1, total+duration, max(maximum, duration), child_cpu+span.args.get("child_cpu_s", 0.0), max(peak_rss, span.args.get("peak_rss_kib", 0)), bytes_written+span.args.get("bytes_written", 0), failures+(1 if failed else 0), cancellations+(1 if cancelled else 0))
+        ret_value = [(name, count, total, total/count, maximum, child_cpu, peak_rss, bytes_written, failures, cancellations) for name, (count, total, maximum, child_cpu, peak_rss, bytes_written, failures, cancellations) in rows.items()]
+        return sorted(ret_value, key=lambda row: -row[2])
+
+    def logSummary(self):
+        lines = ["%-20s %7s %10s %9s %9s %11s %9s %11s %6s %9s" % ("stage", "count", "total s", "mean s", "max s", "child CPU s", "peak MiB", "MiB written", "failed", "cancelled", )]
+        for name, count, total, mean, maximum, child_cpu, peak_rss, bytes_written, failures, cancellations in self.summary():
+            lines.append("%-20s %7d %10.2f %9.3f %9.3f %11.2f %9.1f %11.1f %6d %9d" % (name, count, total, mean, maximum, child_cpu, peak_rss/1024.0, bytes_written/(1024.0*1024.0), failures, cancellations, ))
+        logger.info("time spent per stage (wall time of concurrent spans adds up):\n%s" % ("\n".join(lines), ))
+
+def enable():
+    """Enables tracing for the rest of the process.
+    @return the `Tracer`"""
+    global tracer
+    tracer = Tracer()
+    return tracer
+
+def span(name, category, **args):
+    """@return a context manager which records a span named `name` with the
+    arguments `args` if tracing is enabled"""
+    return Span(tracer, name, category, args)
+
+def queued_span(name, category, start, **args):
+    """Records a span which started at `start` (a timestamp of `time.time`)
+    and ends now in another thread than the one which started it (e.g. the
+    time a task waited in a queue)."""
+    if tracer is None:
+        return
+    queued = Span(tracer, name, category, args)
+    queued.start = start
+    queued.end = time.time()
+    tracer.addSpan(queued)
+
+def wait_process(process, output_discarded=False):
+    """Waits for the subprocess `process` to terminate with `os.wait4` and sets
+    its `returncode` (which `Popen.wait` would do) and adds its resource usage
+    to the innermost open span of the current thread.
+    @args output_discarded whether the caller closed stdout of `process` on
+    purpose before reading it to the end, so that a non-zero exit code (e.g.
+    caused by SIGPIPE or a failed write) marks the span as cancelled
+    @return the resource usage of the process"""
+    while True:
+        try:
+            pid, status, rusage = os.wait4(process.pid, 0)
+            break
+        except OSError as ex:
+            if ex.errno == errno.EINTR:
+                continue
+            if ex.errno == errno.ECHILD: # already reaped
+                process.wait()
+                return None
+            raise
+    if os.WIFSIGNALED(status):
+        process.returncode = -os.WTERMSIG(status)
+    else:
+        process.returncode = os.WEXITSTATUS(status)
+    stack = getattr(current_spans, "stack", None)
+    if stack:
+        stack[-1].recordProcess(rusage, process.returncode, output_discarded)
+    return rusage
+
+def communicate(process):
+    """Reads stdout and stderr of `process` (if they're pipes) until the end
+    like `Popen.communicate` and reaps it with `wait_process`.
+    @return a tuple of the output on stdout and stderr (`None` for streams
+    which aren't pipes)"""
+    stderr_output = [None]
+    def __read_stderr__():
+        stderr_output[0] = process.stderr.read()
+    stderr_thread = None
+    if process.stderr is not None:
+        stderr_thread = threading.Thread(target=__read_stderr__)
+        stderr_thread.daemon = True
+        stderr_thread.start()
+    stdout_output = None
+    if process.stdout is not None:
+        stdout_output = process.stdout.read()
+        process.stdout.close()
+    if stderr_thread is not None:
+        stderr_thread.join()
+        process.stderr.close()
+    wait_process(process)
+    return stdout_output, stderr_output[0]
@@ -53,7 +53,9 @@ import sys
 import re
 import send2trash
 import collections
-import python_essentials.lib.os_utils as os_utils
+import capabilities
+import video_sniffer
+import thumbnail_cache
 import pkg_resources
 
 logger = logging.getLogger(__name__)
@@ -63,7 +65,10 @@ ch.setLevel(logging.INFO)
 logger.addHandler(ch)
 
 mp4box_default = "MP4Box"
+melt_default = "melt"
 icon_size_default = 24
+thumbnail_slots_default = 512 # the number of thumbnail strips kept in memory
+thumbnail_poll_interval = 250 # milliseconds
 
 # Playback is running
 PLAYBACK_STATE_RUNNING = 1
@@ -78,14 +83,18 @@ def __generate_video_file_extensions_wildcard__():
     for video_file_extension in video_splitter_globals.video_file_extensions[1:]:
         ret_value += ";*.%s" % (video_file_extension,)
     ret_value += ")|"
-    ret_value += "*.%s" % (video_splitter_globals.video_file_extensions[0])
+    ret_value += "*.%s;*.%s" % (video_splitter_globals.video_file_extensions[0], video_splitter_globals.video_file_extensions[0].upper(), )
     for video_file_extension in video_splitter_globals.video_file_extensions[1:]:
-        ret_value += (";*.%s" % (video_file_extension,))
+        ret_value += (";*.%s;*.%s" % (video_file_extension, video_file_extension.upper(), )) # the wildcard is case sensitive on some platforms
     return ret_value
 
 video_file_extensions_wildcard = __generate_video_file_extensions_wildcard__()
 
 __mp4box_doc__ = "the `mp4box` binary to use"
+__melt_doc__ = "the `melt` binary which extracts the frames shown as thumbnails"
+__thumbnail_cache_dir_doc__ = "the directory where thumbnails are cached"
+__thumbnail_cache_size_doc__ = "the maximal size of the thumbnail cache in MiB (the least recently used thumbnails are removed if it's exceeded)"
+__no_thumbnails_doc__ = "don't show thumbnails in the lists"
 
 app_version = pkg_resources.require("video_splitter")[0].version
 
@@ -94,15 +103,150 @@ app_version = pkg_resources.require("video_splitter")[0].version
 # supported in order to KISS (deletions are ignored in the chain of undo
 # actions which turns out to be a useful feature)
 
+class FileListModel:
+    """The file paths shown in a `FileListCtrl`. Rows are accessed by index in
+    a list and found by path in a dictionary which is rebuilt once after a
+    batch of changes when it's needed rather than on every insertion."""
+    def __init__(self):
+        self.file_paths = []
+        self.rows = None # file path -> row, `None` if outdated
+        self.longest_file_path = None # `None` if outdated
+
+    def __len__(self):
+        return len(self.file_paths)
+
+    def get(self, row):
+        return self.file_paths[row]
+
+    def row(self, file_path):
+        """@return the row of `file_path` or -1 if it isn't in the model"""
+        if self.rows is None:
+            self.rows = dict([(file_path0, row) for row, file_path0 in enumerate(self.file_paths)])
+        return self.rows.get(file_path, -1)
+
+    def longestFilePath(self):
+        if self.longest_file_path is None:
+            self.longest_file_path = max(self.file_paths, key=len) if len(self.file_paths) > 0 else ""
+        return self.longest_file_path
+
+    def insert(self, row, file_paths):
+        """Inserts the list `file_paths` before `row`."""
+        self.file_paths[row:row] = file_paths
+        self.__changed__()
+
+    def remove(self, rows):
+        """Removes the rows in the list `rows`.
+        @return the file paths of the removed rows in the order of the rows"""
+        rows = set(rows)
+        removed_file_paths = [file_path for row, file_path in enumerate(self.file_paths) if row in rows]
+        self.file_paths = [file_path for row, file_path in enumerate(self.file_paths) if row not in rows]
+        self.__changed__()
+        return removed_file_paths
+
+    def clear(self):
+        self.file_paths = []
+        self.__changed__()
+
+    def __changed__(self):
+        self.rows = None
+        self.longest_file_path = None
+
+class FileListCtrl(wx.ListCtrl):
+    """A virtual list of file paths which only asks `model` for the rows which
+    are painted, so that adding, moving and removing thousands of files takes
+    one update of the control instead of one per row."""
+    def __init__(self, parent):
+        wx.ListCtrl.__init__(self, parent=parent, id=wx.ID_ANY, style=wx.LC_REPORT|wx.LC_VIRTUAL) # don't make entries editable
+        self.model = FileListModel()
+        self.imageProvider = None
+        self.image_width = 0
+        self.InsertColumn(0, heading="File")
+
+    def setImages(self, imageList, imageProvider):
+        """Shows the image with the index `imageProvider(file_path)` in
+        `imageList` in every row."""
+        self.SetImageList(imageList, wx.IMAGE_LIST_SMALL) # might be shared, so not assigned
+        self.imageProvider = imageProvider
+        self.image_width = imageList.GetSize(0)[0]
+
+    def OnGetItemText(self, item, column):
+        return self.model.get(item)
+
+    def OnGetItemImage(self, item):
+        if self.imageProvider is None:
+            return -1
+        return self.imageProvider(self.model.get(item))
+
+    def filePath(self, row):
+        return self.model.get(row)
+
+    def filePaths(self):
+        return list(self.model.file_paths)
+
+    def fileRow(self, file_path):
+        """@return the row of `file_path` or -1 if it isn't in the list"""
+        return self.model.row(file_path)
+
+    def selectedRows(self):
+        selected_rows = []
+        selected_row = self.GetNextSelected(-1)
+        while selected_row != -1:
+            selected_rows.append(selected_row)
+            selected_row = self.GetNextSelected(selected_row)
+        return selected_rows
+
+    def clearSelection(self):
+        """Deselects the selected rows (without visiting the others)."""
+        for selected_row in self.selectedRows():
+            self.Select(selected_row, on=0)
+
+    def insertFiles(self, row, file_paths):
+        """Inserts the list `file_paths` before `row`."""
+        if len(file_paths) == 0:
+            return
+        self.clearSelection() # the control keeps selections by row
+        self.model.insert(row, file_paths)
+        self.__update__()
+
+    def removeRows(self, rows):
+        """Removes the rows in the list `rows`.
+        @return the file paths of the removed rows in the order of the rows"""
+        if len(rows) == 0:
+            return []
+        self.clearSelection()
+        removed_file_paths = self.model.remove(rows)
+        self.__update__()
+        return removed_file_paths
+
+    def clearFiles(self):
+        self.clearSelection()
+        self.model.clear()
+        self.__update__()
+
+    def refreshFile(self, file_path):
+        """Repaints the row of `file_path` if it's in the list."""
+        row = self.model.row(file_path)
+        if row != -1:
+            self.RefreshItem(row)
+
+    def __update__(self):
+        self.SetItemCount(len(self.model))
+        self.SetColumnWidth(0, self.GetTextExtent(self.model.longestFilePath())[0]+self.image_width+16) # the margin covers the padding around the text
+        self.Refresh()
+
 class VideoManager(wx.Frame):
 
-    def __init__(self, parent, id, title, mp4box, categories=["1", "2", "3", "4", "5","split"], input_directory=None, review_folder=None):
+    def __init__(self, parent, id, title, mp4box, categories=["1", "2", "3", "4", "5","split"], input_directory=None, review_folder=None, melt=melt_default, thumbnail_cache_dir=thumbnail_cache.thumbnail_dir_default, thumbnail_cache_size=thumbnail_cache.thumbnail_cache_size_default):
         """
         @args mp4box %(__mp4box_doc__)s
-        """ % {"__mp4box_doc__": __mp4box_doc__}
+        @args melt %(__melt_doc__)s
+        @args thumbnail_cache_dir %(__thumbnail_cache_dir_doc__)s (`None` disables thumbnails)
+        @args thumbnail_cache_size %(__thumbnail_cache_size_doc__)s
+        """ % {"__mp4box_doc__": __mp4box_doc__, "__melt_doc__": __melt_doc__, "__thumbnail_cache_dir_doc__": __thumbnail_cache_dir_doc__, "__thumbnail_cache_size_doc__": __thumbnail_cache_size_doc__}
         wx.Frame.__init__(self, parent, id, title, size=(600, 500))
-        if os_utils.which(mp4box) is None:
+        if not capabilities.binary_available(mp4box):
             raise ValueError("mp4box binary '%s' not found or not executable (on Ubuntu make sure the package `gpac` is installed)" % (mp4box,))
+        logger.debug("using %s" % (capabilities.mp4box_capabilities(mp4box)["version"],))
         self.mp4box = mp4box
         self.undoStack = collections.deque() # the undo stack to track un- and
                 # redoable categorization
@@ -220,15 +364,34 @@ class VideoManager(wx.Frame):
         self.listsPanel.SetSizer(listsPanelSizer)
         listsSplitterPanelLeft = wx.Panel(parent=listsSplitter)
         listsSplitterPanelRight = wx.Panel(parent=listsSplitter)
-        self.workingSetList = wx.ListCtrl(parent=listsSplitterPanelLeft, id=wx.ID_ANY, style=wx.LC_REPORT) # don't make entries editable
+        self.workingSetList = FileListCtrl(parent=listsSplitterPanelLeft)
         workingSetListSizer = wx.BoxSizer(wx.VERTICAL)
         categoryButtonSizer = wx.WrapSizer(wx.HORIZONTAL)
         mergeListSizer = wx.BoxSizer(wx.VERTICAL)
         self.selectButton = wx.Button(parent=listsSplitterPanelRight, id=wx.ID_ANY, label=">", size=wx.Size(icon_size_default, icon_size_default))
         self.deselectButton = wx.Button(parent=listsSplitterPanelRight, id=wx.ID_ANY, label="<", size=wx.Size(icon_size_default, icon_size_default))
-        self.mergeList = wx.ListCtrl(parent=listsSplitterPanelRight, id=wx.ID_ANY, style=wx.LC_REPORT)
-        self.workingSetList.InsertColumn(0, heading="File", width=wx.LIST_AUTOSIZE)
-        self.mergeList.InsertColumn(0, heading="File", width=wx.LIST_AUTOSIZE)
+        self.mergeList = FileListCtrl(parent=listsSplitterPanelRight)
+        # thumbnails are extracted in background threads for the rows which
+        # are visible when the lists are polled; both lists share one image
+        # list whose slots are reused for the least recently shown files
+        self.thumbnailLoader = None
+        if thumbnail_cache_dir is not None and not capabilities.binary_available(melt):
+            logger.warning("melt binary '%s' not found, thumbnails are disabled" % (melt, ))
+            thumbnail_cache_dir = None
+        if thumbnail_cache_dir is not None:
+            thumbnailCache = thumbnail_cache.ThumbnailCache(thumbnail_cache_dir, thumbnail_cache_size*1024*1024, melt)
+            self.thumbnailSize = (thumbnailCache.width*len(thumbnailCache.positions), thumbnailCache.height) # the frames are shown side by side
+            self.thumbnailImageList = wx.ImageList(self.thumbnailSize[0], self.thumbnailSize[1])
+            self.thumbnailPlaceholder = self.thumbnailImageList.Add(wx.BitmapFromImage(wx.Image(self.thumbnailSize[0], self.thumbnailSize[1]))) # black
+            self.thumbnailSlots = collections.OrderedDict() # file path -> index in thumbnailImageList, least recently shown first
+            self.workingSetList.setImages(self.thumbnailImageList, self.thumbnailImage)
+            self.mergeList.setImages(self.thumbnailImageList, self.thumbnailImage)
+            self.thumbnailRequested = set() # requested files whose thumbnails are loading or in a slot
+            self.thumbnailLoader = thumbnail_cache.ThumbnailLoader(thumbnailCache, lambda file_path, thumbnail_paths: wx.CallAfter(self.onThumbnailLoaded, file_path, thumbnail_paths))
+            self.thumbnailTimer = wx.Timer(self)
+            self.Bind(wx.EVT_TIMER, self.onThumbnailTimer, self.thumbnailTimer)
+            self.thumbnailTimer.Start(thumbnail_poll_interval)
+            self.Bind(wx.EVT_CLOSE, self.onClose)
         self.mergeButton = wx.Button(parent=listsSplitterPanelRight, id=wx.ID_ANY, label="merge")
         for category in categories:
             category_button = wx.Button(parent=listsSplitterPanelLeft, id=wx.ID_ANY, label=str(category))
@@ -243,27 +406,26 @@ class VideoManager(wx.Frame):
                     if selected_index == -1:
                         logger.debug("no item selected in working set list, so nothing to categorize")
                         return
-                    selected_item = self.workingSetList.GetItem(selected_index, col=0)
+                    selected_item = self.workingSetList.filePath(selected_index)
                     # playback should be stopped before moving file
                     selected_item_playbacked = False # store info for later (much simpler code for the price of one flag)
-                    if selected_item.GetText() == self.trackPath:
+                    if selected_item == self.trackPath:
                         selected_item_playbacked = True
                         self.stopPlayback()
                     category_folder = os.path.join(self.reviewFolder, str(category))
                     if not os.path.exists(category_folder):
                         os.makedirs(category_folder)
-                    logger.debug("moving '%s' into category folder '%s'" % (selected_item.GetText(), category_folder))
-                    shutil.move(selected_item.GetText(), os.path.join(category_folder, os.path.basename(selected_item.GetText())))
-                    self.workingSetList.DeleteItem(selected_index)
-                    self.undoStack.append((selected_item.GetText(), category, selected_index))
+                    logger.debug("moving '%s' into category folder '%s'" % (selected_item, category_folder))
+                    shutil.move(selected_item, os.path.join(category_folder, os.path.basename(selected_item)))
+                    self.workingSetList.removeRows([selected_index])
+                    self.undoStack.append((selected_item, category, selected_index))
                     self.editMenuItemRedo.Enable(False)
                     self.redoStack.clear()
                     # automatically start the next item after the categorized in workingSetList in order to proceed faster and select it (but only if the just moved item is currently playbacked because otherwise the playback of another item would be interrupted)
                     if self.workingSetList.GetItemCount() > 0 \
                             and selected_index < self.workingSetList.GetItemCount()-1 \
                             and selected_item_playbacked: # there needs to be one more item after the categorized one (refers to item count after removal of categorized item)
-                        selected_item = self.workingSetList.GetItem(selected_index, col=0)
-                        self.trackPath = selected_item.GetText()
+                        self.trackPath = self.workingSetList.filePath(selected_index)
                         logger.info("starting video '%s'" % (self.trackPath,))
                         self.startVideo(self.trackPath)
                         self.workingSetList.SetItemState(selected_index, # item
@@ -330,34 +492,18 @@ class VideoManager(wx.Frame):
 
     def onWorkingSetListSelect(self, event):
         """Removes all selection on mergeList in order to allow videos to be played based on selection (doesn't make sense if items are selected on two lists)"""
-        for i in range(0, self.mergeList.GetItemCount()):
-            self.mergeList.Select(i, on=0)
+        self.mergeList.clearSelection()
         self.playButton.Enable()
 
     def onMergeListSelect(self, event):
         """Removes all selection on workingSetList in order to allow videos to be played based on selection (doesn't make sense if items are selected on two lists)"""
-        for i in range(0, self.workingSetList.GetItemCount()):
-            self.workingSetList.Select(i, on=0)
+        self.workingSetList.clearSelection()
         self.playButton.Enable()
 
     def onSelectButtonClick(self, event):
-        # need to collect all selected indices first because the ListCtrl.GetNextSelected doesn't modify the multi-selection state after ListCtrl.DeleteItem
-        selected_indices = []
-        next_selected = self.workingSetList.GetNextSelected(-1)
-        while next_selected != -1:
-            selected_indices.append(next_selected)
-            next_selected = self.workingSetList.GetNextSelected(next_selected)
-        # need to remove backwards
-        for selected_index in sorted(selected_indices, reverse=True):
-            next_selected_item = self.workingSetList.GetItem(selected_index, col=0)
-            logger.debug("removing item %d from working set list" % (selected_index,))
-            self.workingSetList.DeleteItem(selected_index)
-            selected_item = next_selected_item.GetText()
-            logger.debug("selecting item '%s'" % (selected_item,))
-            # was `self.mergeList.Append([selected_item])`, unclear how this ever worked since the resulting order of merge list is clearly inverted in comparison to the original order of working set list if not added at item 0 because order is already inverted during deletion
-            self.mergeList.InsertItem(index=0, label=selected_item)
-        self.workingSetList.SetColumnWidth(0, wx.LIST_AUTOSIZE)
-        self.mergeList.SetColumnWidth(0, wx.LIST_AUTOSIZE)
+        selected_items = self.workingSetList.removeRows(self.workingSetList.selectedRows())
+        logger.debug("selecting items %s" % (str(selected_items),))
+        self.mergeList.insertFiles(0, selected_items) # keeps the order of the working set list
 
     def onDeselectButtonClick(self, event):
         """
@@ -365,51 +511,89 @@ class VideoManager(wx.Frame):
         list. Prepends items (rather than append them) in order to avoid
         scrolling when dealing with a large working set
         """
-        # need to collect all selected indices first because the ListCtrl.GetNextSelected doesn't modify the multi-selection state after ListCtrl.DeleteItem
-        selected_indices = []
-        next_selected = self.mergeList.GetNextSelected(-1)
-        while next_selected != -1:
-            selected_indices.append(next_selected)
-            next_selected = self.mergeList.GetNextSelected(next_selected)
-        # need to remove backwards
-        for selected_index in sorted(selected_indices, reverse=True):
-            next_selected_item = self.mergeList.GetItem(selected_index, col=0)
-            self.mergeList.DeleteItem(selected_index)
-            selected_item = next_selected_item.GetText()
-            logger.debug("deselecting item '%s'" % (selected_item,))
-            self.workingSetList.InsertItem(0, selected_item)
-        self.workingSetList.SetColumnWidth(0, wx.LIST_AUTOSIZE)
-        self.mergeList.SetColumnWidth(0, wx.LIST_AUTOSIZE)
+        selected_items = self.mergeList.removeRows(self.mergeList.selectedRows())
+        logger.debug("deselecting items %s" % (str(selected_items),))
+        self.workingSetList.insertFiles(0, selected_items)
 
     def onMergeListDoubleClick(self, event):
-        selected_item = event.GetItem()
-        self.trackPath = selected_item.GetText()
+        self.trackPath = self.mergeList.filePath(event.GetIndex()) # the item of the event of a virtual list doesn't carry the text
         self.startVideo(self.trackPath)
 
     def onWorkingSetListDoubleClick(self, event):
-        selected_item = event.GetItem()
-        self.trackPath = selected_item.GetText()
+        self.trackPath = self.workingSetList.filePath(event.GetIndex())
         self.startVideo(self.trackPath)
 
     def onWorkingSetListRightClick(self, event):
         self.workingSetList.PopupMenu(self.workingSetListPopupMenu, event.GetPoint())
 
     def onWorkingSetListPopupMenuItemClearClick(self, event):
-        self.workingSetList.DeleteAllItems() # ListCtrl.ClearAll removes columns as well
+        self.workingSetList.clearFiles()
 
     def onWorkingSetListPopupMenuItemDeleteClick(self, event):
-        selected_indices = []
-        next_selected = self.workingSetList.GetNextSelected(-1)
-        while next_selected != -1:
-            selected_indices.append(next_selected)
-            next_selected = self.workingSetList.GetNextSelected(next_selected)
-        for selected_index in selected_indices:
-            next_selected_item = self.workingSetList.GetItem(selected_index, col=0)
-            if next_selected_item.GetText() == self.trackPath:
-                self.stopPlayback()
-            logger.debug("moving '%s' to trash" % (next_selected_item.GetText(),))
-            send2trash.send2trash(next_selected_item.GetText())
-            self.workingSetList.DeleteItem(selected_index)
+        trashed_indices = []
+        try:
+            for selected_index in self.workingSetList.selectedRows():
+                selected_item = self.workingSetList.filePath(selected_index)
+                if selected_item == self.trackPath:
+                    self.stopPlayback()
+                logger.debug("moving '%s' to trash" % (selected_item,))
+                send2trash.send2trash(selected_item)
+                trashed_indices.append(selected_index)
+        finally:
+            self.workingSetList.removeRows(trashed_indices) # at once, so that indices don't shift in between
+
+    def thumbnailImage(self, file_path):
+        """@return the index of the thumbnail of `file_path` in the image list
+        of the lists (a placeholder if it isn't loaded)"""
+        return self.thumbnailSlots.get(file_path, self.thumbnailPlaceholder)
+
+    def onThumbnailTimer(self, event):
+        """Requests the thumbnails of the visible rows of both lists which
+        haven't been requested yet (rows which aren't visible don't cause any
+        work)."""
+        for listCtrl in [self.workingSetList, self.mergeList]:
+            top_index = listCtrl.GetTopItem()
+            for index in range(max(top_index, 0), min(top_index+listCtrl.GetCountPerPage()+1, listCtrl.GetItemCount())):
+                file_path = listCtrl.filePath(index)
+                if file_path in self.thumbnailSlots:
+                    self.thumbnailSlots[file_path] = self.thumbnailSlots.pop(file_path) # mark as recently shown
+                elif file_path not in self.thumbnailRequested:
+                    self.thumbnailRequested.add(file_path)
+                    self.thumbnailLoader.request(file_path)
+
+    def onThumbnailLoaded(self, file_path, thumbnail_paths):
+        """Combines the thumbnails of `file_path` into one image and shows it
+        in the rows of `file_path` (runs in the GUI thread)."""
+        if thumbnail_paths is None:
+            return # stays requested, so that it isn't retried on every poll
+        strip = wx.Image(self.thumbnailSize[0], self.thumbnailSize[1])
+        thumbnail_width = self.thumbnailSize[0]//len(thumbnail_paths)
+        for i, thumbnail_path in enumerate(thumbnail_paths):
+            thumbnail = wx.Image(thumbnail_path, wx.BITMAP_TYPE_PNG)
+            if thumbnail.IsOk():
+                strip.Paste(thumbnail.Scale(thumbnail_width, self.thumbnailSize[1], wx.IMAGE_QUALITY_HIGH), i*thumbnail_width, 0)
+        bitmap = wx.BitmapFromImage(strip)
+        if file_path in self.thumbnailSlots:
+            slot = self.thumbnailSlots.pop(file_path)
+            self.thumbnailImageList.Replace(slot, bitmap)
+        elif len(self.thumbnailSlots) < thumbnail_slots_default:
+            slot = self.thumbnailImageList.Add(bitmap)
+        else:
+            evicted_file_path, slot = self.thumbnailSlots.popitem(last=False)
+            self.thumbnailRequested.discard(evicted_file_path) # requested again when it becomes visible
+            self.__refreshFile__(evicted_file_path) # shows the placeholder
+            self.thumbnailImageList.Replace(slot, bitmap)
+        self.thumbnailSlots[file_path] = slot
+        self.__refreshFile__(file_path)
+
+    def __refreshFile__(self, file_path):
+        for listCtrl in [self.workingSetList, self.mergeList]:
+            listCtrl.refreshFile(file_path)
+
+    def onClose(self, event):
+        self.thumbnailTimer.Stop()
+        self.thumbnailLoader.close()
+        event.Skip() # let the frame be destroyed
 
     def updateReviewFolderStatusText(self):
         new_text = "review folder: "
@@ -473,20 +657,17 @@ class VideoManager(wx.Frame):
         if len(files) == 0:
             return
         def __filter_file__(file0):
-            file_extension = video_splitter.retrieve_file_extension(file0)
-            if not file_extension in video_splitter_globals.video_file_extensions:
-                logger.debug("skipping non-video file '%s' based on extension" % (file0,))
-                return False
             if file0 in self.workingSet:
                 logger.debug("skipping already added file '%s'" % (file0,))
                 return False
+            if not video_sniffer.is_video_file(file0):
+                logger.debug("skipping non-video file '%s'" % (file0,))
+                return False
             return True
-        files = [i for i in files if __filter_file__(i)]
-        for new_file_path in sorted(files, key=lambda x: __split_item__(x)[3]+"%050d" % (__split_item__(x)[1],)): # sorting with item_min of __split_item__ isn't sufficient because we need to include the item_head as well; then sort by joining head and item_min with 50 leading zeros (assuming that item_min's length won't exceed 50 digits)
-            self.workingSet.add(new_file_path)
-            self.workingSetList.InsertItem(self.workingSetList.GetItemCount(), new_file_path)
-            logger.debug("added file '%s' to working set" % (new_file_path,))
-        self.workingSetList.SetColumnWidth(0, wx.LIST_AUTOSIZE)
+        files = sorted([i for i in files if __filter_file__(i)], key=lambda x: __split_item__(x)[3]+"%050d" % (__split_item__(x)[1],)) # sorting with item_min of __split_item__ isn't sufficient because we need to include the item_head as well; then sort by joining head and item_min with 50 leading zeros (assuming that item_min's length won't exceed 50 digits)
+        self.workingSet.update(files)
+        self.workingSetList.insertFiles(self.workingSetList.GetItemCount(), files) # one update of the list for all files
+        logger.debug("added %d files to working set" % (len(files),))
 
 
     def onSetReviewFolder(self, event):
@@ -533,13 +714,13 @@ class VideoManager(wx.Frame):
                 selection_list_selected_index = self.mergeList.GetNextSelected(-1)
                 selected_item = None
                 if selection_list_selected_index != -1:
-                    selected_item = self.mergeList.GetItem(selection_list_selected_index, col=0)
+                    selected_item = self.mergeList.filePath(selection_list_selected_index)
                 else:
                     working_set_list_selected_index = self.workingSetList.GetNextSelected(-1)
                     if working_set_list_selected_index != -1:
-                        selected_item = self.workingSetList.GetItem(working_set_list_selected_index, col=0)
+                        selected_item = self.workingSetList.filePath(working_set_list_selected_index)
                 if selected_item != None:
-                    self.trackPath = selected_item.GetText()
+                    self.trackPath = selected_item
                     logger.info("starting video '%s'" % (self.trackPath,))
                     self.startVideo(self.trackPath)
             self.playbackState = PLAYBACK_STATE_RUNNING
@@ -602,13 +783,8 @@ class VideoManager(wx.Frame):
             logger.debug("nothing to merge because merge list contains only one item")
             return
         # prepare merging
-        selection_list_item_count = self.mergeList.GetItemCount()
-        item_list = []
-        for row in range(selection_list_item_count):
-            selectionItem = self.mergeList.GetItem(itemIdx=row, col=0)
-            next_item = str(selectionItem.GetText())
-            logger.debug("adding '%s' to merge list" % (next_item,))
-            item_list.append(next_item)
+        item_list = [str(item) for item in self.mergeList.filePaths()]
+        logger.debug("merging %s" % (str(item_list),))
         # automatically determine output file name based on video_splitter file
         # naming
         min_offset = sys.maxint
@@ -639,8 +815,8 @@ class VideoManager(wx.Frame):
             logger.debug("removing merged file '%s'" % (item,))
             os.remove(item)
         logger.debug("cleared merge list")
-        self.mergeList.DeleteAllItems() # ListCtrl.ClearAll removes columns as well
-        self.mergeList.InsertItem(0, output_file_path)
+        self.mergeList.clearFiles()
+        self.mergeList.insertFiles(0, [output_file_path])
 
     def onAboutBox(self, event):
         wx.AboutBox(video_splitter_globals.app_about_box_info)
@@ -656,7 +832,7 @@ class VideoManager(wx.Frame):
         category_folder = os.path.join(self.reviewFolder, str(category))
         logger.debug("undoing move of '%s' into category folder '%s'" % (file_path, category_folder))
         shutil.move(os.path.join(category_folder, os.path.basename(file_path)), file_path)
-        self.workingSetList.InsertItem(old_index, file_path)
+        self.workingSetList.insertFiles(min(old_index, self.workingSetList.GetItemCount()), [file_path])
         self.redoStack.append((file_path, category, old_index))
         self.editMenuItemRedo.Enable(True)
 
@@ -670,7 +846,9 @@ class VideoManager(wx.Frame):
         category_folder = os.path.join(self.reviewFolder, str(category))
         logger.debug("redoing move of '%s' into category folder '%s'" % (file_path, category_folder))
         shutil.move(file_path, os.path.join(category_folder, os.path.basename(file_path)))
-        self.workingSetList.DeleteItem(old_index)
+        row = self.workingSetList.fileRow(file_path) # `old_index` is outdated if the list changed since the undo
+        if row != -1:
+            self.workingSetList.removeRows([row])
         self.undoStack.append((file_path, category, old_index))
 
 def __split_item__(item):
@@ -701,12 +879,16 @@ def __generate_window_title__(title):
     return ret_value
 
 @plac.annotations(mp4box=(__mp4box_doc__, "option"),
+    melt=(__melt_doc__, "option"),
+    thumbnail_cache_dir=(__thumbnail_cache_dir_doc__, "option"),
+    thumbnail_cache_size=(__thumbnail_cache_size_doc__, "option", None, int),
+    no_thumbnails=(__no_thumbnails_doc__, "flag"),
     version=(video_splitter_globals.__version_doc__, "flag"),
     debug=(video_splitter_globals.__debug_doc__, "flag"),
     input_directory=("a directory to read video files from", "positional"),
     review_folder=("the review folder", "option"),
 )
-def __main_delegate__(mp4box=mp4box_default, version=False, debug=False, input_directory=None, review_folder=None):
+def __main_delegate__(mp4box=mp4box_default, melt=melt_default, thumbnail_cache_dir=thumbnail_cache.thumbnail_dir_default, thumbnail_cache_size=thumbnail_cache.thumbnail_cache_size_default, no_thumbnails=False, version=False, debug=False, input_directory=None, review_folder=None):
     """necessary function to make `plac.call` possible in `main`"""
     if version is True:
         print(app_version)
@@ -714,8 +896,10 @@ def __main_delegate__(mp4box=mp4box_default, version=False, debug=False, input_d
     if debug is True:
         logger.setLevel(logging.DEBUG)
         ch.setLevel(logging.DEBUG)
+    if no_thumbnails is True:
+        thumbnail_cache_dir = None
     app = wx.App(False)
-    frame = VideoManager(None, wx.ID_ANY, __generate_window_title__(None), mp4box=mp4box, input_directory=input_directory, review_folder=review_folder)
+    frame = VideoManager(None, wx.ID_ANY, __generate_window_title__(None), mp4box=mp4box, input_directory=input_directory, review_folder=review_folder, melt=melt, thumbnail_cache_dir=thumbnail_cache_dir, thumbnail_cache_size=thumbnail_cache_size)
     frame.Show(True)
     app.MainLoop()
 
@@ -0,0 +1,114 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# Recognizes video files by the signature at the start of the file rather than
+# by their extension, so that misnamed files aren't passed to `melt` and files
+# with uncommon or upper case extensions aren't skipped. Only the first few KiB
+# of a file are read and no process is started. Containers which might only
+# contain audio (e.g. MP4 with an audio brand, FLV without video flag, Ogg
+# without Theora stream, RIFF WAVE) are rejected where the header allows to
+# tell.
+
+import logging
+import struct
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+sniff_size = 4096
+iso_media_containers = ["mp4", "mov", "3gp"] # the containers which can be cut by MP4Box
+iso_audio_brands = ["M4A ", "M4B ", "M4P ", "F4A ", "F4B "]
+quicktime_atom_types = ["moov", "mdat", "free", "skip", "wide", "pnot"] # QuickTime files without `ftyp` atom
+ts_packet_size = 188
+
+def sniff_container(file_path):
+    """Reads the first `sniff_size` bytes of `file_path` and compares them to
+    the signatures of common video containers.
+    @return the name of the container (e.g. `mp4`, `matroska`, `avi`) or `None`
+    if the file isn't recognized as video file or can't be read"""
+    try:
+        with open(file_path, "rb") as file0:
+            header = file0.read(sniff_size)
+    except IOError as ex:
+        logger.debug("reading '%s' failed: %s" % (file_path, str(ex), ))
+        return None
+    return sniff_header(header)
+
+def sniff_header(header):
+    """@return the name of the container whose signature `header` (the start
+    of a file) contains or `None`"""
+    if len(header) < 12:
+        return None
+    if header[4:8] == b"ftyp":
+        major_brand = header[8:12].decode("latin-1")
+        if major_brand in iso_audio_brands:
+            return None
+        if major_brand == "qt  ":
+            return "mov"
+        if major_brand.startswith("3g"):
+            return "3gp"
+        return "mp4"
+    if header[4:8].decode("latin-1") in quicktime_atom_types:
+        return "mov"
+    if header[0:4] == b"\x1a\x45\xdf\xa3": # EBML
+        if b"webm" in header[:64]: # DocType element
+            return "webm"
+        return "matroska"
+    if header[0:4] == b"RIFF" and header[8:12] in (b"AVI ", b"AVIX"):
+        return "avi"
+    if header[0:3] == b"FLV":
+        flags = struct.unpack("B", header[4:5])[0]
+        if flags & 0x01 == 0: # no video tags
+            return None
+        return "flv"
+    if header[0:4] == b"\x00\x00\x01\xba": # pack header
+        return "mpeg"
+    if header[0:4] == b"\x00\x00\x01\xb3": # sequence header of an elementary stream
+        return "mpegvideo"
+    if len(header) >= 3*ts_packet_size and all([header[i*ts_packet_size:i*ts_packet_size+1] == b"\x47" for i in range(3)]):
+        return "mpegts"
+    if len(header) >= 3*(ts_packet_size+4) and all([header[i*(ts_packet_size+4)+4:i*(ts_packet_size+4)+5] == b"\x47" for i in range(3)]): # M2TS has a 4 byte timestamp in front of every packet
+        return "mpegts"
+    if header[0:4] == b"OggS":
+        if b"\x80theora" in header or b"OVP80" in header or b"BBCD" in header: # identification headers of Theora, VP8 and Dirac streams
+            return "ogg"
+        return None
+    if header[0:16] == b"\x30\x26\xb2\x75\x8e\x66\xcf\x11\xa6\xd9\x00\xaa\x00\x62\xce\x6c": # ASF header object GUID
+        return "asf"
+    if header[0:4] == b".RMF":
+        return "rm"
+    return None
+
+def is_video_file(file_path):
+    """@return `True` if `file_path` starts with the signature of a video
+    container, `False` otherwise"""
+    return sniff_container(file_path) is not None
@@ -27,7 +27,6 @@
 #    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
 #    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
 
-import bs4
 import logging
 import os
 import subprocess as sp
@@ -35,10 +34,35 @@ import collections
 import plac
 import python_essentials
 import python_essentials.lib
-import python_essentials.lib.os_utils as os_utils
 import video_splitter_globals
 import pkg_resources
+import multiprocessing
+import worker_pool
+import mp4box_utils
+import detection_cache
+import container_index
+import melt_xml
+import capabilities
+import detectors
+import journal
+import folder_watcher
+import job_queue
+import video_sniffer
+import tracing
+import process_runner
+import progress
+import scratch_space
+import split_plan
 import threading
+import shlex
+import xml.etree.cElementTree as ElementTree
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir # backport for python 2
+    except ImportError:
+        scandir = None
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -49,6 +73,16 @@ logger.addHandler(ch)
 melt_default = "melt"
 melt_command_tail_default = ["f=mp4", "accodec=acc", "ab=256k", ]
 recursive_default = False
+jobs_default = multiprocessing.cpu_count()
+single_pass_default = False
+copy_default = False
+cache_dir_default = detection_cache.cache_dir_default
+cache_size_default = detection_cache.cache_size_default
+detector_default = detectors.MeltDetector.name
+detect_overlap_default = 250
+detect_tolerance_default = 2
+resume_default = False
+merge_tolerance_default = 0
 
 # melt encode process might fail with error
 # `max_analyze_duration 5000000 reached` (not yet researched whether a specific
@@ -59,119 +93,794 @@ melt_encode_analyse_duration = 50000000
 
 app_version = pkg_resources.require("video_splitter")[0].version
 
-__input_path_doc__ = "A file to be processed or a directory of which all contained video files will be processed (non-video files are ignored)"
+__input_path_doc__ = "A file to be processed or a directory of which all contained video files will be processed (non-video files are recognized by their content and ignored)"
 __output_dir_path_doc__ = "An existing directory into which the resulting clips are copied"
 __melt_doc__ = "Path to a melt binary"
 __melt_command_tail_doc__ = "A string to be appended to the invokation of `melt -consumer avformat:out.avi` (where `out.avi` is contructed programmatically from `output_dir_path` and `input_path`) which allows control of output generation with the full set of melt commands and features"
+__jobs_doc__ = "The maximal number of clips which are encoded concurrently (defaults to the number of CPU cores)"
+__detect_jobs_doc__ = "The maximal number of files which are analysed for scene changes concurrently (defaults to the value of `jobs`)"
+__single_pass_doc__ = "Create all clips of an input file with one `melt` process which decodes the file once from the first to the last scene change instead of starting one `melt` process per clip which has to seek to the start of the clip (uses the `segment` muxer of libavformat, so that clips might start at the first keyframe after the scene change if the encoder doesn't create a keyframe at the scene change)"
+__copy_doc__ = "Cut MP4, MOV and 3GP files with `mp4box` without re-encoding (which is much faster, but moves every cut to the nearest keyframe; the distance is logged). Other files are re-encoded with `melt` as usual"
+__mp4box_doc__ = "Path to a MP4Box binary which is used for cutting if `copy` is specified"
+__cache_dir_doc__ = "A directory where the results of scene detection are cached, so that files don't need to be analysed again if only the encoding parameters change or a run has been interrupted"
+__cache_size_doc__ = "The maximal size of the scene detection cache in MiB (the least recently used results are removed if it's exceeded)"
+__no_cache_doc__ = "Don't read or write cached scene detection results"
+__detect_window_doc__ = "Split files which are longer than this number of frames into windows of this number of frames which are analysed for scene changes in parallel (by default files are analysed in one pass)"
+__detect_overlap_doc__ = "The number of frames by which the windows of `detect_window` are extended on both sides, so that scene changes close to the window border are detected like in a single pass"
+__detect_tolerance_doc__ = "Scene changes which are detected in different windows of `detect_window` are merged if they are at most this number of frames apart"
+__detector_doc__ = "The engine which is used for scene detection: `motion_est` uses melt's `motion_est` filter (requires a GPL-enabled build of MLT), `numpy` compares histograms of downscaled frames decoded by melt with NumPy (much faster)"
+__coarse_step_doc__ = "Find candidate scene changes on a proxy with a tiny resolution which only looks at every `coarse_step`th frame first and run `detector` only on some frames around every candidate (requires NumPy)"
+__resume_doc__ = "Continue an interrupted run in `output_dir_path` (which doesn't need to be empty then) based on the journal which every run writes there: scene changes are taken from the journal and clips which have been completed and are unchanged are skipped, missing or truncated clips are created again"
+__verify_clips_doc__ = "Record the SHA-1 hash of every clip in the journal and compare it when a run is resumed which reads every clip completely (by default clips are compared by size and modification time)"
+__watch_doc__ = "Keep running and process every new file in `input_path` (which has to be a directory) as soon as it hasn't changed for `settle_time` seconds instead of processing the files which exist at start once (uses inotify if `pyinotify` is installed, otherwise scans the directory every few seconds; stop with Ctrl+C)"
+__settle_time_doc__ = "The number of seconds the size and modification time of a file mustn't change before it's processed in `watch` mode"
+__job_queue_dir_doc__ = "A directory (e.g. on a network filesystem) through which several video-splitter processes on one or more hosts share the work: every input file is processed by the process which claims it first and skipped by the others (implies `resume`, so that all processes can use the same output directory; every process writes a journal file of its own there)"
+__lease_timeout_doc__ = "The number of seconds after which a file claimed in `job_queue_dir` by a process which stopped sending heartbeats (e.g. because it crashed) can be claimed by another process"
+__longest_first_doc__ = "Retrieve the length of all input files first and process the longest files first, so that a long file doesn't keep one worker busy after all other files have been processed (the files are only processed after the whole input directory has been scanned)"
+__trace_doc__ = "Record the time spent in every stage (detection, encoding, waiting for a worker, etc.) per file and clip with CPU time, peak memory usage and exit code of the subprocesses and the number of bytes written, write it to this file in the Chrome trace event format (open it in `chrome://tracing` or https://ui.perfetto.dev) and log a summary table at the end"
+__plan_doc__ = "Only detect the scenes of all input files and write the resulting clips to this file instead of encoding them: as JSON plan which can be encoded later (possibly on another host) with `execute_plan` if the file name ends with `.json`, as CMX 3600 EDL if it ends with `.edl` and as MLT XML if it ends with `.mlt`"
+__execute_plan_doc__ = "Treat `input_path` as JSON plan written with `plan` and create its clips without detecting scenes again (with `melt_command_tail` instead of the one stored in the plan if it's specified)"
+__min_scene_length_doc__ = "Merge scenes which are shorter than this number of frames (or seconds if followed by `s`, e.g. `1.5s`) into the following scene (the last scene into the previous one), so that bursts of scene changes (e.g. on flashes or fast pans) don't create a lot of tiny clips"
+__merge_tolerance_doc__ = "Ignore scene changes which are at most this number of frames after the previous scene change"
+__scratch_dir_doc__ = "A directory (ideally on a fast local disk) where clips are encoded before they're moved to `output_dir_path`, so that the output directory (e.g. on a network storage) only receives complete clips. Encodes are only started if the scratch and the output directory have enough free space for the size of the clip which is estimated from the size of the input file (they're held back until running encodes finish otherwise)"
 __recursive_doc__ = "Scan directories recursively for files to process (be careful because you might include files you didn't want to). Has no effect when `input_path` is not a directory."
 
+DetectionResult = detectors.DetectionResult
+
 class AbstractVideoSplitter:
     """A class to maximize code reusage in video_splitter_remove_trailing_frame"""
-    def __init__(self, input_path, output_dir_path, melt=melt_default, melt_command_tail=melt_command_tail_default, recursive=recursive_default):
+    def __init__(self, input_path, output_dir_path, melt=melt_default, melt_command_tail=melt_command_tail_default, recursive=recursive_default, cache_dir=cache_dir_default, cache_size=cache_size_default, detector=detector_default, coarse_step=None, resume=resume_default, index_dir=container_index.index_dir_default, detect_window=None, detect_overlap=detect_overlap_default, detect_tolerance=detect_tolerance_default, progress_callback=None):
         """
         @args input_path %(__input_path_doc__)s
         @args output_dir_path %(__output_dir_path_doc__)s
         @args melt_doc %(__melt_doc__)s
         @args melt_command_tail %(__melt_command_tail_doc__)s
         @args recursive %(__recursive_doc__)s
-        """ % {"__input_path_doc__": __input_path_doc__, "__output_dir_path_doc__": __output_dir_path_doc__, "__melt_doc__": __melt_doc__, "__melt_command_tail_doc__": __melt_command_tail_doc__, "__recursive_doc__": __recursive_doc__}
+        @args cache_dir %(__cache_dir_doc__)s (`None` disables the cache)
+        @args cache_size %(__cache_size_doc__)s
+        @args detector %(__detector_doc__)s (`None` if no scenes are detected, e.g. by `remove_trailing_frame` or when plans are executed, so that the requirements of the detector like the `motion_est` filter aren't checked)
+        @args coarse_step %(__coarse_step_doc__)s
+        @args resume %(__resume_doc__)s
+        @args index_dir the directory where the indices of MP4, MOV, 3GP and AVI files are cached (`None` disables the cache)
+        @args detect_window %(__detect_window_doc__)s
+        @args detect_overlap %(__detect_overlap_doc__)s
+        @args detect_tolerance %(__detect_tolerance_doc__)s
+        @args progress_callback a function which is invoked with a `progress.Progress` of the input file whenever a detection or encoding process reports progress (the progress is logged regularly in any case)
+        """ % {"__detect_window_doc__": __detect_window_doc__, "__detect_overlap_doc__": __detect_overlap_doc__, "__detect_tolerance_doc__": __detect_tolerance_doc__, "__input_path_doc__": __input_path_doc__, "__output_dir_path_doc__": __output_dir_path_doc__, "__melt_doc__": __melt_doc__, "__melt_command_tail_doc__": __melt_command_tail_doc__, "__recursive_doc__": __recursive_doc__, "__cache_dir_doc__": __cache_dir_doc__, "__cache_size_doc__": __cache_size_doc__, "__detector_doc__": __detector_doc__, "__coarse_step_doc__": __coarse_step_doc__, "__resume_doc__": __resume_doc__}
         if not os.path.exists(input_path):
             raise ValueError("input_path '%s' doesn't exist" % (input_path, ))
         if not os.path.exists(output_dir_path):
             logger.info("creating non-existing output directory '%s'" % (output_dir_path, ))
             os.makedirs(output_dir_path)
-        elif len(os.listdir(output_dir_path)) > 0:
+        elif resume is False and len(os.listdir(output_dir_path)) > 0:
             raise ValueError("output_dir_path '%s' isn't empty" % (output_dir_path, ))
         if not os.path.isdir(output_dir_path):
             raise ValueError("output_dir_path '%s' isn't a directory" % (output_dir_path, ))
         self.output_dir_path = output_dir_path
-        if os.path.isfile(input_path):
-            self.input_files = [input_path.decode("utf-8")] # .decode("utf-8") avoids `UnicodeDecodeError: 'ascii' codec can't decode byte 0xc2 in position 28: ordinal not in range(128)`
-        elif os.path.isdir(input_path):
-            if recursive is False:
-                self.input_files = [os.path.join(input_path, i).decode("utf-8") for i in os.listdir(input_path)]
-            else:
-                self.input_files = []
-                for dirpath, dirnames, filenames in os.walk(input_path):
-                    self.input_files += [os.path.join(dirpath, i).decode("utf-8") for i in filenames]
-                logger.debug("added %d files under '%s' recursively" % (len(self.input_files), input_path, ))
-        else:
-            raise AssertionError("file_name '%s' is neither file nor directory" % (file_name, ))
+        self.resume = resume
+        self.recursive = recursive
+        if not os.path.isfile(input_path) and not os.path.isdir(input_path):
+            raise AssertionError("input_path '%s' is neither file nor directory" % (input_path, ))
+        self.input_path = input_path
         # validating installation of aac audio codec (there might be other codecs available, but not figured out yet how to check their availability in melt)
         aac_binary = "aac-enc"
-        if os_utils.which(aac_binary) is None:
+        if not capabilities.binary_available(aac_binary):
             raise RuntimeError("The aac codec is not installed on your system (the binary '%s' is missing). Install it and try again" % (aac_binary, ))
-        if os_utils.which(melt) is None:
+        if not capabilities.binary_available(melt):
             raise RuntimeError("The melt binary '%s' is not available. Install it and try again" % (melt, ))
-        analyseplugin_binary = "/usr/bin/analyseplugin"
-        applyplugin_binary = "/usr/bin/applyplugin"
-        listplugin_binary = "/usr/bin/listplugins"
-        if not os.path.exists(analyseplugin_binary) or not os.path.exists(applyplugin_binary) or not os.path.exists(listplugin_binary):
+        analyseplugin_binary = "analyseplugin" # looked up in `PATH` rather than in `/usr/bin` only
+        applyplugin_binary = "applyplugin"
+        listplugin_binary = "listplugins"
+        if not capabilities.binary_available(analyseplugin_binary) or not capabilities.binary_available(applyplugin_binary) or not capabilities.binary_available(listplugin_binary):
             raise RuntimeError("one or more of the binaries '%s', '%s' and '%s' are missing which indicates that ladspa-sdk is missing. Install it and try again." % (analyseplugin_binary, applyplugin_binary, listplugin_binary, ))
         self.melt = melt
         self.melt_command_tail = melt_command_tail
+        if detect_window is not None and detect_window < 1:
+            raise ValueError("detect_window has to be at least 1, but is %d" % (detect_window, ))
+        if detect_overlap < 0:
+            raise ValueError("detect_overlap mustn't be negative, but is %d" % (detect_overlap, ))
+        self.detect_window = detect_window
+        self.detect_overlap = detect_overlap
+        self.detect_tolerance = detect_tolerance
+        self.shardPool = None # windows are analysed sequentially without a pool (subclasses might create one)
+        if detector is None:
+            self.detector = None
+        else:
+            self.detector = detectors.create_detector(detector, melt, coarse_step)
+        self.journal = None # only written by subclasses which create clips
+        self.progressReporter = progress.ProgressReporter(progress_callback) # one task per input file, subclasses add the encoding of clips as parts
+        if cache_dir is None or self.detector is None:
+            self.detectionCache = None
+        else:
+            self.detectionCache = detection_cache.DetectionCache(cache_dir, cache_size*1024*1024, self.analysisIdentity()) # results of windowed detection can differ from the ones of a single pass
+        if index_dir is None:
+            self.indexCache = None
+        else:
+            self.indexCache = container_index.IndexCache(index_dir, container_index.index_size_default*1024*1024)
+
+    def inputFiles(self):
+        """A generator which yields the files to process while the directory
+        tree is scanned, so that processing can start before large trees have
+        been scanned completely."""
+        if os.path.isfile(self.input_path):
+            yield self.input_path.decode("utf-8") # .decode("utf-8") avoids `UnicodeDecodeError: 'ascii' codec can't decode byte 0xc2 in position 28: ordinal not in range(128)`
+            return
+        file_count = 0
+        for input_file in iter_files(self.input_path, self.recursive):
+            file_count += 1
+            yield input_file.decode("utf-8")
+        logger.debug("found %d files under '%s'" % (file_count, self.input_path, ))
+
+    def detectScenes(self, input_file):
+        """Retrieves the scene changes of `input_file` from the detection cache
+        or runs the detector on it.
+        @return a `DetectionResult` or `None` if melt failed or didn't provide a
+        result"""
+        if self.journal is not None:
+            entry = self.journal.getShots(input_file)
+            if entry is not None:
+                logger.info("using scene split markers of file '%s' from journal" % (input_file, ))
+                return DetectionResult(**entry)
+        if self.detectionCache is not None:
+            entry = self.detectionCache.get(input_file)
+            if entry is not None:
+                logger.info("using cached scene split markers for file '%s'" % (input_file, ))
+                detection_result = DetectionResult(**entry)
+                if self.journal is not None:
+                    self.journal.recordShots(input_file, detection_result._asdict())
+                return detection_result
+        detection_result = None
+        length = None
+        if self.detect_window is not None:
+            length = self.probeLength(input_file)
+            if length is not None and length > self.detect_window+self.detect_overlap:
+                with tracing.span("detect_sharded", "file", file=input_file):
+                    frames = self.__detectScenesSharded__(input_file, length)
+                if frames is None:
+                    return None
+                detection_result = DetectionResult(frames, length-1)
+        if detection_result is None:
+            if length is None:
+                length = self.__detectionLength__(input_file)
+            part = "detection"
+            if length is not None: # no progress is reported otherwise
+                self.progressReporter.addPart(input_file, part, length)
+            try:
+                with tracing.span("detect", "file", file=input_file, detector=self.detector.name):
+                    detection_result = self.detector.detect(input_file, progress_callback=lambda frame, percentage: self.progressReporter.update(input_file, part, frame, percentage))
+            finally:
+                self.progressReporter.finishPart(input_file, part)
+            if detection_result is None:
+                logger.error("scene detection of '%s' failed, skipping input file" % (input_file, ))
+                return None
+        if detection_result.frames is None or len(detection_result.frames) == 0:
+            logger.info("no split result for '%s', skipping (mlt source installation might cause trouble, consider running `sudo make uninstall` in source root and install ` melt` in package manager" % (input_file, ))
+            return None
+        self.__recordDetectionResult__(input_file, detection_result)
+        return detection_result
+
+    def __detectionLength__(self, input_file):
+        """@return the number of frames of `input_file` from its container index
+        or melt if the container isn't supported (`None` if both fail)"""
+        index = self.readIndex(input_file) # cached for the creation of the clips
+        if index is not None:
+            return index.frame_count
+        return self.probeLength(input_file)
+
+    def analysisIdentity(self):
+        """@return a string which identifies the detector, its parameters and
+        the windows of the detection, i.e. everything which affects the
+        detected scene changes (`None` without a detector)"""
+        if self.detector is None:
+            return None
+        if self.detect_window is None:
+            return self.detector.identity()
+        return "%s window %d %d %d" % (self.detector.identity(), self.detect_window, self.detect_overlap, self.detect_tolerance, )
+
+    def __recordDetectionResult__(self, input_file, detection_result):
+        if self.detectionCache is not None:
+            self.detectionCache.put(input_file, detection_result._asdict())
+        if self.journal is not None:
+            self.journal.recordShots(input_file, detection_result._asdict())
+
+    def probeLength(self, input_file):
+        """Retrieves the number of frames of `input_file` from the XML
+        description which melt writes without processing any frames.
+        @return the number of frames or `None` if melt failed"""
+        with tracing.span("probe", "file", file=input_file):
+            melt_process = sp.Popen([self.melt, input_file, "-consumer", "xml", ], stdout=sp.PIPE, stderr=open(os.devnull, "w"))
+            try:
+                melt_xml_summary = melt_xml.parse_melt_xml(melt_process.stdout, stop_at_shot_change_list=False)
+            except ElementTree.ParseError as ex:
+                melt_xml_summary = None
+            melt_process.stdout.close()
+            tracing.wait_process(melt_process)
+        if melt_process.returncode != 0 or melt_xml_summary is None or len(melt_xml_summary.producer_outs) != 1:
+            logger.warning("retrieving the length of '%s' failed" % (input_file, ))
+            return None
+        return int(melt_xml_summary.producer_outs[0])+1
+
+    def readIndex(self, input_file):
+        """Reads the frame rate, the number of frames and the keyframes of
+        `input_file` from its container index (or the cached copy of it)
+        without starting a process.
+        @return a `container_index.ContainerIndex` or `None` if the container
+        isn't supported or its index can't be read"""
+        with tracing.span("index", "file", file=input_file):
+            try:
+                if self.indexCache is None:
+                    return container_index.read_index(input_file)
+                return self.indexCache.get(input_file)
+            except (ValueError, EnvironmentError) as ex:
+                logger.debug("reading the index of '%s' failed: %s" % (input_file, str(ex), ))
+                return None
+
+    def __detectScenesSharded__(self, input_file, length):
+        """Detects scene changes in windows of `detect_window` frames of
+        `input_file` in parallel. Every window is extended by `detect_overlap`
+        frames on both sides, so that the motion estimation has the same
+        context at the window borders as in a single pass, but only the scene
+        changes inside the window itself are used. Scene changes which are
+        closer than `detect_tolerance` frames are merged.
+        @return the sorted list of frames where a new scene starts in the
+        format of `detectors.DetectionResult`, an empty list if no window
+        contains a scene change or `None` if the detection of a window
+        failed"""
+        windows = []
+        for window_start in range(0, length, self.detect_window):
+            window_end = min(window_start+self.detect_window, length) # exclusive
+            windows.append((window_start, window_end, max(0, window_start-self.detect_overlap), min(length-1, window_end-1+self.detect_overlap)))
+        logger.info("finding scene split markers for file '%s' in %d windows" % (input_file, len(windows), ))
+        window_results = [None]*len(windows)
+        windows_done = threading.Semaphore(0)
+        def __detect_window__(index, in_frame, out_frame, part):
+            try:
+                with tracing.span("detect_window", "window", file=input_file, in_frame=in_frame, out_frame=out_frame, detector=self.detector.name):
+                    window_results[index] = self.detector.detect(input_file, in_frame, out_frame, lambda frame, percentage: self.progressReporter.update(input_file, part, frame, percentage))
+            finally:
+                self.progressReporter.finishPart(input_file, part)
+                windows_done.release()
+        parts = ["detection of window from frame %d to %d" % (in_frame, out_frame, ) for window_start, window_end, in_frame, out_frame in windows]
+        for (window_start, window_end, in_frame, out_frame), part in zip(windows, parts):
+            self.progressReporter.addPart(input_file, part, out_frame-in_frame+1) # all at once, so that the estimate covers the whole file
+        for index, (window_start, window_end, in_frame, out_frame) in enumerate(windows):
+            description = "%s (window from frame %d to %d)" % (input_file, in_frame, out_frame, )
+            if self.shardPool is None:
+                __detect_window__(index, in_frame, out_frame, parts[index])
+            else:
+                self.shardPool.submit(description, __detect_window__, index, in_frame, out_frame, parts[index])
+        for window in windows:
+            windows_done.acquire()
+        frames = []
+        for (window_start, window_end, in_frame, out_frame), window_result in zip(windows, window_results):
+            if window_result is None:
+                logger.error("scene detection of '%s' failed for the window from frame %d to %d, skipping input file" % (input_file, in_frame, out_frame, ))
+                return None
+            for frame in detectors.scene_changes(window_result):
+                frame += in_frame # positions are relative to the `in` point
+                if window_start <= frame < window_end:
+                    frames.append(frame)
+        merged_frames = []
+        for frame in sorted(frames):
+            if len(merged_frames) > 0 and frame-merged_frames[-1] <= self.detect_tolerance:
+                continue
+            merged_frames.append(frame)
+        if len(merged_frames) == 0:
+            return []
+        return [0]+merged_frames+[length] # the first frame and the end marker
 
 class VideoSplitter(AbstractVideoSplitter):
-    def __init__(self, input_path, output_dir_path, melt=melt_default, melt_command_tail=melt_command_tail_default, recursive=recursive_default):
-        AbstractVideoSplitter.__init__(self, input_path, output_dir_path, melt, melt_command_tail, recursive)
+    def __init__(self, input_path, output_dir_path, melt=melt_default, melt_command_tail=melt_command_tail_default, recursive=recursive_default, jobs=jobs_default, detect_jobs=None, single_pass=single_pass_default, copy=copy_default, mp4box=mp4box_utils.mp4box_default, cache_dir=cache_dir_default, cache_size=cache_size_default, detect_window=None, detect_overlap=detect_overlap_default, detect_tolerance=detect_tolerance_default, detector=detector_default, coarse_step=None, resume=resume_default, job_queue_dir=None, lease_timeout=job_queue.lease_timeout_default, longest_first=False, progress_callback=None, scratch_dir=None, min_scene_length=None, merge_tolerance=merge_tolerance_default, verify_clips=False):
+        """
+        @args jobs %(__jobs_doc__)s
+        @args detect_jobs %(__detect_jobs_doc__)s
+        @args single_pass %(__single_pass_doc__)s
+        @args copy %(__copy_doc__)s
+        @args mp4box %(__mp4box_doc__)s
+        @args detect_window %(__detect_window_doc__)s
+        @args detect_overlap %(__detect_overlap_doc__)s
+        @args detect_tolerance %(__detect_tolerance_doc__)s
+        @args job_queue_dir %(__job_queue_dir_doc__)s
+        @args lease_timeout %(__lease_timeout_doc__)s
+        @args longest_first %(__longest_first_doc__)s
+        @args scratch_dir %(__scratch_dir_doc__)s
+        @args min_scene_length %(__min_scene_length_doc__)s (an `int` or a string, `None` keeps all scenes)
+        @args merge_tolerance %(__merge_tolerance_doc__)s
+        @args verify_clips %(__verify_clips_doc__)s
+        @args progress_callback a function which is invoked with a `progress.Progress` of the input file whenever a detection or encoding process reports progress (the progress is logged regularly in any case)
+        """ % {"__verify_clips_doc__": __verify_clips_doc__, "__min_scene_length_doc__": __min_scene_length_doc__, "__merge_tolerance_doc__": __merge_tolerance_doc__, "__scratch_dir_doc__": __scratch_dir_doc__, "__longest_first_doc__": __longest_first_doc__, "__job_queue_dir_doc__": __job_queue_dir_doc__, "__lease_timeout_doc__": __lease_timeout_doc__, "__jobs_doc__": __jobs_doc__, "__detect_jobs_doc__": __detect_jobs_doc__, "__single_pass_doc__": __single_pass_doc__, "__copy_doc__": __copy_doc__, "__mp4box_doc__": __mp4box_doc__, "__detect_window_doc__": __detect_window_doc__, "__detect_overlap_doc__": __detect_overlap_doc__, "__detect_tolerance_doc__": __detect_tolerance_doc__}
+        if job_queue_dir is not None:
+            resume = True
+        if cache_dir is None:
+            index_dir = None # `no_cache` disables all caches
+        else:
+            index_dir = container_index.index_dir_default
+        AbstractVideoSplitter.__init__(self, input_path, output_dir_path, melt, melt_command_tail, recursive, cache_dir, cache_size, detector, coarse_step, resume, index_dir, detect_window, detect_overlap, detect_tolerance, progress_callback)
+        if jobs < 1:
+            raise ValueError("jobs has to be at least 1, but is %d" % (jobs, ))
+        if detect_jobs is None:
+            detect_jobs = jobs
+        elif detect_jobs < 1:
+            raise ValueError("detect_jobs has to be at least 1, but is %d" % (detect_jobs, ))
+        self.jobs = jobs
+        self.detect_jobs = detect_jobs
+        self.single_pass = single_pass
+        if copy is True and not capabilities.binary_available(mp4box):
+            raise RuntimeError("The MP4Box binary '%s' is not available. Install it (on Ubuntu the package `gpac`) and try again" % (mp4box, ))
+        self.copy = copy
+        self.mp4box = mp4box
+        self.longest_first = longest_first
+        if min_scene_length is None:
+            self.min_scene_length = None
+        else:
+            self.min_scene_length = parse_scene_length(min_scene_length) # a tuple of length and whether it's in seconds
+        if merge_tolerance < 0:
+            raise ValueError("merge_tolerance mustn't be negative, but is %d" % (merge_tolerance, ))
+        self.merge_tolerance = merge_tolerance
+        self.avoided_clips = 0 # the number of clips which have been merged into other clips by `min_scene_length` and `merge_tolerance`
+        self.avoided_clips_lock = threading.Lock()
+        if scratch_dir is not None and not os.path.isdir(scratch_dir):
+            raise ValueError("scratch_dir '%s' isn't a directory" % (scratch_dir, ))
+        self.scratch_dir = scratch_dir
+        self.scratchSpace = None # created in start, so that planning doesn't leave a staging directory behind
+        self.journal = None # opened in start, so that planning doesn't write into the output directory
+        self.verify_clips = verify_clips
+        self.detectPool = None # created in start
+        self.encodePool = None
+        if job_queue_dir is None:
+            self.jobQueue = None
+        else:
+            self.jobQueue = job_queue.JobQueue(job_queue_dir, lease_timeout)
+        self.fileTasks = {} # input file -> list of the number of pending tasks and whether one failed, used to mark the file as done in `jobQueue`
+        self.fileTasksLock = threading.Lock()
 
     def split(self):
-        def __split__(input_file):
-            video_file_extension = retrieve_file_extension(input_file)
-            if not video_file_extension in video_splitter_globals.video_file_extensions:
-                logger.debug("skipping non-video file '%s' based on extension" % (input_file, ))
+        """Analyses all input files in a pool of `detect_jobs` workers and
+        passes every resulting scene as a separate task to a pool of `jobs`
+        encoding workers, so that clips of one file are encoded in parallel as
+        well. Input files are queued in order and the queues are bounded so
+        that neither stage starts more `melt` processes than its limit allows.
+        The clips which failed to encode are available in `failed_clips`
+        afterwards. Every detection result and completed clip is recorded in
+        the journal, so that an interrupted run can be resumed."""
+        input_files = self.inputFiles()
+        if self.longest_first is True:
+            input_files = self.__sortLongestFirst__(input_files)
+        self.start()
+        for input_file in input_files:
+            self.submit(input_file)
+        self.finish()
+
+    def __sortLongestFirst__(self, input_files):
+        """Retrieves the lengths of all video files in `input_files` in
+        parallel.
+        @return the video files sorted by decreasing length (files whose
+        length couldn't be retrieved last)"""
+        lengths = {}
+        lengths_lock = threading.Lock()
+        def __probe__(input_file):
+            length = self.probeLength(input_file)
+            with lengths_lock:
+                lengths[input_file] = length
+        probe_pool = worker_pool.WorkerPool("probe", self.detect_jobs)
+        for input_file in input_files:
+            if video_sniffer.is_video_file(input_file):
+                probe_pool.submit(input_file, __probe__, input_file)
+        probe_pool.shutdown()
+        logger.info("retrieved the lengths of %d files, processing the longest first" % (len(lengths), ))
+        return sorted(lengths.keys(), key=lambda input_file: (lengths[input_file] is None, -(lengths[input_file] or 0), input_file))
+
+    def start(self):
+        """Starts the detection and encoding workers, so that files can be
+        passed to `submit` until `finish` is invoked."""
+        self.scratchSpace = scratch_space.ScratchSpace(self.output_dir_path, self.scratch_dir) # checks free space also without a scratch directory
+        self.journal = journal.Journal(self.output_dir_path, self.analysisIdentity(), self.verify_clips, shared=self.jobQueue is not None)
+        self.detectPool = worker_pool.WorkerPool("detect", self.detect_jobs)
+        self.encodePool = worker_pool.WorkerPool("encode", self.jobs)
+        if self.detect_window is not None:
+            self.shardPool = worker_pool.WorkerPool("detect-window", self.detect_jobs) # separate from detectPool because its tasks wait for the windows
+
+    def submit(self, input_file):
+        """Queues `input_file` for scene detection and encoding of its clips.
+        Blocks while the queue is full."""
+        self.detectPool.submit(input_file, self.__splitFile__, input_file)
+
+    def execute(self, plan):
+        """Queues the clips of the `split_plan.SplitPlan` `plan` for encoding
+        like `submit` without detecting scenes again. Blocks while the queue
+        is full."""
+        self.__checkPlan__(plan)
+        self.detectPool.submit(plan.input_file, self.__splitFile__, plan.input_file, plan) # the file is claimed in the job queue before its clips are queued
+
+    def plans(self):
+        """Detects the scenes of all input files in a pool of `detect_jobs`
+        workers without encoding anything or writing into the output
+        directory.
+        @return a list of the `split_plan.SplitPlan`s of all video files whose
+        scene detection succeeded in the order of the input files"""
+        input_files = list(self.inputFiles())
+        plans = {}
+        plans_lock = threading.Lock()
+        def __plan__(input_file):
+            plan = self.plan(input_file)
+            with plans_lock:
+                plans[input_file] = plan
+        plan_pool = worker_pool.WorkerPool("plan", self.detect_jobs)
+        if self.detect_window is not None:
+            self.shardPool = worker_pool.WorkerPool("detect-window", self.detect_jobs)
+        for input_file in input_files:
+            plan_pool.submit(input_file, __plan__, input_file)
+        plan_pool.shutdown()
+        if self.shardPool is not None:
+            self.shardPool.shutdown()
+            self.shardPool = None
+        if len(plan_pool.failures) > 0:
+            logger.error("scene detection failed for %d file(s): %s" % (len(plan_pool.failures), ", ".join(["'%s'" % (description, ) for description, ex in plan_pool.failures]), ))
+        self.__logAvoidedClips__()
+        return [plans[input_file] for input_file in input_files if plans.get(input_file) is not None]
+
+    def executePlans(self, plans):
+        """Creates the clips of the list of `split_plan.SplitPlan`s `plans`
+        like `split`."""
+        for plan in plans:
+            self.__checkPlan__(plan) # before any clip is created
+        self.start()
+        for plan in plans:
+            self.execute(plan)
+        self.finish()
+
+    def __checkPlan__(self, plan):
+        if plan.mode == "copy" and not capabilities.binary_available(self.mp4box):
+            raise RuntimeError("The plan of '%s' cuts clips with MP4Box, but the MP4Box binary '%s' is not available. Install it (on Ubuntu the package `gpac`) and try again" % (plan.input_file, self.mp4box, ))
+
+    def finish(self):
+        """Waits for all submitted files to be processed and stops the
+        workers."""
+        logger.info("waiting for scene detection to finish")
+        self.detectPool.shutdown() # all encoding tasks have been submitted afterwards
+        if self.shardPool is not None:
+            self.shardPool.shutdown()
+            self.shardPool = None
+        logger.info("waiting for encoding to finish")
+        self.encodePool.shutdown()
+        if len(self.detectPool.failures) > 0:
+            logger.error("scene detection failed for %d file(s): %s" % (len(self.detectPool.failures), ", ".join(["'%s'" % (description, ) for description, ex in self.detectPool.failures]), ))
+        if len(self.encodePool.failures) > 0:
+            logger.error("encoding failed for %d clip(s): %s" % (len(self.encodePool.failures), ", ".join(["'%s'" % (description, ) for description, ex in self.encodePool.failures]), ))
+        self.failed_clips = [description for description, ex in self.encodePool.failures]
+        self.__logAvoidedClips__()
+        self.journal.close()
+        self.journal = None
+        self.scratchSpace.close()
+        self.scratchSpace = None
+        if self.jobQueue is not None:
+            self.jobQueue.close()
+
+    def __logAvoidedClips__(self):
+        if self.avoided_clips > 0:
+            logger.info("avoided %d encodes of short scenes in total" % (self.avoided_clips, ))
+
+    def watch(self, input_path, settle_time=folder_watcher.settle_time_default):
+        """Processes every file in the directory `input_path` once it settled
+        until the process is interrupted, then waits for the submitted files
+        to be processed.
+        @args settle_time %(__settle_time_doc__)s
+        """ % {"__settle_time_doc__": __settle_time_doc__}
+        folderWatcher = folder_watcher.FolderWatcher(input_path, self.recursive, settle_time, ignored_dir_paths=[self.output_dir_path])
+        self.start()
+        logger.info("watching '%s' for new files" % (input_path, ))
+        try:
+            for input_file in folderWatcher.watch():
+                self.submit(input_file.decode("utf-8")) # blocks while detection is busy, inotify events queue up meanwhile
+        except KeyboardInterrupt:
+            logger.info("stopped watching '%s'" % (input_path, ))
+        self.finish()
+
+    def __clipFileName__(self, input_file, clip_start, clip_end, extension="avi"):
+        return "%s-%s-%s.%s" % (os.path.basename(input_file), clip_start, clip_end, extension, )
+
+    def __clipComplete__(self, output_file_path):
+        if self.resume is True and self.journal.isClipComplete(output_file_path):
+            logger.info("skipping completed clip '%s'" % (output_file_path, ))
+            return True
+        if os.path.exists(output_file_path):
+            logger.info("creating incomplete clip '%s' again" % (output_file_path, ))
+        return False
+
+    def __splitFile__(self, input_file, plan=None):
+        if plan is None:
+            container = video_sniffer.sniff_container(input_file)
+            if container is None:
+                logger.debug("skipping non-video file '%s'" % (input_file, ))
                 return
-            split_filter_name = "motion_est" # in case mlt has not been configured with the `enable-gpl` flag at build time, the `motion_est` filter is not available, but the invokation succeeds nevertheless (the XML result is missing a filter section which is much more difficult to recognize than simply letting the script fail if the filter isn't present (which is tested with the following statement(s) and has been requested to be improved as https://sourceforge.net/p/mlt/bugs/222/)
-            melt_filter_test_process_output = sp.check_output([self.melt, "-query", "\"filter\"", ])
-            melt_filters = [i.strip(" -") for i in melt_filter_test_process_output.split("\n")]
-            if not split_filter_name in melt_filters:
-                raise RuntimeError("The melt binary '%s' can't use the filter '%s' which is used for scene splitting. Correct your melt installation by making the filter available (configure the build with `--enable-gpl` or check with the package maintainer(s) of your system) and ensure that the filter is available with `melt -query \"filter\" | grep %s`. Then run the script agin." % (melt, split_filter_name, split_filter_name, ))
-            melt_process_cmds = [self.melt, input_file, "-attach", "motion_est", "-consumer", "xml", "all=1", ]
-            logger.info("finding scene split markers for file '%s' with %s" % (input_file, str(melt_process_cmds)))
-            melt_process = sp.Popen(melt_process_cmds, stdout=sp.PIPE, stderr=sp.PIPE) # melt writes a lot of error message about missing frames or timestamps to stderr which don't affect the clip splitting in a significant way
-            melt_process_output_tuple = melt_process.communicate()
-            melt_process_output = melt_process_output_tuple[0]
-            if not melt_process.returncode == 0:
-                melt_process_output_stderr = melt_process_output_tuple[1]
-                logger.error("melt process failed with output '%s', skipping input file" % (melt_process_output_stderr, ))
+        if self.jobQueue is not None and not self.jobQueue.claim(input_file):
+            logger.info("skipping '%s' which is done or processed by another process" % (input_file, ))
+            return
+        with self.fileTasksLock:
+            self.fileTasks.setdefault(input_file, [0, False])[0] += 1
+        succeeded = False
+        try:
+            if plan is None:
+                plan = self.__planFile__(input_file, container)
+            if plan is not None:
+                self.__executePlan__(plan)
+                succeeded = True
+        finally:
+            self.__fileTaskFinished__(input_file, succeeded)
+
+    def __submitFileTask__(self, input_file, part, frame_count, function, *args):
+        """Submits `function` to the encoding pool and keeps track of the
+        pending tasks of `input_file`. The `frame_count` frames of the task
+        are added to the progress of `input_file` as `part`."""
+        with self.fileTasksLock:
+            self.fileTasks[input_file][0] += 1
+        self.progressReporter.addPart(input_file, part, frame_count)
+        description = "%s (%s)" % (input_file, part, )
+        with tracing.span("submit_encode", "queue", task=description):
+            self.encodePool.submit(description, self.__runFileTask__, input_file, part, function, args) # blocks while all encoding workers are busy which keeps detection from running too far ahead
+
+    def __runFileTask__(self, input_file, part, function, args):
+        succeeded = False
+        try:
+            function(*args)
+            succeeded = True
+        finally:
+            self.progressReporter.finishPart(input_file, part)
+            self.__fileTaskFinished__(input_file, succeeded)
+
+    def __fileTaskFinished__(self, input_file, succeeded):
+        with self.fileTasksLock:
+            file_tasks = self.fileTasks[input_file]
+            file_tasks[0] -= 1
+            if not succeeded:
+                file_tasks[1] = True
+            if file_tasks[0] > 0:
                 return
+            del self.fileTasks[input_file]
+        self.progressReporter.finishTask(input_file)
+        if self.jobQueue is not None:
+            if file_tasks[1]:
+                self.jobQueue.release(input_file) # another process can retry
+            else:
+                self.jobQueue.complete(input_file)
+
+    def plan(self, input_file):
+        """Detects the scenes of `input_file` and determines the clips which
+        would be created without encoding anything.
+        @return a `split_plan.SplitPlan` or `None` if `input_file` isn't a
+        video file or the scene detection failed"""
+        container = video_sniffer.sniff_container(input_file)
+        if container is None:
+            logger.debug("skipping non-video file '%s'" % (input_file, ))
+            return None
+        try:
+            return self.__planFile__(input_file, container)
+        finally:
+            self.progressReporter.finishTask(input_file)
+
+    def __planFile__(self, input_file, container):
+        detection_result = self.detectScenes(input_file)
+        if detection_result is None:
+            return None
+        frames = [int(i) for i in detection_result.frames]
+        frame_count = None if detection_result.frame_count is None else detection_result.frame_count+1
+        index = self.readIndex(input_file) # for seconds in `min_scene_length`, copy mode and the timecodes of exported plans
+        fps = None if index is None else index.fps
+        frames = self.__coalesceSceneChanges__(input_file, frames, fps)
+        if self.copy is True:
+            if container in video_sniffer.iso_media_containers:
+                return self.__planCopy__(input_file, frames, index)
+            logger.warning("'%s' isn't an ISO media file which can be cut with MP4Box, re-encoding it" % (input_file, ))
+        clips = self.__clips__(input_file, frames) # the same in both modes, so that a run can be resumed in the other mode
+        if self.single_pass is True:
+            return split_plan.SplitPlan(input_file, "single_pass", fps, frame_count, clips, list(self.melt_command_tail))
+        return split_plan.SplitPlan(input_file, "encode", fps, frame_count, clips, list(self.melt_command_tail))
+
+    def __clips__(self, input_file, frames, extension="avi"):
+        return [split_plan.Clip(clip_start, clip_end, self.__clipFileName__(input_file, clip_start, clip_end, extension)) for clip_start, clip_end in clip_boundaries(frames)]
+
+    def __coalesceSceneChanges__(self, input_file, frames, fps):
+        min_scene_length = 0
+        if self.min_scene_length is not None:
+            min_scene_length, seconds = self.min_scene_length
+            if seconds is True:
+                min_scene_length = int(round(min_scene_length*(fps or split_plan.fps_default)))
+        if min_scene_length <= 1 and self.merge_tolerance == 0:
+            return frames
+        coalesced_frames = coalesce_scene_changes(frames, min_scene_length, self.merge_tolerance)
+        if len(coalesced_frames) < len(frames):
+            logger.info("avoided %d encodes by merging short scenes of '%s' into their neighbours" % (len(frames)-len(coalesced_frames), input_file, ))
+            with self.avoided_clips_lock:
+                self.avoided_clips += len(frames)-len(coalesced_frames)
+        return coalesced_frames
 
-            soup = bs4.BeautifulSoup(melt_process_output, "lxml")
-            soup_properties = soup.find_all("property") # <property name="shot_change_list"> is sometimes in playlist and sometimes in produces (querying all property elements is easier than understanding that)
-            frames_string = None
-            for soup_property in soup_properties:
-                if soup_property["name"] == "shot_change_list":
-                    frames_string = soup_property.string
-                    break
-            if frames_string is None:
-                logger.info("no split result for '%s', skipping (mlt source installation might cause trouble, consider running `sudo make uninstall` in source root and install ` melt` in package manager" % (input_file, ))
+    def __planCopy__(self, input_file, frames, index):
+        if index is not None:
+            fps, frame_count, keyframes = index
+        else:
+            with tracing.span("keyframes", "file", file=input_file):
+                fps, frame_count, keyframes = mp4box_utils.retrieve_keyframes(self.mp4box, input_file) # e.g. fragmented files
+        cuts = mp4box_utils.snap_cuts(frames, keyframes, fps, input_file)
+        return split_plan.SplitPlan(input_file, "copy", fps, frame_count, self.__clips__(input_file, cuts, retrieve_file_extension(input_file)), [])
+
+    def __executePlan__(self, plan):
+        input_file = plan.input_file
+        logger.info("split file '%s' into %d clips" % (input_file, len(plan.clips)))
+        if len(plan.clips) == 0:
+            return
+        if plan.mode == "single_pass":
+            part = "all clips"
+            frame_count = plan.clips[-1].end-plan.clips[0].start+1
+            estimated_size = scratch_space.estimate_clip_size(input_file, plan.frame_count, frame_count)
+            self.__submitFileTask__(input_file, part, frame_count, self.__encodeSinglePass__, part, input_file, plan.clips, plan.melt_command_tail, estimated_size)
+            return
+        for clip in plan.clips:
+            output_file_path = os.path.join(self.output_dir_path, clip.output_file_name)
+            if self.__clipComplete__(output_file_path):
+                continue
+            part = "frame %d to %d" % (clip.start, clip.end, )
+            if plan.mode == "copy":
+                estimated_size = scratch_space.estimate_clip_size(input_file, plan.frame_count, clip.end-clip.start+1, factor=1.0) # no re-encoding
+                self.__submitFileTask__(input_file, part, clip.end-clip.start+1, self.__extractClip__, part, input_file, clip.start, clip.end, plan.fps, output_file_path, estimated_size) # MP4Box doesn't report progress, the frames count as done when the clip is extracted
+            else:
+                estimated_size = scratch_space.estimate_clip_size(input_file, plan.frame_count, clip.end-clip.start+1)
+                self.__submitFileTask__(input_file, part, clip.end-clip.start+1, self.__encodeClip__, part, input_file, clip.start, clip.end, output_file_path, plan.melt_command_tail, estimated_size)
+
+    def __encodeClip__(self, part, input_file, clip_start, clip_end, output_file_path, melt_command_tail, estimated_size):
+        staged_file_path = self.scratchSpace.stagingPath(output_file_path)
+        melt_encode_cmds = [self.melt, input_file, "in=%d" % (clip_start, ), "out=%d" % (clip_end, ), "analyzeduration", str(melt_encode_analyse_duration), "-consumer", "avformat:%s" % (staged_file_path, ), ]+melt_command_tail
+        logger.debug("creating clip from scene from frame %d to frame %d as '%s' with %s" % (clip_start, clip_end, output_file_path, str(melt_encode_cmds)))
+        self.scratchSpace.acquire(estimated_size, "%s (%s)" % (input_file, part, )) # blocks while there's not enough free space
+        try:
+            with tracing.span("encode", "clip", file=input_file, in_frame=clip_start, out_frame=clip_end) as encode_span:
+                melt_encode_result = process_runner.run_melt(melt_encode_cmds, lambda frame, percentage: self.progressReporter.update(input_file, part, frame, percentage)) # stderr is only kept in a bounded buffer for the error message
+                encode_span.recordOutputFile(staged_file_path)
+                if melt_encode_result.returncode != 0:
+                    raise RuntimeError("melt process failed with returncode %d and output:\n%s" % (melt_encode_result.returncode, melt_encode_result.stderr_tail, )) # only fails this clip, the encode pool records the failure and continues with the next clip
+            self.scratchSpace.commit(staged_file_path, output_file_path)
+        except:
+            self.scratchSpace.discard(staged_file_path) # don't leave a truncated clip
+            raise
+        finally:
+            self.scratchSpace.release(estimated_size)
+        self.journal.recordClip(output_file_path)
+
+    def __extractClip__(self, part, input_file, clip_start, clip_end, fps, output_file_path, estimated_size):
+        staged_file_path = self.scratchSpace.stagingPath(output_file_path)
+        self.scratchSpace.acquire(estimated_size, "%s (%s)" % (input_file, part, ))
+        try:
+            with tracing.span("extract", "clip", file=input_file, in_frame=clip_start, out_frame=clip_end) as extract_span:
+                mp4box_utils.extract(self.mp4box, input_file, clip_start, clip_end, fps, staged_file_path)
+                extract_span.recordOutputFile(staged_file_path)
+            self.scratchSpace.commit(staged_file_path, output_file_path)
+        except:
+            self.scratchSpace.discard(staged_file_path)
+            raise
+        finally:
+            self.scratchSpace.release(estimated_size)
+        self.journal.recordClip(output_file_path)
+
+    def __encodeSinglePass__(self, part, input_file, clips, melt_command_tail, estimated_size):
+        # the segment muxer starts a new file at every frame listed in
+        # `segment_frames` (relative to the first encoded frame), so that
+        # the input is decoded once from the first to the last scene change
+        first_frame = clips[0].start
+        last_frame = clips[-1].end
+        output_file_paths = [os.path.join(self.output_dir_path, clip.output_file_name) for clip in clips]
+        if self.resume is True and all([self.journal.isClipComplete(output_file_path) for output_file_path in output_file_paths]):
+            logger.info("skipping '%s' because all of its clips are completed" % (input_file, ))
+            return
+        # a partially completed file is encoded again entirely because the
+        # segment muxer can't skip clips in the middle
+        segment_format = None
+        segment_melt_command_tail = []
+        for melt_command in melt_command_tail:
+            if melt_command.startswith("f="):
+                segment_format = melt_command[len("f="):] # the format of the segments rather than of the output
+            else:
+                segment_melt_command_tail.append(melt_command)
+        segment_file_path_pattern = self.scratchSpace.stagingPath(os.path.join(self.output_dir_path, "%s-segment-%%05d.avi" % (os.path.basename(input_file).replace("%", "%%"), )))
+        melt_encode_cmds = [self.melt, input_file, "in=%d" % (first_frame, ), "out=%d" % (last_frame, ), "analyzeduration", str(melt_encode_analyse_duration), "-consumer", "avformat:%s" % (segment_file_path_pattern, ), "f=segment", "reset_timestamps=1", ]
+        if len(clips) > 1:
+            melt_encode_cmds.append("segment_frames=%s" % (",".join([str(clip.start-first_frame) for clip in clips[1:]]), ))
+        if segment_format is not None:
+            melt_encode_cmds.append("segment_format=%s" % (segment_format, ))
+        melt_encode_cmds += segment_melt_command_tail
+        logger.debug("creating %d clips from frame %d to frame %d in one pass with %s" % (len(clips), first_frame, last_frame, str(melt_encode_cmds)))
+        segment_file_paths = [segment_file_path_pattern % (i, ) for i in range(len(clips))]
+        self.scratchSpace.acquire(estimated_size, "%s (%s)" % (input_file, part, ))
+        try:
+            with tracing.span("encode_single_pass", "file", file=input_file, clips=len(clips)) as encode_span:
+                melt_encode_result = process_runner.run_melt(melt_encode_cmds, lambda frame, percentage: self.progressReporter.update(input_file, part, frame, percentage))
+                if melt_encode_result.returncode != 0:
+                    raise RuntimeError("melt process failed with returncode %d and output:\n%s" % (melt_encode_result.returncode, melt_encode_result.stderr_tail, ))
+                segment_file_paths = [i for i in segment_file_paths if os.path.exists(i)]
+                for segment_file_path in segment_file_paths:
+                    encode_span.recordOutputFile(segment_file_path)
+            if len(segment_file_paths) != len(clips):
+                logger.warning("expected %d segments of '%s', but got %d (the encoder probably didn't create a keyframe at every scene change), keeping segment file names" % (len(clips), input_file, len(segment_file_paths), ))
+                for segment_file_path in segment_file_paths:
+                    self.scratchSpace.commit(segment_file_path, os.path.join(self.output_dir_path, os.path.basename(segment_file_path)))
                 return
-            frame_pairs = frames_string.split(";")
-            frames = collections.deque()
-            for frame_pair in frame_pairs:
-                start = frame_pair.split("=")[0]
-                frames.append(start)
-            logger.info("split file '%s' into %d clips" % (input_file, len(frames)))
-            last_start = frames.popleft()
-            while len(frames) > 0:
-                start = str(int(frames.popleft())-1) # don't let the last and the first frame overlap
-                output_file_path = "%s.avi" % (os.path.join(self.output_dir_path, "%s-%s-%s" % (os.path.basename(input_file), last_start, start)), )
-                melt_encode_cmds = [self.melt, input_file, "in=%s" % (last_start, ), "out=%s" % (start, ), "analyzeduration", str(melt_encode_analyse_duration), "-consumer", "avformat:%s" % (output_file_path, ), ]+self.melt_command_tail
-                logger.debug("creating clip from scene from frame %s to frame %s as '%s' with %s" % (last_start, start, output_file_path, str(melt_encode_cmds)))
-                melt_encode_process = sp.Popen(melt_encode_cmds, stdout=sp.PIPE, stderr=sp.PIPE)
-                melt_encode_process_stderr = melt_encode_process.communicate()[1] # rather than Popen.wait use Popen.communicate to suppress output and only display it if an error occured; naively assume that only stderr is interesting; naively assume that the outupt of `melt` won't fill up memory (use a temporary file if that becomes an issue)
-                if melt_encode_process.returncode != 0:
-                    raise RuntimeError("melt process failed with returncode %d and output:\n%s" % (melt_encode_process.returncode, melt_encode_process_stderr, ))
-                last_start = start
-        threads = []
-        for input_file in self.input_files:
-            thread = threading.Thread(target=__split__, args=(input_file,))
-            thread.start()
-            threads.append(thread)
-        while len(threads) > 0:
-            logger.info("waiting for %d threads to terminate" % (len(threads),))
-            thread = threads.pop()
-            thread.join()
+            for segment_file_path, output_file_path in zip(segment_file_paths, output_file_paths):
+                self.scratchSpace.commit(segment_file_path, output_file_path)
+                self.journal.recordClip(output_file_path)
+        except:
+            for segment_file_path in segment_file_paths:
+                self.scratchSpace.discard(segment_file_path) # segments which haven't been moved yet
+            raise
+        finally:
+            self.scratchSpace.release(estimated_size)
+
+def iter_files(dir_path, recursive=False):
+    """A generator which yields the paths of all files in `dir_path` (and its
+    subdirectories if `recursive` is `True`) in the order of the directory
+    entries. Uses `scandir` (part of `os` in python 3 and available as backport
+    for python 2) which doesn't need to `stat` every entry and falls back to
+    `os.listdir`."""
+    pending_dir_paths = [dir_path]
+    while len(pending_dir_paths) > 0:
+        current_dir_path = pending_dir_paths.pop()
+        sub_dir_paths = []
+        if scandir is not None:
+            for entry in scandir(current_dir_path):
+                if entry.is_dir(follow_symlinks=False): # like `os.walk`
+                    sub_dir_paths.append(entry.path)
+                elif entry.is_file():
+                    yield entry.path
+        else:
+            for file_name in os.listdir(current_dir_path):
+                file_path = os.path.join(current_dir_path, file_name)
+                if os.path.isdir(file_path) and not os.path.islink(file_path):
+                    sub_dir_paths.append(file_path)
+                elif os.path.isfile(file_path):
+                    yield file_path
+        if recursive is True:
+            pending_dir_paths += reversed(sorted(sub_dir_paths)) # visit subdirectories in order
+
+def parse_scene_length(value):
+    """Parses a scene length in frames (e.g. `12`) or seconds (e.g. `1.5s`).
+    @return a tuple of the length and `True` if it's in seconds, `False` if
+    it's in frames
+    @raise ValueError if `value` isn't a valid scene length"""
+    if isinstance(value, basestring) and value.endswith("s"):
+        length = float(value[:-1])
+        seconds = True
+    else:
+        length = int(value)
+        seconds = False
+    if length < 0:
+        raise ValueError("a scene length mustn't be negative, but is '%s'" % (value, ))
+    return length, seconds
+
+def clip_boundaries(frames):
+    """@return a list of tuples of the first and the last frame of the clips
+    between the scene changes in `frames` (starting with the first frame and
+    ending with the end marker); every clip ends with the frame before the
+    next scene starts, so that clips don't overlap"""
+    return [(clip_start, next_clip_start-1) for clip_start, next_clip_start in zip(frames[:-1], frames[1:])]
+
+def coalesce_scene_changes(frames, min_scene_length=0, merge_tolerance=merge_tolerance_default):
+    """Removes the scene changes from the sorted list of frames where a scene
+    starts `frames` (whose last element is the end of the last scene) which
+    are at most `merge_tolerance` frames after the previous scene change or
+    start a scene shorter than `min_scene_length` frames which is thereby
+    merged into the following scene. A last scene which is too short is
+    merged into the previous scene. The first and the last element are always
+    kept.
+    @return the list of the remaining frames"""
+    if len(frames) <= 2:
+        return list(frames)
+    ret_value = [frames[0]]
+    for frame in frames[1:-1]:
+        if frame-ret_value[-1] <= merge_tolerance or frame-ret_value[-1] < min_scene_length:
+            continue
+        ret_value.append(frame)
+    end = frames[-1]
+    while len(ret_value) > 1 and (end-ret_value[-1] <= merge_tolerance or end-ret_value[-1] < min_scene_length):
+        ret_value.pop()
+    ret_value.append(end)
+    return ret_value
 
 def retrieve_file_extension(file_name):
     video_file_extension = file_name.split(".")[-1]
@@ -183,10 +892,36 @@ def retrieve_file_extension(file_name):
     melt=(__melt_doc__),
     melt_command_tail=(__melt_command_tail_doc__),
     recursive=(__recursive_doc__, "flag"),
+    jobs=(__jobs_doc__, "option", "j", int),
+    detect_jobs=(__detect_jobs_doc__, "option", "J", int),
+    single_pass=(__single_pass_doc__, "flag", "s"),
+    copy=(__copy_doc__, "flag", "c"),
+    mp4box=(__mp4box_doc__, "option", "m"),
+    cache_dir=(__cache_dir_doc__, "option", "C"),
+    cache_size=(__cache_size_doc__, "option", "S", int),
+    no_cache=(__no_cache_doc__, "flag", "n"),
+    detect_window=(__detect_window_doc__, "option", "w", int),
+    detect_overlap=(__detect_overlap_doc__, "option", "o", int),
+    detect_tolerance=(__detect_tolerance_doc__, "option", "t", int),
+    detector=(__detector_doc__, "option", "d", str, detectors.detector_names),
+    coarse_step=(__coarse_step_doc__, "option", "k", int),
+    resume=(__resume_doc__, "flag", "R"),
+    verify_clips=(__verify_clips_doc__, "flag", "V"),
+    watch=(__watch_doc__, "flag", "W"),
+    settle_time=(__settle_time_doc__, "option", "T", int),
+    job_queue_dir=(__job_queue_dir_doc__, "option", "Q"),
+    lease_timeout=(__lease_timeout_doc__, "option", "L", int),
+    longest_first=(__longest_first_doc__, "flag", "l"),
+    trace=(__trace_doc__, "option", "P"),
+    scratch_dir=(__scratch_dir_doc__, "option", "D"),
+    min_scene_length=(__min_scene_length_doc__, "option", "M"),
+    merge_tolerance=(__merge_tolerance_doc__, "option", "G", int),
+    plan=(__plan_doc__, "option", "p"),
+    execute_plan=(__execute_plan_doc__, "flag", "E"),
     version=(video_splitter_globals.__version_doc__, "flag"),
     debug=(video_splitter_globals.__debug_doc__, "flag"),
 )
-def __main_delegate__(input_path, output_dir_path, melt=melt_default, melt_command_tail=melt_command_tail_default, recursive=recursive_default, version=False, debug=False):
+def __main_delegate__(input_path, output_dir_path, melt=melt_default, melt_command_tail=melt_command_tail_default, recursive=recursive_default, jobs=jobs_default, detect_jobs=None, single_pass=single_pass_default, copy=copy_default, mp4box=mp4box_utils.mp4box_default, cache_dir=cache_dir_default, cache_size=cache_size_default, no_cache=False, detect_window=None, detect_overlap=detect_overlap_default, detect_tolerance=detect_tolerance_default, detector=detector_default, coarse_step=None, resume=resume_default, verify_clips=False, watch=False, settle_time=folder_watcher.settle_time_default, job_queue_dir=None, lease_timeout=job_queue.lease_timeout_default, longest_first=False, trace=None, scratch_dir=None, min_scene_length=None, merge_tolerance=merge_tolerance_default, plan=None, execute_plan=False, version=False, debug=False):
     """
     video_splitter serves to split videos based on automatic scene recognition. It uses `melt`s `motion_est` filter to determine frames in a video file which represent scene changes and creates a new video file from the beginning to the end of the scene ("output") which is stored into a configurable locaction (see `output_dir_path`). It processes `file_name` if it denotes an existing file or if it is a directory all files in it. The generation of the output is produced by `melt` and is fully configurable with the `melt_command_tail` argument."""
     if version is True:
@@ -195,8 +930,40 @@ def __main_delegate__(input_path, output_dir_path, melt=melt_default, melt_comma
     if debug is True:
         logger.setLevel(logging.DEBUG)
         ch.setLevel(logging.DEBUG)
-    videoSplitter = VideoSplitter(input_path, output_dir_path, melt, melt_command_tail, recursive)
-    videoSplitter.split()
+    if no_cache is True:
+        cache_dir = None
+    if isinstance(melt_command_tail, basestring): # passed on the command line
+        melt_command_tail = shlex.split(melt_command_tail)
+    if len([mode for mode in [watch, plan is not None, execute_plan] if mode]) > 1:
+        raise ValueError("only one of watch, plan and execute_plan can be specified")
+    if trace is not None:
+        tracer = tracing.enable()
+    videoSplitter = VideoSplitter(input_path, output_dir_path, melt, melt_command_tail, recursive, jobs, detect_jobs, single_pass, copy, mp4box, cache_dir, cache_size, detect_window, detect_overlap, detect_tolerance, None if execute_plan is True else detector, coarse_step, resume, job_queue_dir, lease_timeout, longest_first, scratch_dir=scratch_dir, min_scene_length=min_scene_length, merge_tolerance=merge_tolerance, verify_clips=verify_clips)
+    if plan is not None:
+        plans = videoSplitter.plans()
+        with open(plan, "w") as plan_file:
+            if plan.endswith(".edl"):
+                plan_file.write(split_plan.to_edl(plans))
+            elif plan.endswith(".mlt"):
+                plan_file.write(split_plan.to_mlt(plans))
+            else:
+                split_plan.dump_json(plans, plan_file)
+        logger.info("wrote the plans of %d files with %d clips to '%s'" % (len(plans), sum([len(plan0.clips) for plan0 in plans]), plan, ))
+    elif execute_plan is True:
+        with open(input_path, "r") as plan_file:
+            plans = split_plan.load_json(plan_file)
+        if melt_command_tail is not melt_command_tail_default: # encode the plans with another profile
+            plans = [plan0._replace(melt_command_tail=list(melt_command_tail)) if plan0.mode != "copy" else plan0 for plan0 in plans]
+        videoSplitter.executePlans(plans)
+    elif watch is True:
+        if not os.path.isdir(input_path):
+            raise ValueError("input_path '%s' has to be a directory in watch mode" % (input_path, ))
+        videoSplitter.watch(input_path, settle_time)
+    else:
+        videoSplitter.split()
+    if trace is not None:
+        tracer.writeChromeTrace(trace)
+        tracer.logSummary()
 
 def main():
     plac.call(__main_delegate__)
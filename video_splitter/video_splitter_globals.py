@@ -29,7 +29,7 @@
 
 app_name = "video-splitter"
 
-video_file_extensions = ["flv", "mp4", "avi"]
+video_file_extensions = ["flv", "mp4", "avi", "mkv", "webm", "mov", "m4v", "3gp", "mpg", "mpeg", "vob", "ts", "mts", "m2ts", "ogv", "wmv", "asf", "rm"] # only used for file dialogs, files are recognized by their content (see `video_sniffer`)
 
 __version_doc__ = "Print information about the version of the software to stdout and exit"
 __debug_doc__ = "Enable debugging messages"
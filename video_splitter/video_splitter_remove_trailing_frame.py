@@ -29,53 +29,101 @@
 
 import plac
 import video_splitter
-import subprocess as sp
-import bs4
+import video_splitter_globals
+import video_sniffer
+import worker_pool
+import mp4box_utils
+import capabilities
+import process_runner
 import os
-import tempfile
+import logging
+import shlex
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+__copy_doc__ = "Trim MP4, MOV and 3GP files with `mp4box` without re-encoding (much faster). Other files are re-encoded with `melt` as usual"
 
 class VideoSplitterRemoveTrailingFrame(video_splitter.AbstractVideoSplitter):
-    def __init__(self, input_path, output_dir_path, melt=video_splitter.melt_default, melt_command_tail=video_splitter.melt_command_tail_default, recursive=video_splitter.recursive_default, version=False, debug=False):
-        video_splitter.AbstractVideoSplitter.__init__(self, input_path, output_dir_path, melt, melt_command_tail, recursive, version, debug)
+    def __init__(self, input_path, output_dir_path, melt=video_splitter.melt_default, melt_command_tail=video_splitter.melt_command_tail_default, recursive=video_splitter.recursive_default, jobs=video_splitter.jobs_default, copy=video_splitter.copy_default, mp4box=mp4box_utils.mp4box_default):
+        """
+        @args jobs %(__jobs_doc__)s
+        @args copy %(__copy_doc__)s
+        @args mp4box %(__mp4box_doc__)s
+        """ % {"__jobs_doc__": video_splitter.__jobs_doc__, "__copy_doc__": __copy_doc__, "__mp4box_doc__": video_splitter.__mp4box_doc__}
+        video_splitter.AbstractVideoSplitter.__init__(self, input_path, output_dir_path, melt, melt_command_tail, recursive, cache_dir=None, detector=None) # the number of frames is probed without scene detection, so that a melt without `motion_est` is sufficient
+        if jobs < 1:
+            raise ValueError("jobs has to be at least 1, but is %d" % (jobs, ))
+        if copy is True and not capabilities.binary_available(mp4box):
+            raise RuntimeError("The MP4Box binary '%s' is not available. Install it (on Ubuntu the package `gpac`) and try again" % (mp4box, ))
+        self.jobs = jobs
+        self.copy = copy
+        self.mp4box = mp4box
 
     def removeTrailingFrame(self, ):
-        for input_file in self.input_files:
-            melt_process_cmds = [self.melt, input_file, "-attach", "motion_est", "-consumer", "xml", "all=1", ] # scanning the whole file to retrieve an XML summary is probalby not very efficient, but it works for instance
-            self.logger.debug("finding clip length of file '%s' with %s" % (input_file, str(melt_process_cmds)))
-            melt_process = sp.Popen(melt_process_cmds, stdout=sp.PIPE, stderr=sp.PIPE) # melt writes a lot of error message about missing frames or timestamps to stderr which don't affect the clip splitting in a significant way
-            melt_process_output_tuple = melt_process.communicate()
-            melt_process_output = melt_process_output_tuple[0]
-            if not melt_process.returncode == 0:
-                melt_process_output_stderr = melt_process_output_tuple[1]
-                self.logger.error("melt process failed with output '%s', skipping input file" % (melt_process_output_stderr, ))
+        """Removes the last frame of all input files in a pool of `jobs`
+        workers. The clips which failed are available in `failed_clips`
+        afterwards."""
+        pool = worker_pool.WorkerPool("remove-trailing-frame", self.jobs)
+        for input_file in self.inputFiles():
+            container = video_sniffer.sniff_container(input_file)
+            if container is None:
+                logger.debug("skipping non-video file '%s'" % (input_file, ))
                 continue
+            pool.submit(input_file, self.__removeTrailingFrame__, input_file, container) # blocks while the queue is full
+        pool.shutdown()
+        if len(pool.failures) > 0:
+            logger.error("removing the trailing frame failed for %d file(s): %s" % (len(pool.failures), ", ".join(["'%s'" % (description, ) for description, ex in pool.failures]), ))
+        self.failed_clips = [description for description, ex in pool.failures]
 
-            soup = bs4.BeautifulSoup(melt_process_output, "lxml")
-            soup_producers = soup.find_all("producer")
-            if len(soup_producers) != 1:
-                raise AssertionError("melt XML output contains more than one or no producer elements, can't proceed, skipping")
-            soup_producer = soup_producers[0]
-            frame_count = int(soup_producer["out"])
-            output_file_path = os.path.join(self.output_dir_path, os.path.basename(input_file))
-            new_end = frame_count-1
-            melt_encode_cmds = [self.melt, input_file, "in=0", "out=%d" % (new_end, ), "-consumer", "avformat:%s" % (output_file_path, ), ]+self.melt_command_tail
-            self.logger.debug("creating clip from scene from frame 0 to frame %d as '%s' with %s" % (new_end, output_file_path, str(melt_encode_cmds)))
-            sp.check_call(melt_encode_cmds, stderr=open(os.devnull))
+    def __removeTrailingFrame__(self, input_file, container):
+        output_file_path = os.path.join(self.output_dir_path, os.path.basename(input_file))
+        if self.copy is True and container in video_sniffer.iso_media_containers:
+            index = self.readIndex(input_file)
+            if index is not None:
+                fps, frame_count, keyframes = index
+            else:
+                fps, frame_count, keyframes = mp4box_utils.retrieve_keyframes(self.mp4box, input_file) # e.g. fragmented files
+            logger.debug("copying frame 0 to frame %d of '%s' to '%s'" % (frame_count-2, input_file, output_file_path, ))
+            mp4box_utils.extract(self.mp4box, input_file, 0, frame_count-2, fps, output_file_path)
+            return
+        frame_count = self.probeLength(input_file) # reads the header without decoding frames
+        if frame_count is None:
+            raise RuntimeError("retrieving the number of frames of '%s' failed" % (input_file, ))
+        new_end = frame_count-2
+        melt_encode_cmds = [self.melt, input_file, "in=0", "out=%d" % (new_end, ), "-consumer", "avformat:%s" % (output_file_path, ), ]+self.melt_command_tail
+        logger.debug("creating clip from scene from frame 0 to frame %d as '%s' with %s" % (new_end, output_file_path, str(melt_encode_cmds)))
+        melt_encode_result = process_runner.run_melt(melt_encode_cmds)
+        if melt_encode_result.returncode != 0:
+            raise RuntimeError("melt process failed with returncode %d and output:\n%s" % (melt_encode_result.returncode, melt_encode_result.stderr_tail, ))
 
 @plac.annotations(
-    input_path=(video_splitter.__plac_input_path_doc__),
-    output_dir_path=(video_splitter.__plac_output_dir_path_doc__),
-    melt=(video_splitter.__plac_melt_doc__),
-    melt_command_tail=(video_splitter.__plac_melt_command_tail_doc__),
-    recursive=(video_splitter.__plac_recursive_doc__, "flag"),
-    version=(video_splitter.__plac_version_doc__, "flag"),
-    debug=(video_splitter.__plac_debug_doc__, "flag"),
+    input_path=(video_splitter.__input_path_doc__),
+    output_dir_path=(video_splitter.__output_dir_path_doc__),
+    melt=(video_splitter.__melt_doc__),
+    melt_command_tail=(video_splitter.__melt_command_tail_doc__),
+    recursive=(video_splitter.__recursive_doc__, "flag"),
+    jobs=(video_splitter.__jobs_doc__, "option", "j", int),
+    copy=(__copy_doc__, "flag", "c"),
+    mp4box=(video_splitter.__mp4box_doc__, "option", "m"),
+    version=(video_splitter_globals.__version_doc__, "flag"),
+    debug=(video_splitter_globals.__debug_doc__, "flag"),
 )
-def remove_trailing_frame(input_path, output_dir_path, melt=video_splitter.melt_default, melt_command_tail=video_splitter.melt_command_tail_default, recursive=video_splitter.recursive_default, version=False, debug=False):
+def remove_trailing_frame(input_path, output_dir_path, melt=video_splitter.melt_default, melt_command_tail=video_splitter.melt_command_tail_default, recursive=video_splitter.recursive_default, jobs=video_splitter.jobs_default, copy=video_splitter.copy_default, mp4box=mp4box_utils.mp4box_default, version=False, debug=False):
     """Removes the trailing frame which has been added by accident in versions of video-splitter below 1.2."""
-    videoSplitterRemoveTrailingFrame = VideoSplitterRemoveTrailingFrame(input_path, output_dir_path, melt, melt_command_tail, recursive, version, debug)
+    if version is True:
+        print(video_splitter.app_version)
+        return
+    if debug is True:
+        logger.setLevel(logging.DEBUG)
+        ch.setLevel(logging.DEBUG)
+    if isinstance(melt_command_tail, basestring): # passed on the command line like in `video_splitter`
+        melt_command_tail = shlex.split(melt_command_tail)
+    videoSplitterRemoveTrailingFrame = VideoSplitterRemoveTrailingFrame(input_path, output_dir_path, melt, melt_command_tail, recursive, jobs, copy, mp4box)
     videoSplitterRemoveTrailingFrame.removeTrailingFrame()
 
 if __name__ == "__main__":
     plac.call(remove_trailing_frame)
-
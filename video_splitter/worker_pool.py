@@ -0,0 +1,98 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#    Dieses Programm ist Freie Software: Sie können es unter den Bedingungen
+#    der GNU General Public License, wie von der Free Software Foundation,
+#    Version 3 der Lizenz oder (nach Ihrer Wahl) jeder neueren
+#    veröffentlichten Version, weiterverbreiten und/oder modifizieren.
+#
+#    Dieses Programm wird in der Hoffnung, dass es nützlich sein wird, aber
+#    OHNE JEDE GEWÄHRLEISTUNG, bereitgestellt; sogar ohne die implizite
+#    Gewährleistung der MARKTFÄHIGKEIT oder EIGNUNG FÜR EINEN BESTIMMTEN ZWECK.
+#    Siehe die GNU General Public License für weitere Details.
+#
+#    Sie sollten eine Kopie der GNU General Public License zusammen mit diesem
+#    Programm erhalten haben. Wenn nicht, siehe <http://www.gnu.org/licenses/>.
+
+# A fixed number of worker threads which consume tasks from a bounded queue.
+# Submitting blocks while the queue is full which keeps the producer (e.g. the
+# loop over all input files) from running ahead of the workers and allows
+# feeding the queue in order without materializing thousands of pending tasks.
+
+import Queue
+import logging
+import threading
+import time
+import tracing
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+logger.addHandler(ch)
+
+class WorkerPool:
+    def __init__(self, name, worker_count, queue_size=None):
+        """
+        @args name a name used for the worker threads and logging
+        @args worker_count the number of tasks which are run concurrently
+        @args queue_size the number of tasks which can be pending before `submit` blocks (defaults to twice the `worker_count`)
+        """
+        if worker_count < 1:
+            raise ValueError("worker_count has to be at least 1, but is %d" % (worker_count, ))
+        if queue_size is None:
+            queue_size = worker_count*2
+        self.name = name
+        self.tasks = Queue.Queue(maxsize=queue_size)
+        self.failures = [] # tuples of task description and exception
+        self.failures_lock = threading.Lock()
+        self.workers = []
+        for i in range(worker_count):
+            worker = threading.Thread(target=self.__work__, name="%s-%d" % (name, i, ))
+            worker.daemon = True # don't keep the interpreter alive after KeyboardInterrupt
+            worker.start()
+            self.workers.append(worker)
+
+    def submit(self, description, function, *args):
+        """Queues `function` to be invoked with `args` by the next free worker.
+        Blocks while the queue is full. `description` is used for logging and
+        failure reporting."""
+        self.tasks.put((description, function, args, time.time()))
+
+    def __work__(self):
+        while True:
+            task = self.tasks.get()
+            try:
+                if task is None:
+                    return
+                description, function, args, submitted = task
+                tracing.queued_span("wait_%s" % (self.name, ), "queue", submitted, task=description)
+                try:
+                    function(*args)
+                except Exception as ex:
+                    logger.exception("%s task '%s' failed" % (self.name, description, ))
+                    with self.failures_lock:
+                        self.failures.append((description, ex))
+            finally:
+                self.tasks.task_done()
+
+    def shutdown(self):
+        """Waits for all submitted tasks to be processed and terminates the
+        workers. No tasks can be submitted afterwards."""
+        for worker in self.workers:
+            self.tasks.put(None) # stop markers are queued after all tasks
+        for worker in self.workers:
+            worker.join()